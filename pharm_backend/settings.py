@@ -85,10 +85,17 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.JWTCookieAuthentication',
     ),
+    # clients opt into newer representations with `Accept: application/json; version=2`
+    'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.AcceptHeaderVersioning',
+    'DEFAULT_VERSION': '1',
+    'ALLOWED_VERSIONS': ('1', '2'),
 }
 
+# api versions receiving money amounts as json numbers instead of strings
+NUMERIC_MONEY_VERSIONS = ('2',)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -104,6 +111,21 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    'users.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+PASSWORD_HASHING = {
+    'ITERATIONS': int(os.getenv("PASSWORD_HASH_ITERATIONS", 720000)),
+    'MAX_WORKERS': None,
+    'MAX_QUEUED': 32,
+    'TIMEOUT': 5,
+}
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
@@ -122,7 +144,82 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
+    'TOKEN_USER_CLASS': 'users.authentication.ClaimsUser',
+    }
+
+TOKEN_VERSION_CACHE = 'default'
+# a revocation reaches the other workers once their cached version expires,
+# None caches it for the refresh lifetime and needs TOKEN_VERSION_CACHE on a shared cache (e.g. redis)
+TOKEN_VERSION_TTL = 10
+
+
+USER_CACHE = {
+    'MAX_SIZE': 1024,
+    'TTL': 30,
+    }
+
+SESSION_REGISTRY = {
+    # use users.sessions.CacheSessionBackend on a shared cache when running several workers
+    'BACKEND': 'users.sessions.LocalSessionBackend',
+    'OPTIONS': {},
+    'IDLE_TIMEOUT': timedelta(minutes=5),
+    }
+
+BULK_ONBOARDING = {
+    'MAX_ROWS': 1000,
+    'BATCH_SIZE': 200,
+    }
+
+LOGIN_THROTTLE = {
+    # use users.throttling.CacheBucketStore on a shared cache when running several workers
+    'STORE': 'users.throttling.LocalBucketStore',
+    'OPTIONS': {},
+    'IP': os.getenv("LOGIN_THROTTLE_IP", '30/min'),
+    'EMAIL': os.getenv("LOGIN_THROTTLE_EMAIL", '5/min'),
     }
+
+MEDICATION_SEARCH = {
+    # the index is per process, changes from other workers show up once it is rebuilt
+    'MAX_AGE': 300,
+    'LIMIT': 10,
+    'MAX_LIMIT': 50,
+    'MIN_SIMILARITY': 0.6,
+    }
+
+BARCODE_CACHE = {
+    # scanned medications are cached by the catalog cache, under barcode:<code> keys
+    # codes accepted by a single batch lookup
+    'MAX_CODES': 100,
+    }
+
+MEDICATION_IMPORT = {
+    'CHUNK_SIZE': 1000,
+    'MAX_ERRORS': 100,
+    }
+
+STOCK_ADJUSTMENT = {
+    'MAX_LINES': 5000,
+    }
+
+CATALOG_CACHE = {
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 300,
+    # alias of a shared django cache (e.g. redis) to back every worker's local tier, which then
+    # only keeps entries for LOCAL_TIMEOUT seconds as it can't see other workers' invalidations
+    'SHARED': None,
+    'LOCAL_TIMEOUT': 5,
+    }
+
+CART_ITEMS = {
+    # lines accepted by a single bulk add to cart
+    'MAX_LINES': 500,
+    }
+
+SESSION_ACTIVITY = {
+    'FLUSH_INTERVAL': 30,
+    'BATCH_SIZE': 500,
+    }
+
 SESSION_COOKIE_SECURE = False
 
 SESSION_COOKIE_HTTPONLY = True 
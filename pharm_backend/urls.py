@@ -8,4 +8,5 @@ urlpatterns = [
     path('', include('users.urls')),
     path('', include('stock.urls')),
     path('', include('reports.urls')),
+    path('', include('django_prometheus.urls')),
 ]
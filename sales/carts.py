@@ -0,0 +1,72 @@
+from uuid import uuid4
+from decimal import Decimal
+from django.db import connection, transaction
+from sales.models import Cart, CartItem
+from sales.totals import adjust_total
+from stock.models import Medication
+import logging
+
+log = logging.getLogger('main')
+
+
+def merge_lines(lines):
+        """
+        merges (medication, quantity) lines of the same medication, adding up their quantities.
+        postgres refuses to upsert a row twice in one statement
+        """
+        merged = {}
+        for medication, quantity in lines:
+            merged[medication.pk] = (medication, merged.get(medication.pk, (None, 0))[1] + quantity)
+        return merged
+
+
+def add_to_cart(cart_id, staff_id, lines):
+        """
+        adds (medication, quantity) lines to the cart of staff_id with a single
+        INSERT ... ON CONFLICT (cart_id, drug_id) DO UPDATE SET quantity = quantity + excluded.quantity,
+        so scanning a drug already in the cart adds to its line instead of failing on the (cart, drug) uniqueness.
+        a line keeps the price it was added at, a new one takes the medication's price as read from the
+        database inside the transaction, not the one of the medication passed in.
+        the cart's running total is adjusted by the difference with one F() update. raises Cart.DoesNotExist.
+        returns every item of the cart and the cart total
+        """
+        merged = merge_lines(lines)
+        log.info(f'adding {len(merged)} lines to a cart')
+        meta = CartItem._meta
+        fields = [meta.get_field(name) for name in ('cart_item_id', 'cart', 'drug', 'quantity', 'price')]
+        table, quantity, price = (connection.ops.quote_name(name) for name in (meta.db_table, fields[3].column, fields[4].column))
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        conflict = ', '.join(connection.ops.quote_name(meta.get_field(name).column) for name in ('cart', 'drug'))
+
+        with transaction.atomic():
+            """ the lock keeps a checkout of the same cart from running halfway through the upsert """
+            cart = Cart.objects.select_for_update().get(pk=cart_id, sales_staff_id=staff_id)
+            """ the lines are locked too, an edit of one through its own save waits for the upsert's adjustment """
+            items = {item.drug_id: item for item in CartItem.objects.filter(cart=cart).select_related('drug').select_for_update(of=('self',))}
+            """ the medications handed in may come from a cache, new lines are priced from fresh rows """
+            medications = Medication.objects.in_bulk([drug_id for drug_id in merged if drug_id not in items])
+
+            params, delta = [], Decimal('0')
+            for drug_id, (medication, line_quantity) in merged.items():
+                item = items.get(drug_id, None)
+                if item is None:
+                    item = items[drug_id] = CartItem(cart=cart, drug=medications.get(drug_id, medication), quantity=0)
+                delta -= item.amount
+                item.quantity += line_quantity
+                if item.price is None:
+                    item.price = item.drug.price
+                delta += item.amount
+                values = (item.pk, cart.pk, drug_id, line_quantity, item.price)
+                params += [field.get_db_prep_save(value, connection) for field, value in zip(fields, values)]
+
+            rows = ', '.join(['(%s, %s, %s, %s, %s)'] * len(merged))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} ({columns}) VALUES {rows} '
+                    f'ON CONFLICT ({conflict}) DO UPDATE SET {quantity} = {table}.{quantity} + excluded.{quantity}, {price} = excluded.{price}',
+                    params,
+                )
+            adjust_total(Cart, cart.pk, delta)
+
+        log.info(f'cart now holds {len(items)} lines')
+        return sorted(items.values(), key=lambda item: item.drug.name), cart.total_price + delta
@@ -0,0 +1,48 @@
+from django.db import transaction
+from sales.models import Cart, CartItem, Order, OrderItem
+from sales.totals import UNIT_PRICE
+from stock.inventory import take_stocks
+import logging
+
+log = logging.getLogger('main')
+
+
+class CheckoutRejected(Exception):
+    """
+    raised when a cart can't be turned into an order, e.g. because it holds no sellable lines
+    """
+
+
+def checkout(cart_id, staff_id):
+        """
+        turns the cart of staff_id identified by cart_id into an order in one transaction:
+        the cart is locked, its items are copied into order items with one insert, the order takes
+        the cart's running total, the stock of every line is taken with one update and the cart is deleted.
+        raises Cart.DoesNotExist, CheckoutRejected or stock.inventory.InsufficientStock, leaving nothing behind.
+        returns the order and its items
+        """
+        log.info(f'checking out a cart')
+        with transaction.atomic():
+            """ the lock makes a second checkout of the same cart wait, then find it gone """
+            cart = Cart.objects.select_for_update().get(pk=cart_id, sales_staff_id=staff_id)
+            items = CartItem.objects.filter(cart=cart)
+            lines = list(items.annotate(unit_price=UNIT_PRICE).values_list('drug_id', 'quantity', 'drug__barcode', 'unit_price'))
+            if not lines:
+                log.error(f'cart could not be checked out because it is empty')
+                raise CheckoutRejected('the cart is empty')
+            if any(quantity is None or quantity < 1 for drug_id, quantity, barcode, unit_price in lines):
+                log.error(f'cart could not be checked out because some of its items have no quantity')
+                raise CheckoutRejected('every item in the cart must have a quantity of at least 1')
+
+            order = Order.objects.create(sales_staff_id=staff_id, total_price=cart.total_price)
+            order_items = OrderItem.objects.bulk_create([
+                OrderItem(order=order, drug_id=drug_id, quantity=quantity, price=unit_price)
+                for drug_id, quantity, barcode, unit_price in lines
+            ])
+            cart.delete()
+            """ taken last so the medication rows are locked for as short as possible """
+            take_stocks({drug_id: quantity for drug_id, quantity, barcode, unit_price in lines},
+                        barcodes=[barcode for drug_id, quantity, barcode, unit_price in lines])
+
+        log.info(f'cart has been checked out into an order of {len(order_items)} items')
+        return order, order_items
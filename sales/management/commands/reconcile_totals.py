@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from sales.models import CartItem, OrderItem
+from sales.totals import PARENTS, find_drift, fix_drift
+import logging
+
+log = logging.getLogger('main')
+
+
+class Command(BaseCommand):
+    """
+    recomputes the running totals of carts and orders from their lines and reports the ones that drifted,
+    meant to run periodically (e.g. from cron)
+    """
+    help = 'checks the cart and order running totals against the sum of their lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='overwrite drifted totals with the recomputed ones')
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for line_model in (CartItem, OrderItem):
+            model, field = PARENTS[line_model]
+            drift = find_drift(line_model)
+            drifted += len(drift)
+            for pk, stored, computed in drift:
+                log.error(f'{field} {pk} has a running total of {stored:.2f} but its lines add up to {computed:.2f}')
+                self.stderr.write(f'{field} {pk}: total {stored:.2f}, lines add up to {computed:.2f}')
+            if drift and options['fix']:
+                fixed = fix_drift(line_model, [pk for pk, stored, computed in drift])
+                self.stdout.write(f'fixed the totals of {fixed} {field}s')
+
+        self.stdout.write(f'{drifted} drifted totals found')
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:03
+
+import django.utils.timezone
+import django_prometheus.models
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cart',
+            fields=[
+                ('cart_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('time_stamp', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Order Timestamp')),
+                ('date', models.DateField(default=django.utils.timezone.localdate, verbose_name='Order Date')),
+                ('total_price', models.CharField(default='0', max_length=20, verbose_name='Total Price')),
+            ],
+            bases=(models.Model, django_prometheus.models.ExportModelOperationsMixin('cart')),
+        ),
+        migrations.CreateModel(
+            name='CartItem',
+            fields=[
+                ('cart_item_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('quantity', models.IntegerField(blank=True)),
+                ('price', models.CharField(blank=True, max_length=20)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('order_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('time_stamp', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Order Timestamp')),
+                ('date', models.DateField(default=django.utils.timezone.localdate, verbose_name='Order Date')),
+                ('total_price', models.CharField(default='0', max_length=20, verbose_name='Total Price')),
+            ],
+            bases=(models.Model, django_prometheus.models.ExportModelOperationsMixin('order')),
+        ),
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('order_item_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('quantity', models.IntegerField(blank=True)),
+                ('price', models.CharField(blank=True, max_length=20)),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('sales', '0001_initial'),
+        ('stock', '0001_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='sales_staff',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.retailstaff', verbose_name='Sales Staff'),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='cart',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sales.cart'),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='drug',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='stock.medication'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='sales_staff',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.retailstaff', verbose_name='Sales Staff'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='drug',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='stock.medication'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sales.order'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='cartitem',
+            unique_together={('cart', 'drug')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='orderitem',
+            unique_together={('order', 'drug')},
+        ),
+    ]
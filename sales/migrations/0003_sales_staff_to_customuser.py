@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    points sales_staff at the custom_user table before the retail_staff table is dropped,
+    the ids are unchanged since the child table shared its primary key with custom_user
+    """
+
+    dependencies = [
+        ('sales', '0002_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cart',
+            name='sales_staff',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Sales Staff'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='sales_staff',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Sales Staff'),
+        ),
+    ]
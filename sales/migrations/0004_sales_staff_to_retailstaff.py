@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_sales_staff_to_customuser'),
+        ('users', '0004_collapse_user_tables'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cart',
+            name='sales_staff',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.retailstaff', verbose_name='Sales Staff'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='sales_staff',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.retailstaff', verbose_name='Sales Staff'),
+        ),
+    ]
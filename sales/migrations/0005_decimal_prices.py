@@ -0,0 +1,80 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:40
+
+from decimal import Decimal
+from django.db import migrations, models
+from stock.money import parse_money
+import logging
+
+log = logging.getLogger('main')
+
+# money columns converted from strings, with the value stored when a string can't be parsed
+MONEY_COLUMNS = [
+    ('Cart', 'total_price', Decimal('0')),
+    ('Order', 'total_price', Decimal('0')),
+    ('CartItem', 'price', None),
+    ('OrderItem', 'price', None),
+]
+
+
+def parse_prices(apps, schema_editor):
+    """
+    parses the price strings into the new decimal columns, unreadable prices are logged
+    """
+    for model_name, field, fallback in MONEY_COLUMNS:
+        model = apps.get_model('sales', model_name)
+        rows = list(model.objects.only('pk', field))
+        for row in rows:
+            amount = parse_money(getattr(row, field))
+            if amount is None and getattr(row, field) not in (None, ''):
+                log.error(f'{field} {getattr(row, field)!r} of {model_name.lower()} {row.pk} could not be parsed')
+            setattr(row, f'{field}_amount', fallback if amount is None else amount)
+        model.objects.bulk_update(rows, [f'{field}_amount'], batch_size=500)
+
+
+def format_prices(apps, schema_editor):
+    for model_name, field, fallback in MONEY_COLUMNS:
+        model = apps.get_model('sales', model_name)
+        rows = list(model.objects.only('pk', f'{field}_amount'))
+        for row in rows:
+            amount = getattr(row, f'{field}_amount')
+            setattr(row, field, '' if amount is None else str(amount))
+        model.objects.bulk_update(rows, [field], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_sales_staff_to_retailstaff'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='total_price_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12, verbose_name='Total Price'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_price_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12, verbose_name='Total Price'),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='price_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='price_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.RunPython(parse_prices, format_prices),
+        migrations.RemoveField(model_name='cart', name='total_price'),
+        migrations.RemoveField(model_name='order', name='total_price'),
+        migrations.RemoveField(model_name='cartitem', name='price'),
+        migrations.RemoveField(model_name='orderitem', name='price'),
+        migrations.RenameField(model_name='cart', old_name='total_price_amount', new_name='total_price'),
+        migrations.RenameField(model_name='order', old_name='total_price_amount', new_name='total_price'),
+        migrations.RenameField(model_name='cartitem', old_name='price_amount', new_name='price'),
+        migrations.RenameField(model_name='orderitem', old_name='price_amount', new_name='price'),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0005_decimal_prices'),
+        ('users', '0005_staff_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['sales_staff', 'date'], name='sales_cart_staff_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['date', 'time_stamp'], name='sales_cart_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['sales_staff', 'date'], name='sales_order_staff_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['date', 'time_stamp'], name='sales_order_date_time_idx'),
+        ),
+    ]
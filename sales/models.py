@@ -1,5 +1,6 @@
 from uuid import uuid4
-from django.db import models
+from decimal import Decimal
+from django.db import models, transaction
 from django_prometheus.models import ExportModelOperationsMixin
 from django.utils import timezone
 from users.models import RetailStaff
@@ -12,9 +13,16 @@ class Cart(models.Model, ExportModelOperationsMixin('cart')):
     """
     cart_id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     sales_staff = models.ForeignKey(RetailStaff, on_delete=models.CASCADE, verbose_name='Sales Staff')
-    time_stamp = models.DateTimeField(default=timezone.now(), verbose_name='Order Timestamp')
-    date = models.DateField(default=timezone.today(), verbose_name='Order Date')
-    total_price = models.CharField(max_length=20, verbose_name='Total Price', default='0')
+    time_stamp = models.DateTimeField(default=timezone.now, verbose_name='Order Timestamp')
+    date = models.DateField(default=timezone.localdate, verbose_name='Order Date')
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, verbose_name='Total Price', default=Decimal('0'))
+
+    class Meta:
+        indexes = [
+            # back the history filters by staff and date range, and its keyset pagination newest first
+            models.Index(fields=['sales_staff', 'date'], name='sales_cart_staff_date_idx'),
+            models.Index(fields=['date', 'time_stamp'], name='sales_cart_date_time_idx'),
+        ]
 
     def __str__(self):
         """
@@ -31,16 +39,31 @@ class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE)
     drug = models.ForeignKey(Medication, on_delete=models.CASCADE)
     quantity = models.IntegerField(blank=True)
-    price = models.CharField(max_length=20, blank=True)
+    price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
 
     class Meta:
-        unique_together = ['order', 'drug']
+        unique_together = ['cart', 'drug']
 
     def __str__(self):
         """
         string representation of the instance
         """
-        return f'{self.order}, {self.drug}, {self.quantity}'
+        return f'{self.cart}, {self.drug}, {self.quantity}'
+
+    def save(self, *args, **kwargs):
+        """
+        saves the line in a transaction, so its stored row stays locked from the sales.signals receiver reading
+        its amount to the cart's total being adjusted by the difference
+        """
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+    @property
+    def amount(self):
+        """
+        what the line adds to its cart's total
+        """
+        return (self.quantity or 0) * (self.price or 0)
 
 
 class Order(models.Model, ExportModelOperationsMixin('order')):
@@ -49,9 +72,16 @@ class Order(models.Model, ExportModelOperationsMixin('order')):
     """
     order_id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     sales_staff = models.ForeignKey(RetailStaff, on_delete=models.CASCADE, verbose_name='Sales Staff')
-    time_stamp = models.DateTimeField(default=timezone.now(), verbose_name='Order Timestamp')
-    date = models.DateField(default=timezone.today(), verbose_name='Order Date')
-    total_price = models.CharField(max_length=20, verbose_name='Total Price', default='0')
+    time_stamp = models.DateTimeField(default=timezone.now, verbose_name='Order Timestamp')
+    date = models.DateField(default=timezone.localdate, verbose_name='Order Date')
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, verbose_name='Total Price', default=Decimal('0'))
+
+    class Meta:
+        indexes = [
+            # back the history filters by staff and date range, and its keyset pagination newest first
+            models.Index(fields=['sales_staff', 'date'], name='sales_order_staff_date_idx'),
+            models.Index(fields=['date', 'time_stamp'], name='sales_order_date_time_idx'),
+        ]
 
     def __str__(self):
         """
@@ -68,7 +98,7 @@ class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     drug = models.ForeignKey(Medication, on_delete=models.CASCADE)
     quantity = models.IntegerField(blank=True)
-    price = models.CharField(max_length=20, blank=True)
+    price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
 
     class Meta:
         unique_together = ['order', 'drug']
@@ -79,4 +109,19 @@ class OrderItem(models.Model):
         """
         return f'{self.order}, {self.drug}, {self.quantity}'
 
+    def save(self, *args, **kwargs):
+        """
+        saves the line in a transaction, so its stored row stays locked from the sales.signals receiver reading
+        its amount to the order's total being adjusted by the difference
+        """
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+    @property
+    def amount(self):
+        """
+        what the line adds to its order's total
+        """
+        return (self.quantity or 0) * (self.price or 0)
+
 
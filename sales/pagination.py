@@ -0,0 +1,78 @@
+from datetime import date
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
+
+
+class HistoryCursorPagination(CursorPagination):
+    """
+    keyset pagination over cart and order history, newest first.
+    rest_framework's cursor only remembers its first ordering column and counts its way past rows sharing it,
+    which on busy days means scanning every earlier sale of the day. this cursor holds the whole
+    (date, time_stamp, pk) of the row it stopped at, so every page is one range scan of the (date, time_stamp) index
+    """
+    ordering = ('-date', '-time_stamp', '-pk')
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        fields = [field.lstrip('-') for field in self.ordering]
+        """ a previous page is read backwards from its cursor, then flipped """
+        queryset = queryset.order_by(*[field if reverse else f'-{field}' for field in fields])
+        if self.cursor is not None:
+            queryset = queryset.filter(self.beyond(self.parse_position(self.cursor.position), reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, more
+        else:
+            self.has_next, self.has_previous = more, self.cursor is not None
+        return self.page
+
+    def beyond(self, position, reverse):
+        """
+        rows after position in the page order, i.e. (date, time_stamp, pk) < position, or > when reading backwards.
+        the redundant bound on date keeps the scan within the index range
+        """
+        lookup = 'gt' if reverse else 'lt'
+        day, time_stamp, pk = position
+        return Q(**{f'date__{lookup}e': day}) & (
+            Q(**{f'date__{lookup}': day}) |
+            Q(date=day, **{f'time_stamp__{lookup}': time_stamp}) |
+            Q(date=day, time_stamp=time_stamp, **{f'pk__{lookup}': pk})
+        )
+
+    def parse_position(self, position):
+        try:
+            day, time_stamp, pk = position.split('|')
+            position = date.fromisoformat(day), parse_datetime(time_stamp), pk
+        except (AttributeError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[1] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def position(self, instance):
+        return f'{instance.date.isoformat()}|{instance.time_stamp.isoformat()}|{instance.pk}'
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.position(self.page[0])))
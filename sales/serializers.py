@@ -1,35 +1,93 @@
+from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework import serializers
 from sales.models import Order, OrderItem, CartItem, Cart
-import bleach
+from stock.money import MoneyField
+from stock.inventory import take_stock
+from stock.serializers import CachedMedicationField, MedicationSerializer
+from users.models import RetailStaff
+from django.conf import settings
 import logging
 
 
 log = logging.getLogger('main')
 
-class CartSerializer(serializers.ModelSerializer):
+CART_ITEMS = getattr(settings, 'CART_ITEMS', {})
+
+
+def requested_expansions(request):
+    """
+    returns the names in a GET request's comma separated `?expand=` parameter
+    """
+    if request is None or request.method != 'GET' or not request.query_params.get('expand', None):
+        return set()
+    return set(name.strip() for name in request.query_params['expand'].split(','))
+
+
+class StaffSerializer(serializers.ModelSerializer):
+    """
+    serializes the public details of the staff who made a sale
+    """
+    class Meta:
+        model = RetailStaff
+        fields = ['id', 'email', 'username', 'first_name', 'last_name']
+
+
+class ExpandMixin:
+    """
+    nests the related objects named in a GET request's `?expand=` parameter (items, items.drug and sales_staff)
+    in place of their primary keys. views fetch them up front with expand_queryset, so nesting costs no query per row
+    """
+    # reverse accessor of the cart or order lines
+    items_source = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = requested_expansions(self.context.get('request', None))
+        if 'sales_staff' in expand:
+            self.fields['sales_staff'] = StaffSerializer(read_only=True)
+        if 'items' in expand or 'items.drug' in expand:
+            self.fields['items'] = self.items_field('items.drug' in expand)
+
+    def items_field(self, expand_drug):
+        raise NotImplementedError
+
+    @classmethod
+    def expand_queryset(cls, queryset, request):
+        """
+        joins or prefetches what the request expands, one query per expanded relation however many rows are serialized
+        """
+        expand = requested_expansions(request)
+        if 'sales_staff' in expand:
+            queryset = queryset.select_related('sales_staff')
+        if 'items.drug' in expand:
+            items = getattr(queryset.model, cls.items_source).rel.related_model.objects.select_related('drug')
+            queryset = queryset.prefetch_related(Prefetch(cls.items_source, queryset=items))
+        elif 'items' in expand:
+            queryset = queryset.prefetch_related(cls.items_source)
+        return queryset
+
+class CartSerializer(ExpandMixin, serializers.ModelSerializer):
     """
     serializes the cart model
     """
+    items_source = 'cartitem_set'
+    # maintained by the server from the lines, see sales.signals
+    total_price = MoneyField(read_only=True)
 
     class Meta:
         model = Cart
         fields = '__all__'
 
+    def items_field(self, expand_drug):
+        serializer = ExpandedCartItemSerializer if expand_drug else CartItemSerializer
+        return serializer(source=self.items_source, many=True, read_only=True)
+
     def validate(self, attrs):
         """
         validates the data entered into the serializer class
         """
         log.info(f'validating cart data from request')
-        total_price = bleach.clean(attrs['total_price'], strip=True)
-
-        if total_price != attrs['total_price']:
-            log.error(f'validation of cart data from request failed because invalid total_price characters were entered')
-            raise serializers.ValidationError("You have entered invalid characters")   
-        
-        if len(total_price) > 20:
-            log.error(f'validation of cart data from request failed because the character limit for total_price was exceeded')
-            raise serializers.ValidationError("You have exceeded the allowed characters")   
-                
         return attrs
 
     def create(self, validated_data):
@@ -53,6 +111,9 @@ class CartItemSerializer(serializers.ModelSerializer):
     """
     serializes the cart_item model
     """
+    drug = CachedMedicationField()
+    # fixed by the server from the medication's price when the line is added, see sales.signals
+    price = MoneyField(read_only=True)
 
     class Meta:
         model = CartItem
@@ -63,16 +124,6 @@ class CartItemSerializer(serializers.ModelSerializer):
         validates the data entered into the serializer class
         """
         log.info(f'validating cart_item data from request')
-        price = bleach.clean(attrs['price'], strip=True)
-
-        if price != attrs['price']:
-            log.error(f'validation of cart_item data from request failed because invalid price characters were entered')
-            raise serializers.ValidationError("You have entered invalid price characters")   
-        
-        if len(price) > 20:
-            log.error(f'validation of cart_item data from request failed because the character limit for price was exceeded')
-            raise serializers.ValidationError("You have exceeded the allowed characters")   
-                
         return attrs
 
     def create(self, validated_data):
@@ -80,42 +131,54 @@ class CartItemSerializer(serializers.ModelSerializer):
         creates a new cart_item
         """
         log.info(f'creating a new cart_item using the request data via the cart_item_serializer class')
+        """ the cart's running total is adjusted by the sales.signals receivers in the same transaction """
+        with transaction.atomic():
+            cart_item = super(CartItemSerializer, self).create(validated_data)
         log.info(f'new cart_item has been created successfully via the cart_item_serializer class')
-        return super(CartItemSerializer, self).create(validated_data)
+        return cart_item
     
     def update(self, instance, validated_data):
         """
         updates an existing cart_item
         """
         log.info(f'updating an existing cart_item using the request data via the cart_item_serializer class')
+        if 'drug' in validated_data and validated_data['drug'].pk != instance.drug_id:
+            """ a line switched to another medication is priced again at that one's price """
+            instance.price = None
+        with transaction.atomic():
+            cart_item = super(CartItemSerializer, self).update(instance, validated_data)
         log.info(f'existing cart_item has been updated successfully via the cart_item_serializer class')
-        return super(CartItemSerializer, self).update(instance, validated_data)
+        return cart_item
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class ExpandedCartItemSerializer(CartItemSerializer):
+    """
+    serializes the cart_item model with its medication nested
+    """
+    drug = MedicationSerializer(read_only=True)
+
+
+class OrderSerializer(ExpandMixin, serializers.ModelSerializer):
     """
     serializes the order model
     """
+    items_source = 'orderitem_set'
+    # maintained by the server from the lines, see sales.signals
+    total_price = MoneyField(read_only=True)
 
     class Meta:
         model = Order
         fields = '__all__'
 
+    def items_field(self, expand_drug):
+        serializer = ExpandedOrderItemSerializer if expand_drug else OrderItemSerializer
+        return serializer(source=self.items_source, many=True, read_only=True)
+
     def validate(self, attrs):
         """
         validates the data entered into the serializer class
         """
         log.info(f'validating order data from request')
-        total_price = bleach.clean(attrs['total_price'], strip=True)
-
-        if total_price != attrs['total_price']:
-            log.error(f'validation of order data from request failed because invalid total_price characters were entered')
-            raise serializers.ValidationError("You have entered invalid characters")   
-        
-        if len(total_price) > 20:
-            log.error(f'validation of order data from request failed because the character limit for total_price was exceeded')
-            raise serializers.ValidationError("You have exceeded the allowed characters")   
-                
         return attrs
 
     def create(self, validated_data):
@@ -139,6 +202,9 @@ class OrderItemSerializer(serializers.ModelSerializer):
     """
     serializes the order_item model
     """
+    drug = CachedMedicationField()
+    # fixed by the server from the medication's price when the line is added, see sales.signals
+    price = MoneyField(read_only=True)
 
     class Meta:
         model = OrderItem
@@ -149,30 +215,73 @@ class OrderItemSerializer(serializers.ModelSerializer):
         validates the data entered into the serializer class
         """
         log.info(f'validating order_item data from request')
-        price = bleach.clean(attrs['price'], strip=True)
-
-        if price != attrs['price']:
-            log.error(f'validation of order data from request failed because invalid price characters were entered')
-            raise serializers.ValidationError("You have entered invalid price characters")   
-        
-        if len(price) > 20:
-            log.error(f'validation of order data from request failed because the character limit for price was exceeded')
-            raise serializers.ValidationError("You have exceeded the allowed characters")   
-                
+        quantity = attrs.get('quantity', None)
+        if self.instance is None and (quantity is None or quantity < 1):
+            log.error(f'validation of order_item data from request failed because quantity is not a positive number')
+            raise serializers.ValidationError({'quantity': 'quantity must be at least 1'})
         return attrs
 
     def create(self, validated_data):
         """
-        creates a new order_item
+        creates a new order_item and takes its quantity from the medication's stock in the same transaction.
+        raises stock.inventory.InsufficientStock, leaving nothing behind, when the stock is too low
         """
         log.info(f'creating a new order_item using the request data via the order_item_serializer class')
+        with transaction.atomic():
+            order_item = super(OrderItemSerializer, self).create(validated_data)
+            """ taken last so the medication row is locked for as short as possible """
+            take_stock(validated_data['drug'], validated_data['quantity'])
         log.info(f'new order_item has been created successfully via the order_item_serializer class')
-        return super(OrderItemSerializer, self).create(validated_data)
+        return order_item
     
     def update(self, instance, validated_data):
         """
         updates an existing order_item
         """
         log.info(f'updating an existing order_item using the request data via the order_item_serializer class')
+        if 'drug' in validated_data and validated_data['drug'].pk != instance.drug_id:
+            """ a line switched to another medication is priced again at that one's price """
+            instance.price = None
+        with transaction.atomic():
+            order_item = super(OrderItemSerializer, self).update(instance, validated_data)
         log.info(f'existing order_item has been updated successfully via the order_item_serializer class')
-        return super(OrderItemSerializer, self).update(instance, validated_data)
+        return order_item
+
+
+class ExpandedOrderItemSerializer(OrderItemSerializer):
+    """
+    serializes the order_item model with its medication nested
+    """
+    drug = MedicationSerializer(read_only=True)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    """
+    validates a checkout request, `cart_id` identifies the cart to turn into an order
+    """
+    cart_id = serializers.UUIDField()
+
+
+class CartLineSerializer(serializers.Serializer):
+    """
+    validates one line of a bulk add to cart
+    """
+    drug = CachedMedicationField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class CartItemsUpsertSerializer(serializers.Serializer):
+    """
+    validates a bulk add to cart: `items` lists the {drug, quantity} lines to add to `cart`
+    """
+    cart = serializers.UUIDField()
+    items = serializers.ListField(child=CartLineSerializer(), allow_empty=False, max_length=CART_ITEMS.get('MAX_LINES', 500))
+
+
+class CartLinesSerializer(serializers.Serializer):
+    """
+    serializes the lines of a cart with their total
+    """
+    cart = serializers.UUIDField()
+    items = CartItemSerializer(many=True)
+    total_price = MoneyField()
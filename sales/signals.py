@@ -0,0 +1,92 @@
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from sales.models import CartItem, OrderItem
+from stock.models import Medication
+from sales.totals import PARENTS, adjust_total
+import logging
+
+log = logging.getLogger('main')
+
+
+@receiver(pre_save, sender=CartItem)
+@receiver(pre_save, sender=OrderItem)
+def price_line(sender, instance, **kwargs):
+    """
+    fixes the price of a line saved without one at its medication's current price,
+    so running totals don't move when the catalog price does.
+    the price is read from the database, the line's drug may be a stale or cached instance
+    """
+    if instance.price is None:
+        instance.price = Medication.objects.values_list('price', flat=True).get(pk=instance.drug_id)
+
+
+def locked_line(sender, instance):
+    """
+    returns (parent id, amount) of the stored row of a line, locked until the end of the transaction,
+    or (parent id, 0) when it isn't stored. a concurrent edit of the line waits for this one to adjust the total
+    """
+    model, field = PARENTS[sender]
+    stored = sender.objects.select_for_update().filter(pk=instance.pk).values_list(f'{field}_id', 'quantity', 'price').first()
+    if stored is None:
+        return getattr(instance, f'{field}_id'), 0
+    parent_id, quantity, price = stored
+    return parent_id, (quantity or 0) * (price or 0)
+
+
+@receiver(pre_save, sender=CartItem)
+@receiver(pre_save, sender=OrderItem)
+def lock_saved_line(sender, instance, **kwargs):
+    """
+    reads the stored amount of an updated line under a row lock, taken in the line's save transaction
+    """
+    if not instance._state.adding:
+        instance._loaded_line = locked_line(sender, instance)
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_save, sender=OrderItem)
+def total_saved_line(sender, instance, created, **kwargs):
+    """
+    adds the change of a saved line's amount to its parent's running total, in the saving transaction
+    """
+    model, field = PARENTS[sender]
+    parent_id, amount = getattr(instance, f'{field}_id'), instance.amount
+    loaded_parent_id, loaded_amount = (parent_id, 0) if created else getattr(instance, '_loaded_line', (parent_id, 0))
+
+    log.info(f'adjusting the running total of the {field} of a saved line')
+    if loaded_parent_id == parent_id:
+        adjust_total(model, parent_id, amount - loaded_amount)
+    else:
+        adjust_total(model, loaded_parent_id, -loaded_amount)
+        adjust_total(model, parent_id, amount)
+
+
+def deleted_with_parent(sender, origin):
+    model, field = PARENTS[sender]
+    return isinstance(origin, model) or (isinstance(origin, QuerySet) and origin.model is model)
+
+
+@receiver(pre_delete, sender=CartItem)
+@receiver(pre_delete, sender=OrderItem)
+def lock_deleted_line(sender, instance, origin=None, **kwargs):
+    """
+    reads the stored amount of a deleted line under a row lock, taken in the deletion's transaction
+    """
+    if not deleted_with_parent(sender, origin):
+        instance._loaded_line = locked_line(sender, instance)
+
+
+@receiver(post_delete, sender=CartItem)
+@receiver(post_delete, sender=OrderItem)
+def total_deleted_line(sender, instance, origin=None, **kwargs):
+    """
+    takes a deleted line's amount off its parent's running total, unless the parent is deleted with it
+    """
+    if deleted_with_parent(sender, origin):
+        return
+
+    model, field = PARENTS[sender]
+    log.info(f'adjusting the running total of the {field} of a deleted line')
+    parent_id, amount = getattr(instance, '_loaded_line', (getattr(instance, f'{field}_id'), instance.amount))
+    adjust_total(model, parent_id, -amount)
@@ -0,0 +1,51 @@
+from decimal import Decimal
+from django.db.models import F, Sum, Value, OuterRef, Subquery, DecimalField
+from django.db.models.functions import Coalesce
+from sales.models import Cart, CartItem, Order, OrderItem
+import logging
+
+log = logging.getLogger('main')
+
+# a line sells at its own price, or at its medication's price for lines stored before prices were fixed on save
+UNIT_PRICE = Coalesce('price', 'drug__price', output_field=DecimalField(max_digits=12, decimal_places=2))
+
+# the model whose running total each line model adds to, and the line's field pointing at it
+PARENTS = {CartItem: (Cart, 'cart'), OrderItem: (Order, 'order')}
+
+
+def adjust_total(model, pk, delta):
+        """
+        adds delta to the running total of the cart or order identified by pk with
+        UPDATE ... SET total_price = total_price + delta, so concurrent adjustments add up instead of overwriting each other
+        """
+        if pk is None or not delta:
+            return
+        model.objects.filter(pk=pk).update(total_price=F('total_price') + delta)
+
+
+def computed_total(line_model):
+        """
+        an expression of a parent's total recomputed from its lines by the database
+        """
+        model, field = PARENTS[line_model]
+        lines = line_model.objects.filter(**{field: OuterRef('pk')}).values(field).annotate(total=Sum(F('quantity') * UNIT_PRICE)).values('total')
+        return Coalesce(Subquery(lines), Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def find_drift(line_model):
+        """
+        returns (pk, stored total, computed total) of the parents of line_model whose running total
+        differs from the sum of their lines, with a single aggregate query
+        """
+        model, field = PARENTS[line_model]
+        drifted = model.objects.annotate(computed=computed_total(line_model)).exclude(total_price=F('computed'))
+        return list(drifted.values_list('pk', 'total_price', 'computed'))
+
+
+def fix_drift(line_model, pks):
+        """
+        overwrites the running totals of the given parents with the sum of their lines
+        """
+        model, field = PARENTS[line_model]
+        log.info(f'rewriting the totals of {len(pks)} {model._meta.model_name}s')
+        return model.objects.filter(pk__in=pks).update(total_price=computed_total(line_model))
@@ -1,4 +1,16 @@
 from django.urls import path
+from rest_framework import routers
+from sales.views import CartViewSet, CartItemViewSet, OrderViewSet, OrderItemViewSet
+
+
+router = routers.SimpleRouter()
+router.register(r'api/v1/cart', CartViewSet, basename='cart')
+router.register(r'api/v1/cart-item', CartItemViewSet, basename='cart-item')
+router.register(r'api/v1/order', OrderViewSet, basename='order')
+router.register(r'api/v1/order-item', OrderItemViewSet, basename='order-item')
+
 
 urlpatterns = [
 ]
+
+urlpatterns += router.urls
@@ -1,21 +1,54 @@
 from rest_framework.response import Response
-from users.permissions import get_user
 from rest_framework import status, viewsets
-from datetime import datetime, timedelta
+from rest_framework.decorators import action
+from datetime import date, datetime, timedelta
+from uuid import UUID
 from django.utils import timezone
-from users.models import Owner, RetailStaff, AdminStaff
+from django.core.exceptions import ValidationError
 from sales.models import Order, OrderItem, Cart, CartItem
-from sales.serializers import OrderSerializer, OrderItemSerializer, CartSerializer, CartItemSerializer
+from sales.serializers import OrderSerializer, OrderItemSerializer, CartSerializer, CartItemSerializer, CheckoutSerializer, CartItemsUpsertSerializer, CartLinesSerializer
+from sales.carts import add_to_cart
+from sales.checkout import checkout, CheckoutRejected
+from sales.pagination import HistoryCursorPagination
+from stock.inventory import InsufficientStock
 import logging
 
 log = logging.getLogger('main')
 
+
+def filter_history(queryset, request):
+    """
+    narrows cart or order history to the inclusive `?from=` and `?to=` iso dates and to the `?staff=` id.
+    retail staff only see their own, by default today's. returns None when a filter is invalid
+    """
+    params = request.query_params
+    try:
+        start = date.fromisoformat(params['from']) if params.get('from', None) else None
+        end = date.fromisoformat(params['to']) if params.get('to', None) else None
+        staff = UUID(params['staff']) if params.get('staff', None) else None
+    except ValueError:
+        return None
+
+    if not (request.user.is_owner or request.user.is_admin_staff):
+        staff = request.user.pk
+        if start is None and end is None:
+            start = end = timezone.localdate()
+    if staff is not None:
+        queryset = queryset.filter(sales_staff_id=staff)
+    if start is not None:
+        queryset = queryset.filter(date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(date__lte=end)
+    return queryset
+
+
 class CartViewSet(viewsets.ModelViewSet):
     """
     suite for performing crud operations on the cart model
     """
     serializer_class = CartSerializer
     queryset = Cart.objects.all()
+    pagination_class = HistoryCursorPagination
     search_fields = ['sales_staff', 'times_tamp'] 
 
     def create(self, request):
@@ -25,13 +58,12 @@ class CartViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating create_cart function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if isinstance(request.user, RetailStaff):
-            serializer = self.serializer_class(data=request.data)
+        if request.user.is_retail_staff:
+            serializer = self.get_serializer(data=request.data)
             if serializer.is_valid():
                 serializer.save()
                 log.info(f'cart request data has been validated and new order has been created')
@@ -51,21 +83,20 @@ class CartViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating get_cart function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
         
         try:
             log.info(f'retrieving the cart instance')
-            cart = Cart.objects.get(pk=pk)
-        except Cart.DoesNotExist:
+            cart = CartSerializer.expand_queryset(Cart.objects.all(), request).get(pk=pk)
+        except (Cart.DoesNotExist, ValidationError):
             log.error(f'cart instance cant be found on the database')
-            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'the requested cart does not exist'})  
+            return Response({'status': status.HTTP_404_NOT_FOUND, 'detail': 'the requested cart does not exist'})  
 
-        if request.user.pk == cart.sales_staff.pk or isinstance(request.user, Owner) or isinstance(request.user, AdminStaff):
+        if request.user.pk == cart.sales_staff_id or request.user.is_owner or request.user.is_admin_staff:
             log.info(f'cart instance has been successfully retrieved')
-            serializer = self.serializer_class(cart)
+            serializer = self.get_serializer(cart)
             return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail' : 'cart has been retrieved successfully'})
                  
         else:
@@ -80,32 +111,27 @@ class CartViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating list_cart function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
-        
-
-        if isinstance(request.user, Owner) or isinstance(request.user, AdminStaff):
-            log.info(f'retrieving the cart for {request.user.email}')
-            carts = Cart.objects.all()
-            if carts.count() > 0:
-                log.info(f'carts with count {carts.count()} have been retrieved')
-                serializer = self.serializer_class(carts, many=True)
-                return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail': 'the requested carts has been retrieved successfully'})
-        
-        elif isinstance(request.user, RetailStaff):
-            log.info(f'retrieving the carts for {request.user.email}')
-            carts = Cart.objects.filter(sales_staff__pk=request.user.pk).filter(date=timezone.today())
-            if carts.count() > 0:
-                log.info(f'carts with count {carts.count()} have been retrieved')
-                serializer = self.serializer_class(carts, many=True)
-                return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail': 'the requested carts has been retrieved successfully'})
 
-        else:
+        if not (request.user.is_owner or request.user.is_admin_staff or request.user.is_retail_staff):
             log.error(f'requesting user does not have permission to retrieve cart')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you dont have the permission to perform this action'})
 
+        log.info(f'retrieving the carts for {request.user.email}')
+        carts = filter_history(Cart.objects.all(), request)
+        if carts is None:
+            log.error(f'list of carts could not be retrieved because of invalid filters')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'from and to must be iso 8601 dates and staff a staff id'})
+
+        page = self.paginate_queryset(CartSerializer.expand_queryset(carts, request))
+        log.info(f'page of {len(page)} carts has been retrieved')
+        serializer = self.get_serializer(page, many=True)
+        return Response({"status": status.HTTP_200_OK, 'data': serializer.data,
+                         'next': self.paginator.get_next_link(), 'previous': self.paginator.get_previous_link(),
+                         'detail': 'the requested carts has been retrieved successfully'})
+
     def destroy(self, request, pk=None):
         """
         deletes an instance of a cart
@@ -113,13 +139,12 @@ class CartViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating delete_cart function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
         
 
-        if isinstance(request.user, Owner):
+        if request.user.is_owner:
             log.info(f'retrieving the cart for deletion')
             try:
                 cart = Cart.objects.get(pk=pk)
@@ -152,13 +177,12 @@ class CartItemViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating create_cart_item function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if isinstance(request.user, RetailStaff):
-            serializer = self.serializer_class(data=request.data)
+        if request.user.is_retail_staff:
+            serializer = self.get_serializer(data=request.data)
             if serializer.is_valid():
                 serializer.save()
                 log.info(f'cart_item request data has been validated and new cart_item has been created')
@@ -171,6 +195,40 @@ class CartItemViewSet(viewsets.ModelViewSet):
             log.error(f'requesting user does not have permission to create new cart_item')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission to create new cart_item'})
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        adds many {drug, quantity} `items` to `cart` in one statement, a drug already in the cart
+        has its quantity increased. returns every line of the cart with its total.
+        called by only the retail_staff who created the cart
+        """
+        log.info(f'instantiating bulk_cart_item function')
+        log.info(f'validating requesting user')
+        if not request.user.is_authenticated:
+            log.error(f'requesting user could not be validated')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})
+
+        if not request.user.is_retail_staff:
+            log.error(f'requesting user does not have permission to add cart_items')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission to add cart_items'})
+
+        serializer = CartItemsUpsertSerializer(data=request.data)
+        if not serializer.is_valid():
+            log.error(f'cart_items request data could not be validated so no cart_item was added')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'error': serializer.errors, 'detail': 'cart_items could not be added due to cart_items_serializer validation errors'})
+
+        cart_id = serializer.validated_data['cart']
+        lines = [(line['drug'], line['quantity']) for line in serializer.validated_data['items']]
+        try:
+            items, total = add_to_cart(cart_id, request.user.pk, lines)
+        except Cart.DoesNotExist:
+            log.error(f'cart instance cant be found on the database')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'the requested cart does not exist'})
+
+        log.info(f'{len(lines)} lines have been added to the cart')
+        data = CartLinesSerializer({'cart': cart_id, 'items': items, 'total_price': total}, context=self.get_serializer_context()).data
+        return Response({'status': status.HTTP_200_OK, 'data': data, 'detail': f'{len(lines)} lines have been added to the cart'})
+
     def retrieve(self, request, pk=None):
         """
         handles retrieval of details of a cart_item instance identified by pk.
@@ -178,8 +236,7 @@ class CartItemViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating get_cart_item function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
         
@@ -190,9 +247,9 @@ class CartItemViewSet(viewsets.ModelViewSet):
             log.error(f'cart_item instance cant be found on the database')
             return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'the requested cart_item does not exist'})  
 
-        if request.user.pk == cart_item.cart.sales_staff.pk or isinstance(request.user, Owner) or isinstance(request.user, AdminStaff):
+        if request.user.pk == cart_item.cart.sales_staff_id or request.user.is_owner or request.user.is_admin_staff:
             log.info(f'cart_item instance has been successfully retrieved')
-            serializer = self.serializer_class(cart_item)
+            serializer = self.get_serializer(cart_item)
             return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail' : 'cart_item has been retrieved successfully'})
                  
         else:
@@ -207,8 +264,7 @@ class CartItemViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating list_cart_item function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
         
@@ -217,7 +273,7 @@ class CartItemViewSet(viewsets.ModelViewSet):
             log.error(f'pk for cart containing cart_items was not sent along with request data')
             return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'pk for cart containing cart_items was not sent along with request data'})  
 
-        if isinstance(request.user, Owner) or isinstance(request.user, AdminStaff):
+        if request.user.is_owner or request.user.is_admin_staff:
             log.info(f'retrieving the cart_items for {request.user.email}')
             log.info(f'retrieving the pk for the cart containing cart items')
             try:
@@ -229,11 +285,11 @@ class CartItemViewSet(viewsets.ModelViewSet):
             log.info(f'cart containing cart_items has been successfully retrieved')
             cart_items = CartItem.objects.filter(cart=cart)
             if cart_items.count() > 0:
-                serializer = self.serializer_class(cart_items, many=True)
+                serializer = self.get_serializer(cart_items, many=True)
                 log.info(f'cart_items with count {cart_items.count()} have been retrieved')
                 return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail': 'the requested cart_items have been retrieved successfully'})
         
-        elif isinstance(request.user, RetailStaff):
+        elif request.user.is_retail_staff:
             log.info(f'retrieving the cart_items for {request.user.email}')
             log.info(f'retrieving the pk for the order containing order items')
             try:
@@ -242,12 +298,12 @@ class CartItemViewSet(viewsets.ModelViewSet):
                 log.error(f'cart instance cant be found on the database')
                 return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'the requested cart containing the cart_items does not exist'})  
 
-            if request.user.pk == cart.sales_staff.pk:
+            if request.user.pk == cart.sales_staff_id:
                 log.info(f'cart containing cart_items has been successfully retrieved')
                 cart_items = CartItem.objects.filter(cart=cart)
                 if cart_items.count() > 0:
                     log.info(f'cart_items with count {cart_items.count()} have been retrieved')
-                    serializer = self.serializer_class(cart_items, many=True)
+                    serializer = self.get_serializer(cart_items, many=True)
                     log.info(f'cart_items with count {cart_items.count()} have been retrieved')
                     return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail': 'the requested cart_items have been retrieved successfully'})
 
@@ -262,13 +318,12 @@ class CartItemViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating delete_cart_item function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
         
 
-        if isinstance(request.user, Owner):
+        if request.user.is_owner:
             log.info(f'retrieving the cart_item for deletion')
             try:
                 cart_item = CartItem.objects.get(pk=pk)
@@ -292,6 +347,7 @@ class OrderViewSet(viewsets.ModelViewSet):
     """
     serializer_class = OrderSerializer
     queryset = Order.objects.all()
+    pagination_class = HistoryCursorPagination
     search_fields = ['sales_staff', 'times_tamp'] 
 
     def create(self, request):
@@ -301,13 +357,12 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating create_order function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if isinstance(request.user, RetailStaff):
-            serializer = self.serializer_class(data=request.data)
+        if request.user.is_retail_staff:
+            serializer = self.get_serializer(data=request.data)
             if serializer.is_valid():
                 serializer.save()
                 log.info(f'order request data has been validated and new order has been created')
@@ -320,6 +375,44 @@ class OrderViewSet(viewsets.ModelViewSet):
             log.error(f'requesting user does not have permission to create new order')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission to create new order'})
 
+    @action(detail=False, methods=['post'], url_path='checkout')
+    def checkout(self, request):
+        """
+        turns the cart identified by `cart_id` into an order in a single request and transaction:
+        the order items are copied from the cart items, the total is computed, stock is taken and the cart is deleted.
+        called by only the retail_staff who created the cart
+        """
+        log.info(f'instantiating checkout_cart function')
+        log.info(f'validating requesting user')
+        if not request.user.is_authenticated:
+            log.error(f'requesting user could not be validated')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})
+
+        if not request.user.is_retail_staff:
+            log.error(f'requesting user does not have permission to check out a cart')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission to check out a cart'})
+
+        serializer = CheckoutSerializer(data=request.data)
+        if not serializer.is_valid():
+            log.error(f'checkout request data could not be validated so no order was created')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'error': serializer.errors, 'detail': 'cart could not be checked out due to checkout_serializer validation errors'})
+
+        try:
+            order, order_items = checkout(serializer.validated_data['cart_id'], request.user.pk)
+        except Cart.DoesNotExist:
+            log.error(f'cart instance cant be found on the database')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'the requested cart does not exist'})
+        except CheckoutRejected as error:
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': f'cart could not be checked out because {error}'})
+        except InsufficientStock as error:
+            log.error(f'cart was not checked out because a medication is out of stock')
+            return Response({'status': status.HTTP_409_CONFLICT, 'detail': str(error)})
+
+        log.info(f'cart has been checked out and new order has been created')
+        data = self.get_serializer(order).data
+        data['items'] = OrderItemSerializer(order_items, many=True, context=self.get_serializer_context()).data
+        return Response({'status': status.HTTP_201_CREATED, 'data': data, 'detail': 'cart has been checked out successfully'})
+
     def retrieve(self, request, pk=None):
         """
         handles retrieval of details of an order instance identified by pk .
@@ -327,21 +420,20 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating get_order function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
         
         try:
             log.info(f'retrieving the order instance')
-            order = Order.objects.get(pk=pk)
-        except Order.DoesNotExist:
+            order = OrderSerializer.expand_queryset(Order.objects.all(), request).get(pk=pk)
+        except (Order.DoesNotExist, ValidationError):
             log.error(f'order instance cant be found on the database')
-            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'the requested order does not exist'})  
+            return Response({'status': status.HTTP_404_NOT_FOUND, 'detail': 'the requested order does not exist'})  
 
-        if request.user.pk == order.sales_staff.pk or isinstance(request.user, Owner) or isinstance(request.user, AdminStaff):
+        if request.user.pk == order.sales_staff_id or request.user.is_owner or request.user.is_admin_staff:
             log.info(f'order instance has been successfully retrieved')
-            serializer = self.serializer_class(order)
+            serializer = self.get_serializer(order)
             return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail' : 'order has been retrieved successfully'})
                  
         else:
@@ -356,32 +448,27 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating list_order function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
-        
-
-        if isinstance(request.user, Owner) or isinstance(request.user, AdminStaff):
-            log.info(f'retrieving the order for {request.user.email}')
-            orders = Order.objects.all()
-            if orders.count() > 0:
-                log.info(f'orders with count {orders.count()}')
-                serializer = self.serializer_class(orders, many=True)
-                return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail': 'the requested orders has been retrieved successfully'})
-        
-        elif isinstance(request.user, RetailStaff):
-            log.info(f'retrieving the order for {request.user.email}')
-            orders = Order.objects.filter(sales_staff__pk=request.user.pk).filter(date=timezone.today())
-            if orders.count() > 0:
-                log.info(f'orders with count {orders.count()} have been retrieved')
-                serializer = self.serializer_class(orders, many=True)
-                return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail': 'the requested orders has been retrieved successfully'})
 
-        else:
+        if not (request.user.is_owner or request.user.is_admin_staff or request.user.is_retail_staff):
             log.error(f'requesting user does not have permission to retrieve order')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you dont have the permission to perform this action'})
 
+        log.info(f'retrieving the orders for {request.user.email}')
+        orders = filter_history(Order.objects.all(), request)
+        if orders is None:
+            log.error(f'list of orders could not be retrieved because of invalid filters')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'from and to must be iso 8601 dates and staff a staff id'})
+
+        page = self.paginate_queryset(OrderSerializer.expand_queryset(orders, request))
+        log.info(f'page of {len(page)} orders has been retrieved')
+        serializer = self.get_serializer(page, many=True)
+        return Response({"status": status.HTTP_200_OK, 'data': serializer.data,
+                         'next': self.paginator.get_next_link(), 'previous': self.paginator.get_previous_link(),
+                         'detail': 'the requested orders has been retrieved successfully'})
+
     def destroy(self, request, pk=None):
         """
         deletes an instance of an order
@@ -389,13 +476,12 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating delete_order function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
         
 
-        if isinstance(request.user, Owner):
+        if request.user.is_owner:
             log.info(f'retrieving the order for deletion')
             try:
                 order = Order.objects.get(pk=pk)
@@ -428,15 +514,18 @@ class OrderItemViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating create_order_item function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if isinstance(request.user, RetailStaff):
-            serializer = self.serializer_class(data=request.data)
+        if request.user.is_retail_staff:
+            serializer = self.get_serializer(data=request.data)
             if serializer.is_valid():
-                serializer.save()
+                try:
+                    serializer.save()
+                except InsufficientStock as error:
+                    log.error(f'new order_item was not created because the medication is out of stock')
+                    return Response({'status': status.HTTP_409_CONFLICT, 'detail': str(error)})
                 log.info(f'order_item request data has been validated and new order_item has been created')
                 return Response({"status": status.HTTP_201_CREATED, 'data': serializer.data, 'detail' : 'new order_item has been created successfully '})
             else:
@@ -454,8 +543,7 @@ class OrderItemViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating get_order_item function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
         
@@ -466,9 +554,9 @@ class OrderItemViewSet(viewsets.ModelViewSet):
             log.error(f'order_item instance cant be found on the database')
             return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'the requested order_item does not exist'})  
 
-        if request.user.pk == order_item.order.sales_staff.pk or isinstance(request.user, Owner) or isinstance(request.user, AdminStaff):
+        if request.user.pk == order_item.order.sales_staff_id or request.user.is_owner or request.user.is_admin_staff:
             log.info(f'order_item instance has been successfully retrieved')
-            serializer = self.serializer_class(order_item)
+            serializer = self.get_serializer(order_item)
             return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail' : 'order_item has been retrieved successfully'})
                  
         else:
@@ -483,8 +571,7 @@ class OrderItemViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating list_order_item function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
         
@@ -493,7 +580,7 @@ class OrderItemViewSet(viewsets.ModelViewSet):
             log.error(f'pk for order containing order items was not sent along with request data')
             return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'pk for order containing order items was not sent along with request data'})  
 
-        if isinstance(request.user, Owner) or isinstance(request.user, AdminStaff):
+        if request.user.is_owner or request.user.is_admin_staff:
             log.info(f'retrieving the order_items for {request.user.email}')
             log.info(f'retrieving the pk for the order containing order items')
             try:
@@ -506,11 +593,11 @@ class OrderItemViewSet(viewsets.ModelViewSet):
             order_items = OrderItem.objects.filter(order=order)
             if order_items.count() > 0:
                 log.info(f'order_items with count {order_items.count()} have been retrieved')
-                serializer = self.serializer_class(order_items, many=True)
+                serializer = self.get_serializer(order_items, many=True)
                 log.info(f'order_items with count {order_items.count()} have been retrieved')
                 return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail': 'the requested order_items have been retrieved successfully'})
         
-        elif isinstance(request.user, RetailStaff):
+        elif request.user.is_retail_staff:
             log.info(f'retrieving the order_items for {request.user.email}')
             log.info(f'retrieving the pk for the order containing order items')
             try:
@@ -519,11 +606,11 @@ class OrderItemViewSet(viewsets.ModelViewSet):
                 log.error(f'order instance cant be found on the database')
                 return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'the requested order containing the order_items does not exist'})  
 
-            if request.user.pk == order.sales_staff.pk:
+            if request.user.pk == order.sales_staff_id:
                 log.info(f'order containing order_items has been successfully retrieved')
                 order_items = OrderItem.objects.filter(order=order)
                 if order_items.count() > 0:
-                    serializer = self.serializer_class(order_items, many=True)
+                    serializer = self.get_serializer(order_items, many=True)
                     log.info(f'order_items with count {order_items.count()} have been retrieved')
                     return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail': 'the requested order_items have been retrieved successfully'})
 
@@ -538,13 +625,12 @@ class OrderItemViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating delete_order_item function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
         
 
-        if isinstance(request.user, Owner):
+        if request.user.is_owner:
             log.info(f'retrieving the order_item for deletion')
             try:
                 order_item = OrderItem.objects.get(pk=pk)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class StockConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stock'
+
+    def ready(self):
+        """
+        connects the medication search index signals
+        """
+        import stock.signals
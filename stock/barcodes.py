@@ -0,0 +1,50 @@
+from copy import copy
+from django.conf import settings
+from stock.models import Medication
+from stock.cache import catalog_cache
+import re
+import logging
+
+log = logging.getLogger('main')
+
+BARCODE_CACHE = getattr(settings, 'BARCODE_CACHE', {})
+
+# ean/upc digits or a store sku, letters digits and dashes
+BARCODE_PATTERN = re.compile(r'^[0-9A-Za-z-]{1,64}$')
+
+
+def lookup_barcodes(codes):
+        """
+        returns a dict of barcode to medication for the codes that match one,
+        reading through the catalog cache (barcode:<code> keys) with a single query for every code that isn't cached
+        """
+        found, missing = {}, []
+        for code in codes:
+            medication = catalog_cache.get(f'barcode:{code}')
+            if medication is None:
+                missing.append(code)
+            else:
+                found[code] = medication
+
+        if missing:
+            log.info(f'{len(missing)} scanned barcodes are not cached, retrieving them from the database')
+            generation = catalog_cache.generation
+            loaded = list(Medication.objects.filter(barcode__in=missing))
+            """ a change committed while loading may not be in the loaded rows, which are then served but not kept """
+            keep = generation == catalog_cache.generation
+            for medication in loaded:
+                if keep:
+                    catalog_cache.set(f'barcode:{medication.barcode}', medication)
+                found[medication.barcode] = medication
+
+        """ each request gets its own copies so changes to them never leak into the cache """
+        return {code: copy(medication) for code, medication in found.items()}
+
+
+def stored_barcodes(medication):
+        """
+        returns a medication's current and previously stored barcodes, whose cached scans a change of it invalidates
+        """
+        barcodes = {medication.barcode, getattr(medication, '_loaded_barcode', None)} - {None}
+        medication._loaded_barcode = medication.barcode
+        return barcodes
@@ -0,0 +1,180 @@
+from copy import copy
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from prometheus_client import Counter
+from stock.models import Medication
+from threading import Event, Lock
+from users.cache import TTLCache
+import logging
+
+log = logging.getLogger('main')
+
+CATALOG_CACHE = getattr(settings, 'CATALOG_CACHE', {})
+
+# seconds the local tier keeps entries when a shared tier backs it, other workers' changes show up after as long
+LOCAL_TIMEOUT = 5
+
+# exported through the django_prometheus /metrics endpoint
+catalog_lookups = Counter(
+    'catalog_cache_lookups_total',
+    'medication catalog cache lookups by tier and result',
+    ['tier', 'result'],
+)
+
+
+class Flight:
+    """
+    a load in progress, which concurrent misses of the same key wait on instead of loading again
+    """
+    def __init__(self):
+        self.done = Event()
+        self.value = None
+        self.error = None
+
+
+class CatalogCache:
+    """
+    read-through cache of the medication catalog.
+    every worker keeps a local in-memory tier, backed by an optional shared django cache (e.g. redis)
+    so a row loaded by one worker serves the others. entries are invalidated per key by the stock.signals
+    receivers and by the bulk writers that bypass them, listings hang off a generation bumped by every change.
+    a key missing from both tiers is loaded once per worker however many requests miss it at the same time.
+    """
+    def __init__(self, max_size=10000, timeout=300, shared=None, local_timeout=None, prefix='catalog'):
+        self.timeout = timeout
+        """ with a shared tier the local one can't hear of other workers' invalidations, so it is kept short lived """
+        self.local = TTLCache(max_size=max_size, ttl=local_timeout or (LOCAL_TIMEOUT if shared else timeout))
+        self.shared = caches[shared] if shared else None
+        self.prefix = prefix
+        self._generation = 0
+        self._flights = {}
+        self._lock = Lock()
+
+    def key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def get(self, key):
+        """
+        returns the cached value for key from the local tier, then the shared one, or None
+        """
+        value = self.local.get(key)
+        if value is not None:
+            catalog_lookups.labels('local', 'hit').inc()
+            return value
+        catalog_lookups.labels('local', 'miss').inc()
+
+        if self.shared is None:
+            return None
+        value = self.shared.get(self.key(key))
+        catalog_lookups.labels('shared', 'hit' if value is not None else 'miss').inc()
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(self.key(key), value, timeout=self.timeout)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(self.key(key))
+
+    @property
+    def generation(self):
+        """
+        a number bumped by every catalog change, cached listings are keyed on it
+        """
+        if self.shared is None:
+            return self._generation
+        return self.shared.get_or_set(self.key('generation'), 0, timeout=None)
+
+    def get_or_load(self, key, loader):
+        """
+        returns the cached value for key, or the value loader() returns, which is cached unless it is None.
+        concurrent misses of key in this worker share a single call of loader
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key, None)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        generation = self.generation
+        try:
+            flight.value = loader()
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        """ a change committed while loading may not be in the loaded value, which is then served but not kept """
+        if flight.value is not None and generation == self.generation:
+            self.set(key, flight.value)
+        return flight.value
+
+    def get_medication(self, drug_id):
+        """
+        returns a copy of the medication identified by drug_id, or None if it doesn't exist
+        """
+        def load():
+            log.info(f'medication is not cached, retrieving it from the database')
+            return Medication.objects.filter(pk=drug_id).first()
+
+        medication = self.get_or_load(f'medication:{drug_id}', load)
+        """ each request gets its own copy so changes to it never leak into the cache """
+        return copy(medication)
+
+    def invalidate(self, drug_ids, barcodes=()):
+        """
+        evicts the given medications, the scans of the given barcodes and every cached listing
+        """
+        for drug_id in drug_ids:
+            self.delete(f'medication:{drug_id}')
+        for barcode in barcodes:
+            self.delete(f'barcode:{barcode}')
+        if self.shared is None:
+            with self._lock:
+                self._generation += 1
+        else:
+            try:
+                self.shared.incr(self.key('generation'))
+            except ValueError:
+                self.shared.set(self.key('generation'), 1, timeout=None)
+
+    def invalidate_on_commit(self, drug_ids, barcodes=()):
+        """
+        invalidates the given medications and barcodes once the current transaction commits
+        """
+        drug_ids, barcodes = list(drug_ids), [barcode for barcode in barcodes if barcode is not None]
+        transaction.on_commit(lambda: self.invalidate(drug_ids, barcodes))
+
+    def clear(self):
+        self.local.clear()
+        with self._lock:
+            self._generation += 1
+        if self.shared is not None:
+            self.invalidate([])
+
+
+catalog_cache = CatalogCache(
+    max_size=CATALOG_CACHE.get('MAX_SIZE', 10000),
+    timeout=CATALOG_CACHE.get('TIMEOUT', 300),
+    shared=CATALOG_CACHE.get('SHARED', None),
+    local_timeout=CATALOG_CACHE.get('LOCAL_TIMEOUT', None),
+)
@@ -0,0 +1,187 @@
+from django.conf import settings
+from django.db import transaction, DatabaseError
+from django.db.models import F
+from stock.models import Medication
+from stock.money import parse_money, MAX_DIGITS, DECIMAL_PLACES
+from stock.barcodes import BARCODE_PATTERN
+from stock.search import medication_index
+from stock.cache import catalog_cache
+import bleach
+import codecs
+import csv
+import json
+import logging
+
+log = logging.getLogger('main')
+
+MEDICATION_IMPORT = getattr(settings, 'MEDICATION_IMPORT', {})
+
+CHUNK_SIZE = MEDICATION_IMPORT.get('CHUNK_SIZE', 1000)
+
+# rejected rows reported back in full, the rest are only counted so memory stays constant
+MAX_ERRORS = MEDICATION_IMPORT.get('MAX_ERRORS', 100)
+
+MAX_PRICE = 10 ** (MAX_DIGITS - DECIMAL_PLACES)
+
+
+def read_rows(stream, format='csv', encoding='utf-8'):
+    """
+    lazily reads (line number, row dict) pairs from a binary stream of csv with a header row or of ndjson.
+    rows are read one at a time, the whole file is never held in memory
+    """
+    lines = codecs.iterdecode(stream, encoding)
+    if format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {key.strip(): value.strip() for key, value in row.items() if key and value not in (None, '')}
+    elif format == 'ndjson':
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else {'__invalid__': 'line is not a json object'}
+    else:
+        raise ValueError(f'unsupported import format {format}')
+
+
+def clean_row(row):
+    """
+    validates and converts an import row, returns (values, None) or (None, errors).
+    the checks match MedicationSerializer's, with bleach only run on names that could hold markup
+    """
+    errors = {}
+    if '__invalid__' in row:
+        return None, {'row': [row['__invalid__']]}
+
+    values = {}
+    barcode = str(row.get('barcode', '')).strip()
+    if not BARCODE_PATTERN.match(barcode):
+        errors['barcode'] = ['a barcode of letters, digits and dashes is required']
+    values['barcode'] = barcode
+
+    price = parse_money(row.get('price', None))
+    if price is None or not 0 <= price < MAX_PRICE:
+        errors['price'] = ['a valid price is required']
+    values['price'] = price
+
+    if 'name' in row:
+        name = str(row['name']).strip()
+        if not name or len(name) > 100 or (set(name) & set('<>&') and bleach.clean(name, strip=True) != name):
+            errors['name'] = ['name must be 1 to 100 characters without markup']
+        values['name'] = name
+
+    if 'quantity' in row:
+        try:
+            values['quantity'] = int(row['quantity'])
+        except (TypeError, ValueError):
+            values['quantity'] = -1
+        if values['quantity'] < 0:
+            errors['quantity'] = ['quantity must be a whole number of at least 0']
+
+    return (None, errors) if errors else (values, None)
+
+
+class ImportReport:
+    """
+    running totals of an import, with the first MAX_ERRORS rejected rows
+    """
+    def __init__(self):
+        self.rows = self.created = self.updated = self.failed = 0
+        self.errors = []
+
+    def reject(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'line': line, 'error': errors})
+
+    def as_dict(self):
+        return {'rows': self.rows, 'created': self.created, 'updated': self.updated, 'failed': self.failed, 'errors': self.errors}
+
+
+def upsert_chunk(chunk, report):
+    """
+    inserts or updates a chunk of cleaned (line, values) rows by barcode with
+    INSERT ... ON CONFLICT (barcode) DO UPDATE statements, in its own transaction
+    """
+    """ a barcode repeated within a chunk keeps its last row, postgres refuses to update a row twice in one statement """
+    rows = {}
+    for line, values in chunk:
+        if values['barcode'] in rows:
+            report.reject(rows[values['barcode']][0], {'barcode': [f'superseded by line {line} with the same barcode']})
+        rows[values['barcode']] = (line, values)
+    medications = None
+    try:
+        with transaction.atomic():
+            """ the stored rows stay locked until the upsert commits, so no edit can land in between """
+            existing = {barcode: (name, drug_id) for barcode, name, drug_id in
+                        Medication.objects.select_for_update().filter(barcode__in=rows).values_list('barcode', 'name', 'drug_id')}
+
+            """ rows are written grouped by the columns they carry, a missing column never overwrites a stored value """
+            groups = {}
+            for barcode, (line, values) in rows.items():
+                fields = frozenset(name for name in ('name', 'quantity') if name in values)
+                if barcode in existing:
+                    values.setdefault('name', existing[barcode][0])
+                elif 'name' not in values:
+                    report.reject(line, {'name': ['name is required for a barcode that is not in the catalog']})
+                    continue
+                groups.setdefault(fields, []).append(Medication(**values))
+
+            medications = [medication for group in groups.values() for medication in group]
+            if not medications:
+                return
+            for fields, group in groups.items():
+                Medication.objects.bulk_create(group, update_conflicts=True, unique_fields=['barcode'],
+                                               update_fields=sorted(fields | {'price', 'updated_at'}))
+            """ the version is bumped in sql rather than computed from the read, so two contents never share one """
+            Medication.objects.filter(barcode__in=[medication.barcode for medication in medications if medication.barcode in existing]).update(
+                version=F('version') + 1)
+    except DatabaseError:
+        barcodes = rows if medications is None else [medication.barcode for medication in medications]
+        log.exception(f'a chunk of {len(barcodes)} imported medications could not be written')
+        for barcode in barcodes:
+            report.reject(rows[barcode][0], {'row': ['the row could not be written, please retry it']})
+        return
+
+    updated = len([medication for medication in medications if medication.barcode in existing])
+    report.updated += updated
+    report.created += len(medications) - updated
+    """ bulk writes skip the model signals, so cached copies of the chunk are evicted here """
+    catalog_cache.invalidate([existing[medication.barcode][1] for medication in medications if medication.barcode in existing],
+                             barcodes=[medication.barcode for medication in medications])
+
+
+def import_medications(rows, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    streams (line, row) pairs into the catalog chunk by chunk, creating unknown barcodes and
+    updating the price (and name or quantity when given) of known ones.
+    progress, if given, is called with the report after every chunk. returns the report
+    """
+    report, chunk = ImportReport(), []
+    for line, row in rows:
+        report.rows += 1
+        values, errors = clean_row(row)
+        if errors:
+            report.reject(line, errors)
+        else:
+            chunk.append((line, values))
+
+        if len(chunk) >= chunk_size:
+            upsert_chunk(chunk, report)
+            chunk = []
+            if progress is not None:
+                progress(report)
+
+    if chunk:
+        upsert_chunk(chunk, report)
+    if progress is not None:
+        progress(report)
+
+    if report.created or report.updated:
+        """ too many names may have changed to patch the search index entry by entry """
+        medication_index.invalidate()
+    log.info(f'medication import finished: {report.created} created, {report.updated} updated, {report.failed} rejected')
+    return report
@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.db.models import F, Case, When, Value
+from django.utils import timezone
+from stock.models import Medication
+from stock.barcodes import stored_barcodes
+from stock.cache import catalog_cache
+import logging
+
+log = logging.getLogger('main')
+
+
+class InsufficientStock(Exception):
+    """
+    raised when a medication doesn't hold enough units to take the requested quantity
+    """
+    def __init__(self, medication, quantity):
+        self.medication = medication
+        self.quantity = quantity
+        super().__init__(f'{medication.name} does not have {quantity} units in stock')
+
+
+class AdjustmentRejected(Exception):
+    """
+    raised, after rolling a stock adjustment back, when some of its medications don't exist
+    or would be left with a negative quantity
+    """
+    def __init__(self, detail, drug_ids):
+        self.drug_ids = drug_ids
+        super().__init__(detail)
+
+
+def take_stock(medication, quantity):
+        """
+        takes quantity units of medication with a single conditional update
+        (UPDATE ... SET quantity = quantity - n WHERE quantity >= n), so concurrent sales
+        of the same medication can neither lose an update nor oversell it.
+        raises InsufficientStock when fewer units are left.
+        the row stays locked until the surrounding transaction ends, so callers should take stock
+        as late in their transaction as they can
+        """
+        log.info(f'taking {quantity} units of a medication from stock')
+        updated = Medication.objects.filter(pk=medication.pk, quantity__gte=quantity).update(
+            quantity=F('quantity') - quantity, version=F('version') + 1, updated_at=timezone.now())
+        if not updated:
+            log.error(f'medication does not have {quantity} units in stock')
+            raise InsufficientStock(medication, quantity)
+
+        """ queryset updates skip the model signals, so the cached copies are evicted here """
+        catalog_cache.invalidate_on_commit([medication.pk], barcodes=stored_barcodes(medication))
+
+
+def take_stocks(quantities, barcodes=()):
+        """
+        takes the quantities ({drug_id: n}) of several medications with a single conditional update,
+        so a sale of many lines costs one statement however long it is.
+        raises InsufficientStock, taking nothing, when one of them holds fewer units.
+        barcodes are those of the medications, whose cached scans are evicted
+        """
+        log.info(f'taking stock of {len(quantities)} medications')
+        amount = Case(*[When(pk=drug_id, then=Value(quantity)) for drug_id, quantity in quantities.items()])
+        with transaction.atomic():
+            updated = Medication.objects.filter(pk__in=quantities, quantity__gte=amount).update(
+                quantity=F('quantity') - amount, version=F('version') + 1, updated_at=timezone.now())
+            if updated < len(quantities):
+                """ some rows were short, the ones that were decremented are rolled back with the savepoint """
+                transaction.set_rollback(True)
+
+        if updated < len(quantities):
+            stock = Medication.objects.in_bulk(list(quantities))
+            """ reports the first line short of stock, or the first line if stock came back in between """
+            drug_id = next((drug_id for drug_id, quantity in quantities.items()
+                            if drug_id not in stock or stock[drug_id].quantity < quantity), next(iter(quantities)))
+            medication = stock.get(drug_id, None) or Medication(pk=drug_id, name='a deleted medication')
+            log.error(f'medication does not have {quantities[drug_id]} units in stock')
+            raise InsufficientStock(medication, quantities[drug_id])
+
+        """ queryset updates skip the model signals, so the cached copies are evicted here """
+        catalog_cache.invalidate_on_commit(quantities, barcodes=barcodes)
+
+
+def adjust_stock(deltas, absolutes):
+        """
+        applies a stocktake in one transaction with a single UPDATE: medications in deltas have the
+        delta added to their quantity, those in absolutes have their quantity set.
+        returns {drug_id: (quantity, version)} of the adjusted medications, or raises
+        AdjustmentRejected, changing nothing, when a medication is missing or would go below zero
+        """
+        drug_ids = set(deltas) | set(absolutes)
+        log.info(f'adjusting the stock of {len(drug_ids)} medications')
+        quantity = Case(
+            *[When(pk=drug_id, then=F('quantity') + Value(delta)) for drug_id, delta in deltas.items()],
+            *[When(pk=drug_id, then=Value(absolute)) for drug_id, absolute in absolutes.items()],
+            default=F('quantity'),
+        )
+        with transaction.atomic():
+            Medication.objects.filter(pk__in=drug_ids).update(quantity=quantity, version=F('version') + 1, updated_at=timezone.now())
+            adjusted = {drug_id: (quantity, version, barcode) for drug_id, quantity, version, barcode in
+                        Medication.objects.filter(pk__in=drug_ids).values_list('drug_id', 'quantity', 'version', 'barcode')}
+
+            missing = drug_ids - set(adjusted)
+            if missing:
+                log.error(f'stock adjustment was rolled back because {len(missing)} medications do not exist')
+                raise AdjustmentRejected('some medications do not exist', sorted(str(drug_id) for drug_id in missing))
+            negative = [drug_id for drug_id, (quantity, version, barcode) in adjusted.items() if quantity < 0]
+            if negative:
+                log.error(f'stock adjustment was rolled back because {len(negative)} medications would go below zero')
+                raise AdjustmentRejected('some medications would be left with a negative quantity', sorted(str(drug_id) for drug_id in negative))
+
+            """ queryset updates skip the model signals, so the cached copies are evicted here """
+            catalog_cache.invalidate_on_commit(adjusted, barcodes=[barcode for quantity, version, barcode in adjusted.values()])
+
+        return {drug_id: (quantity, version) for drug_id, (quantity, version, barcode) in adjusted.items()}
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from stock.search import SearchIndex
+import random
+import string
+import time
+import uuid
+
+
+class Command(BaseCommand):
+    """
+    measures typeahead latency of the medication search index over a synthetic catalog,
+    without touching the database
+    """
+    help = 'benchmarks medication search latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skus', type=int, default=50000, help='number of medications in the synthetic catalog')
+        parser.add_argument('--queries', type=int, default=2000, help='number of searches to run')
+        parser.add_argument('--limit', type=int, default=10, help='number of results per search')
+        parser.add_argument('--seed', type=int, default=0, help='random seed of the synthetic catalog')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        stems = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 11))) for _ in range(options['skus'] // 10 or 1)]
+        forms = ['tablets', 'capsules', 'syrup', 'suspension', 'injection', 'cream', 'drops']
+        names = [f"{rng.choice(stems)} {rng.choice([5, 10, 20, 50, 100, 250, 500])}mg {rng.choice(forms)}" for _ in range(options['skus'])]
+
+        index = SearchIndex()
+        start = time.perf_counter()
+        index.build((uuid.uuid4(), name) for name in names)
+        self.stdout.write(f'indexed {len(index)} medications in {time.perf_counter() - start:.2f}s')
+
+        """ typeahead prefixes of one to six letters, every fifth one with a typo """
+        queries = []
+        for n in range(options['queries']):
+            query = rng.choice(names)[:rng.randint(1, 6)]
+            if n % 5 == 0 and len(query) > 3:
+                position = rng.randrange(1, len(query))
+                query = query[:position] + rng.choice(string.ascii_lowercase) + query[position + 1:]
+            queries.append(query)
+
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, options['limit'])
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+
+        percentile = lambda p: timings[min(len(timings) - 1, int(len(timings) * p))]
+        self.stdout.write(f"{len(queries)} searches, limit {options['limit']}")
+        self.stdout.write(f'p50: {percentile(0.5):.2f}ms, p99: {percentile(0.99):.2f}ms, max: {timings[-1]:.2f}ms')
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from stock.imports import read_rows, import_medications, CHUNK_SIZE
+import time
+
+
+class Command(BaseCommand):
+    """
+    streams a supplier price list or stock file into the medication catalog, upserting by barcode
+    """
+    help = 'imports medications from a csv or ndjson file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='csv (with a header row) or ndjson file of barcode, price and optionally name and quantity')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default=None, help='file format, guessed from the extension by default')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='number of rows validated and written together')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        start = time.perf_counter()
+
+        def progress(report):
+            self.stdout.write(f'{report.rows} rows read, {report.created} created, {report.updated} updated, '
+                              f'{report.failed} rejected ({time.perf_counter() - start:.1f}s)')
+
+        try:
+            with open(path, 'rb') as stream:
+                report = import_medications(read_rows(stream, format), options['chunk_size'], progress)
+        except OSError as exc:
+            raise CommandError(f'could not read {path}: {exc}')
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        if report.failed > len(report.errors):
+            self.stderr.write(f'... and {report.failed - len(report.errors)} more rejected rows')
+        self.stdout.write(f'imported {report.created + report.updated} of {report.rows} rows in {time.perf_counter() - start:.1f}s')
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:03
+
+import django_prometheus.models
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Medication',
+            fields=[
+                ('drug_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('price', models.CharField(max_length=50)),
+                ('quantity', models.IntegerField(default=0)),
+            ],
+            bases=(models.Model, django_prometheus.models.ExportModelOperationsMixin('medication')),
+        ),
+    ]
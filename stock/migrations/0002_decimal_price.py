@@ -0,0 +1,62 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:40
+
+from decimal import Decimal
+from django.db import migrations, models
+from stock.money import parse_money
+import logging
+
+log = logging.getLogger('main')
+
+
+def parse_prices(apps, schema_editor):
+    """
+    parses the price strings into the new decimal column, unreadable prices are stored as 0 and logged
+    """
+    Medication = apps.get_model('stock', 'Medication')
+    medications = list(Medication.objects.only('drug_id', 'price'))
+    for medication in medications:
+        medication.price_amount = parse_money(medication.price)
+        if medication.price_amount is None:
+            log.error(f'price {medication.price!r} of medication {medication.drug_id} could not be parsed, storing 0')
+            medication.price_amount = Decimal('0')
+    Medication.objects.bulk_update(medications, ['price_amount'], batch_size=500)
+
+
+def format_prices(apps, schema_editor):
+    Medication = apps.get_model('stock', 'Medication')
+    medications = list(Medication.objects.only('drug_id', 'price_amount'))
+    for medication in medications:
+        medication.price = str(medication.price_amount)
+    Medication.objects.bulk_update(medications, ['price'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medication',
+            name='price_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+            preserve_default=False,
+        ),
+        migrations.RunPython(parse_prices, format_prices),
+        # lets the string column be added back with a default when the migration is reversed
+        migrations.AlterField(
+            model_name='medication',
+            name='price',
+            field=models.CharField(default='0', max_length=50),
+        ),
+        migrations.RemoveField(
+            model_name='medication',
+            name='price',
+        ),
+        migrations.RenameField(
+            model_name='medication',
+            old_name='price_amount',
+            new_name='price',
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0002_decimal_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medication',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='medication',
+            index=models.Index(fields=['name', 'drug_id'], name='stock_med_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medication',
+            index=models.Index(fields=['updated_at', 'drug_id'], name='stock_med_updated_idx'),
+        ),
+    ]
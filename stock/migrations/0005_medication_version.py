@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0004_medication_barcode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medication',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
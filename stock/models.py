@@ -1,5 +1,8 @@
 from uuid import uuid4
-from django.db import models
+from django.db import models, router
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.utils import timezone
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from datetime import date
@@ -9,14 +12,59 @@ import logging
 
 log = logging.getLogger('main')
 
+class VersionConflict(Exception):
+    """
+    raised when a medication was changed by someone else since the version being saved was read
+    """
+
+
 class Medication(models.Model, ExportModelOperationsMixin('medication')):
     """
     defines the model instance for each medication
     """
     drug_id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(max_length=100)
-    price = models.CharField(max_length=50)
+    # scanned at the till, the unique constraint's index serves each scan in a single lookup
+    barcode = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    price = models.DecimalField(max_digits=12, decimal_places=2)
     quantity = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    # bumped by every update, guards edits against overwriting each other (optimistic concurrency)
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # back the catalog's cursor pagination, by name for browsing and by updated_at for syncing
+            models.Index(fields=['name', 'drug_id'], name='stock_med_name_idx'),
+            models.Index(fields=['updated_at', 'drug_id'], name='stock_med_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        remembers the stored barcode so a changed one can be evicted from the catalog cache
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_barcode = instance.__dict__.get('barcode', None)
+        return instance
+
+    def save_version(self, update_fields):
+        """
+        compare and swap save of update_fields: the row is only written if it still holds this
+        instance's version, which is bumped in the same update. raises VersionConflict, writing nothing, otherwise
+        """
+        self.updated_at = timezone.now()
+        fields = set(update_fields) | {'updated_at'}
+        updated = Medication.objects.filter(pk=self.pk, version=self.version).update(
+            version=F('version') + 1, **{name: getattr(self, name) for name in fields})
+        if not updated:
+            log.error(f'medication was not saved because it has changed since version {self.version}')
+            raise VersionConflict(f'medication has changed since version {self.version}')
+
+        self.version += 1
+        """ queryset updates skip the model signals, the search index and catalog cache still need to hear of it """
+        post_save.send(sender=Medication, instance=self, created=False, raw=False,
+                       using=router.db_for_write(Medication), update_fields=frozenset(fields | {'version'}))
 
     def __str__(self):
         """
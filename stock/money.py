@@ -0,0 +1,46 @@
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from rest_framework import serializers
+import re
+
+# money is stored as fixed point naira with kobo precision
+MAX_DIGITS = 12
+DECIMAL_PLACES = 2
+CENT = Decimal('0.01')
+
+# api versions that receive money as json numbers, the others keep the original string format
+NUMERIC_MONEY_VERSIONS = getattr(settings, 'NUMERIC_MONEY_VERSIONS', ('2',))
+
+
+def parse_money(value):
+    """
+    parses a legacy price string such as '1,200', 'N1200.5' or '₦ 300' into a Decimal,
+    returns None when nothing numeric can be read from it
+    """
+    if value is None:
+        return None
+    cleaned = re.sub(r'[^0-9.\-]', '', str(value))
+    try:
+        return Decimal(cleaned).quantize(CENT)
+    except InvalidOperation:
+        return None
+
+
+class MoneyField(serializers.DecimalField):
+    """
+    serializes a money column as a string ('1200.00') for version 1 clients and as
+    a json number for the versions in NUMERIC_MONEY_VERSIONS. both forms are accepted as input
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_digits', MAX_DIGITS)
+        kwargs.setdefault('decimal_places', DECIMAL_PLACES)
+        kwargs.setdefault('min_value', Decimal('0'))
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request', None)
+        if request is not None and getattr(request, 'version', None) in NUMERIC_MONEY_VERSIONS:
+            self.coerce_to_string = False
+        else:
+            self.coerce_to_string = True
+        return super().to_representation(value)
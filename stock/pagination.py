@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CatalogCursorPagination(CursorPagination):
+    """
+    keyset pagination over the medication catalog.
+    pages are ordered by name for browsing, or by updated_at when a terminal syncs with `?updated_since=`
+    """
+    ordering = ('name', 'drug_id')
+    sync_ordering = ('updated_at', 'drug_id')
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get('updated_since', None):
+            return self.sync_ordering
+        return self.ordering
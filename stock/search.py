@@ -0,0 +1,219 @@
+from bisect import bisect_left, insort
+from django.conf import settings
+from threading import Lock, RLock
+import heapq
+import re
+import time
+import logging
+
+log = logging.getLogger('main')
+
+MEDICATION_SEARCH = getattr(settings, 'MEDICATION_SEARCH', {})
+
+# minimum share of the query trigrams a name must contain for a fuzzy (typo tolerant) match
+MIN_SIMILARITY = MEDICATION_SEARCH.get('MIN_SIMILARITY', 0.6)
+
+# rank bonus of a name starting with the query over a name with a word starting with it
+NAME_PREFIX, WORD_PREFIX = 2.0, 1.0
+
+
+def normalize(text):
+    """
+    lowercases text and collapses everything but letters and digits into single spaces
+    """
+    return ' '.join(re.findall(r'[0-9a-z]+', text.lower()))
+
+
+def trigrams(text):
+    """
+    returns the trigrams of the words of text, each padded like pg_trgm does so word starts weigh more
+    """
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    """
+    in-process prefix and trigram index over (key, name) pairs, answering typeahead queries
+    without touching the database.
+    prefixes are looked up by bisecting sorted lists of names and words, typos are caught by trigram similarity
+    """
+    def __init__(self):
+        self._lock = RLock()
+        self._names = {}
+        self._sorted_names = []
+        self._words = []
+        self._postings = {}
+        self._trigrams = {}
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._names)
+
+    def build(self, items):
+        """
+        replaces the index content with items, an iterable of (key, name)
+        """
+        names, postings, grams = {}, {}, {}
+        for key, name in items:
+            normalized = normalize(name)
+            names[key] = (name, normalized)
+            for word in normalized.split():
+                postings.setdefault(word, set()).add(key)
+            for gram in trigrams(normalized):
+                grams.setdefault(gram, set()).add(key)
+        sorted_names = sorted((entry[1], key) for key, entry in names.items())
+
+        with self._lock:
+            self._names, self._sorted_names, self._trigrams = names, sorted_names, grams
+            self._words, self._postings = sorted(postings), postings
+            self.built_at = time.monotonic()
+        log.info(f'search index built with {len(names)} entries')
+
+    def add(self, key, name):
+        """
+        adds or replaces a single entry
+        """
+        with self._lock:
+            self.remove(key)
+            normalized = normalize(name)
+            self._names[key] = (name, normalized)
+            insort(self._sorted_names, (normalized, key))
+            for word in normalized.split():
+                if word not in self._postings:
+                    insort(self._words, word)
+                self._postings.setdefault(word, set()).add(key)
+            for gram in trigrams(normalized):
+                self._trigrams.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        """
+        removes a single entry if present
+        """
+        with self._lock:
+            entry = self._names.pop(key, None)
+            if entry is None:
+                return
+            position = bisect_left(self._sorted_names, (entry[1], key))
+            del self._sorted_names[position]
+            for word in set(entry[1].split()):
+                keys = self._postings[word]
+                keys.discard(key)
+                if not keys:
+                    del self._postings[word]
+                    del self._words[bisect_left(self._words, word)]
+            for gram in trigrams(entry[1]):
+                keys = self._trigrams[gram]
+                keys.discard(key)
+                if not keys:
+                    del self._trigrams[gram]
+
+    def search(self, query, limit=10):
+        """
+        returns up to limit (key, name, score) tuples for query, best first.
+        names starting with the query rank first, then names with a word starting with it,
+        then names sharing enough trigrams with the query to absorb a typo. ties are broken alphabetically
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        first_word, *other_words = query.split()
+        with self._lock:
+            """ names are kept sorted, so the best name prefix matches are the first ones of their range """
+            hits = []
+            position = bisect_left(self._sorted_names, (query,))
+            while len(hits) < limit and position < len(self._sorted_names) and self._sorted_names[position][0].startswith(query):
+                hits.append((self._sorted_names[position][1], NAME_PREFIX))
+                position += 1
+            if len(hits) == limit:
+                return self._results(hits)
+
+            scores = dict(hits)
+            candidates = set()
+            position = bisect_left(self._words, first_word)
+            while position < len(self._words) and self._words[position].startswith(first_word):
+                candidates.update(self._postings[self._words[position]])
+                position += 1
+            candidates.difference_update(scores)
+            if other_words:
+                candidates = [key for key in candidates if all(any(word.startswith(other) for word in self._names[key][1].split()) for other in other_words)]
+            for key in heapq.nsmallest(limit - len(hits), candidates, key=lambda key: self._names[key][1]):
+                scores[key] = WORD_PREFIX
+
+            """ fuzzy matching only runs when the prefixes can't fill the results """
+            if len(scores) < limit:
+                """
+                like pg_trgm's word_similarity, only the query trigrams count so long names aren't penalised.
+                a match needs `needed` of them, so it has to hold one of the rarest len - needed + 1
+                and the common trigrams never have to be scanned
+                """
+                postings = sorted((self._trigrams.get(gram, set()) for gram in trigrams(query)), key=len)
+                needed = min((count for count in range(1, len(postings) + 1) if count / len(postings) >= MIN_SIMILARITY), default=len(postings))
+                candidates = set().union(*postings[:len(postings) - needed + 1])
+                candidates.difference_update(scores)
+                for key in candidates:
+                    similarity = sum(key in keys for keys in postings) / len(postings)
+                    if similarity >= MIN_SIMILARITY:
+                        scores[key] = similarity
+
+            return self._results(heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], self._names[item[0]][1])))
+
+    def _results(self, hits):
+        return [(key, self._names[key][0], round(score, 3)) for key, score in hits]
+
+
+class MedicationIndex(SearchIndex):
+    """
+    search index over the medication names of this process.
+    saves and deletes in this process update it through the stock.signals receivers, changes made
+    elsewhere (other workers, queryset updates) are picked up by rebuilding it once it is MAX_AGE seconds old
+    """
+    def __init__(self, max_age=300):
+        super().__init__()
+        self.max_age = max_age
+        self._rebuilding = Lock()
+        self._ready = False
+
+    def is_fresh(self):
+        return self.built_at is not None and time.monotonic() - self.built_at < self.max_age
+
+    def ensure_built(self):
+        """
+        builds the index from the database on first use and whenever it has gone stale.
+        a single thread rebuilds at a time, the others keep searching the index they have
+        instead of waiting for the catalog to be read
+        """
+        if self.is_fresh():
+            return
+        if not self._rebuilding.acquire(blocking=False):
+            if self._ready:
+                return
+            """ before the first build there is nothing to fall back on, so wait for it """
+            with self._rebuilding:
+                return
+        try:
+            if self.is_fresh():
+                return
+            from stock.models import Medication
+            self.build(Medication.objects.values_list('drug_id', 'name').iterator(chunk_size=5000))
+            self._ready = True
+        finally:
+            self._rebuilding.release()
+
+    def invalidate(self):
+        """
+        marks the index stale so the next search rebuilds it, for changes too large to apply entry by entry
+        """
+        with self._lock:
+            self.built_at = None
+
+    def search(self, query, limit=10):
+        self.ensure_built()
+        return super().search(query, limit)
+
+
+medication_index = MedicationIndex(max_age=MEDICATION_SEARCH.get('MAX_AGE', 300))
@@ -1,18 +1,62 @@
 import logging
 from rest_framework import serializers
 from stock.models import Medication
+from stock.money import MoneyField
+from stock.barcodes import BARCODE_PATTERN
+from stock.cache import catalog_cache
+from django.core.exceptions import ValidationError
+from django.conf import settings
 import bleach
+import uuid
 
 log = logging.getLogger('main')
 
-class MedicationSerializer(serializers.ModelSerializer):
+STOCK_ADJUSTMENT = getattr(settings, 'STOCK_ADJUSTMENT', {})
+
+class SparseFieldsetMixin:
+    """
+    limits a serializer to the comma separated fields in a GET request's `?fields=` parameter.
+    unknown names are ignored and every field is kept when none of the names is known
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.requested_fields(self.context.get('request', None))
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+    def requested_fields(self, request):
+        """
+        returns the requested field names that exist on the serializer
+        """
+        if request is None or request.method != 'GET' or not request.query_params.get('fields', None):
+            return set()
+        return set(name.strip() for name in request.query_params['fields'].split(',')) & set(self.fields)
+
+
+class MedicationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     This class defines the serializer for the medication model.
     """
+    price = MoneyField()
+
     class Meta:
         model = Medication
         fields = '__all__'
+        read_only_fields = ['version']
     
+    def validate_barcode(self, value):
+        """
+        Validates the barcode, a blank one leaves the medication without a barcode.
+        """
+        value = (value or '').strip()
+        if not value:
+            return None
+        if not BARCODE_PATTERN.match(value):
+            log.error(f'validation of medication data from request failed because the barcode is invalid')
+            raise serializers.ValidationError("barcodes may only contain letters, digits and dashes")
+        return value
+
     def validate(self, data):
         """
         Validates request data.
@@ -26,19 +70,12 @@ class MedicationSerializer(serializers.ModelSerializer):
                 log.error(f'validation of medication data from request failed because name exceeded the limit')
                 raise serializers.ValidationError("You have exceeded the allowed characters")   
 
-        price = data.get('price', None)
-        if price is not None:
-            price = bleach.clean(price, strip=True)
-            if len(price) > 50:
-                log.error(f'validation of medication data from request failed because price exceeded the limit')
-                raise serializers.ValidationError("You have exceeded the allowed characters")   
-
         quantity = data.get('quantity', None)
-        if type(quantity) != type(12):
+        if quantity is not None and type(quantity) != type(12):
             log.error(f'validation of medication data from request failed because quantity data type is incorrect')
             raise serializers.ValidationError("You have inputed invalid characters")   
 
-        if name != data.get('name', None) or price != data.get('price', None):
+        if name != data.get('name', None):
             log.error(f'validation of medication data from request failed because a field is missing')
             raise serializers.ValidationError("You have entered invalid characters.")
         
@@ -55,8 +92,71 @@ class MedicationSerializer(serializers.ModelSerializer):
     
     def update(self, instance, validated_data):
         """
-        updates an existing medication.
+        updates an existing medication if it still holds the version it was read at.
+        raises stock.models.VersionConflict when someone else has updated it since.
         """
         log.info(f'updating an existing medication using the request data via the medication_serializer class')
+        for name, value in validated_data.items():
+            setattr(instance, name, value)
+        instance.save_version(validated_data.keys())
         log.info(f'existing medication has been updated successfully via the medication_serializer class')
-        return super(MedicationSerializer, self).update(instance, validated_data)
+        return instance
+
+
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    """
+    validates a stocktake: `delta` maps drug ids to a change of quantity, `absolute` to a counted quantity
+    """
+    delta = serializers.DictField(child=serializers.IntegerField(), required=False, default=dict)
+    absolute = serializers.DictField(child=serializers.IntegerField(min_value=0), required=False, default=dict)
+
+    def validate_drug_ids(self, adjustments):
+        """
+        converts the drug id keys to uuids
+        """
+        try:
+            return {uuid.UUID(str(drug_id)): value for drug_id, value in adjustments.items()}
+        except ValueError:
+            log.error(f'validation of stock adjustment failed because a drug id is not a uuid')
+            raise serializers.ValidationError("drug ids must be uuids")
+
+    def validate_delta(self, value):
+        return self.validate_drug_ids(value)
+
+    def validate_absolute(self, value):
+        return self.validate_drug_ids(value)
+
+    def validate(self, attrs):
+        """
+        Validates request data.
+        """
+        log.info(f'validating stock adjustment data from request')
+        lines = len(attrs['delta']) + len(attrs['absolute'])
+        max_lines = STOCK_ADJUSTMENT.get('MAX_LINES', 5000)
+        if not 0 < lines <= max_lines:
+            log.error(f'validation of stock adjustment failed because it holds {lines} lines')
+            raise serializers.ValidationError(f"a stock adjustment must hold between 1 and {max_lines} lines")
+        if set(attrs['delta']) & set(attrs['absolute']):
+            log.error(f'validation of stock adjustment failed because a drug is both in delta and absolute')
+            raise serializers.ValidationError("a drug can't be adjusted by both delta and absolute")
+        return attrs
+
+
+
+class CachedMedicationField(serializers.PrimaryKeyRelatedField):
+    """
+    a medication primary key resolved through the catalog cache, instead of a query per sold item
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Medication.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            medication = catalog_cache.get_medication(data)
+        except (ValidationError, TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if medication is None:
+            self.fail('does_not_exist', pk_value=data)
+        return medication
@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from stock.models import Medication
+from stock.search import medication_index
+from stock.barcodes import stored_barcodes
+from stock.cache import catalog_cache
+import logging
+
+log = logging.getLogger('main')
+
+
+@receiver(post_save, sender=Medication)
+def index_saved_medication(sender, instance, **kwargs):
+    """
+    adds or renames a saved medication in the search index once its transaction commits
+    """
+    if medication_index.built_at is None:
+        return
+
+    log.info(f'updating saved medication in the search index')
+    drug_id, name = instance.drug_id, instance.name
+    transaction.on_commit(lambda: medication_index.add(drug_id, name))
+
+
+@receiver(post_delete, sender=Medication)
+def unindex_deleted_medication(sender, instance, **kwargs):
+    """
+    removes a deleted medication from the search index once its transaction commits
+    """
+    if medication_index.built_at is None:
+        return
+
+    log.info(f'removing deleted medication from the search index')
+    drug_id = instance.drug_id
+    transaction.on_commit(lambda: medication_index.remove(drug_id))
+
+
+
+@receiver(post_save, sender=Medication)
+def invalidate_saved_medication(sender, instance, **kwargs):
+    """
+    invalidates a saved medication and its current and previous barcodes in the catalog cache
+    """
+    log.info(f'invalidating saved medication in the catalog cache')
+    catalog_cache.invalidate_on_commit([instance.pk], barcodes=stored_barcodes(instance))
+
+
+@receiver(post_delete, sender=Medication)
+def invalidate_deleted_medication(sender, instance, **kwargs):
+    """
+    invalidates a deleted medication and its barcodes in the catalog cache
+    """
+    log.info(f'invalidating deleted medication in the catalog cache')
+    catalog_cache.invalidate_on_commit([instance.pk], barcodes=stored_barcodes(instance))
@@ -1,4 +1,13 @@
 from django.urls import path
+from rest_framework import routers
+from stock.views import MedicationViewSet
+
+
+router = routers.SimpleRouter()
+router.register(r'api/v1/medication', MedicationViewSet, basename='medication')
+
 
 urlpatterns = [
 ]
+
+urlpatterns += router.urls
@@ -1,24 +1,36 @@
-from stock.models import Medication
+from stock.models import Medication, VersionConflict
 from rest_framework.response import Response
-from stock.serializers import MedicationSerializer
+from stock.serializers import MedicationSerializer, StockAdjustmentSerializer
+from stock.inventory import adjust_stock, AdjustmentRejected
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
-from users.permissions import get_user
 from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from datetime import datetime, timedelta
 from django.utils import timezone
-from users.models import Owner
+from django.utils.dateparse import parse_datetime
+from stock.pagination import CatalogCursorPagination
+from stock.search import medication_index
+from stock.barcodes import lookup_barcodes, BARCODE_CACHE
+from stock.imports import read_rows, import_medications
+from stock.cache import catalog_cache
 import logging
 
 log = logging.getLogger('main')
 
+MEDICATION_SEARCH = getattr(settings, 'MEDICATION_SEARCH', {})
+
 class MedicationViewSet(viewsets.ModelViewSet):
     """
     a viewset suite to handle crud operations on medication model
     """
     queryset = Medication.objects.all()
     serializer_class = MedicationSerializer
+    pagination_class = CatalogCursorPagination
 
     def create(self, request):
         """
@@ -27,14 +39,13 @@ class MedicationViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating create_medication function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, Owner) and request.user.is_store_admin == True):
+        if (request.user.is_owner and request.user.is_store_admin == True):
             log.info(f'instantiating medication_serializer class with request data')
-            serializer = self.serializer_class(data=request.data)
+            serializer = self.get_serializer(data=request.data)
             if serializer.is_valid():
                 serializer.save()
                 log.info(f'medication request data has been validated and new medication has been created')
@@ -46,109 +57,320 @@ class MedicationViewSet(viewsets.ModelViewSet):
             log.error(f'requesting user does not have permission to create new medication')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission access this resource'})
 
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """
+        streams an uploaded csv or ndjson `file` of medications into the catalog, upserting by barcode
+        accesible to store_admin owners
+        """
+        log.info(f'instantiating import_medications function')
+        log.info(f'validating requesting user')
+        if not request.user.is_authenticated:
+            log.error(f'requesting user could not be validated')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})
+
+        if not (request.user.is_owner and request.user.is_store_admin == True):
+            log.error(f'requesting user does not have permission to import medications')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission access this resource'})
+
+        upload = request.FILES.get('file', None)
+        if upload is None:
+            log.error(f'medications could not be imported because no file was uploaded')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'upload a csv or ndjson file as `file`'})
+
+        format = request.data.get('format', None) or ('ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if format not in ('csv', 'ndjson'):
+            log.error(f'medications could not be imported because the format is not supported')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'format must be csv or ndjson'})
+
+        """ large uploads are spooled to disk by django, reading them line by line keeps memory flat """
+        try:
+            report = import_medications(read_rows(upload, format))
+        except UnicodeDecodeError:
+            log.error(f'medications could not be imported because the file is not utf-8')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'the file must be utf-8 encoded'})
+
+        written = report.created + report.updated
+        if written and not report.failed:
+            response_status = status.HTTP_200_OK
+        elif written:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'status': response_status, 'data': report.as_dict(),
+                         'detail': f'{written} of {report.rows} medications have been imported'})
+
+    @action(detail=False, methods=['post'], url_path='adjust')
+    def adjust(self, request):
+        """
+        applies a stocktake of many medications in one transaction and returns their new quantities.
+        `delta` maps drug ids to a change of quantity and `absolute` maps them to the counted quantity
+        accesible to store_admin owners
+        """
+        log.info(f'instantiating adjust_stock function')
+        log.info(f'validating requesting user')
+        if not request.user.is_authenticated:
+            log.error(f'requesting user could not be validated')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})
+
+        if not (request.user.is_owner and request.user.is_store_admin == True):
+            log.error(f'requesting user does not have permission to adjust stock')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission access this resource'})
+
+        serializer = StockAdjustmentSerializer(data=request.data)
+        if not serializer.is_valid():
+            log.error(f'stock adjustment request data could not be validated so no stock was adjusted')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'error': serializer.errors, 'detail': 'stock could not be adjusted due to serializer validation errors'})
+
+        try:
+            adjusted = adjust_stock(serializer.validated_data['delta'], serializer.validated_data['absolute'])
+        except AdjustmentRejected as error:
+            return Response({'status': status.HTTP_409_CONFLICT, 'error': error.drug_ids, 'detail': f'stock was not adjusted because {error}'})
+
+        log.info(f'stock of {len(adjusted)} medications has been adjusted successfully')
+        return Response({'status': status.HTTP_200_OK,
+                         'data': {str(drug_id): {'quantity': quantity, 'version': version} for drug_id, (quantity, version) in adjusted.items()},
+                         'detail': f'stock of {len(adjusted)} medications has been adjusted'})
+
     def list(self, request):
         """
-        retrieves a list of all available medication on the platform
-        accesible to only app_admin
+        retrieves a page of the medication catalog
+        accesible to every logged in user, so pos terminals can page or sync the catalog
         """
         log.info(f'instantiating list_medications function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, Owner) and request.user.is_store_admin == True):
-            users = self.queryset
-            serializer = self.serializer_class(users, many=True)
-            log.info(f'list of owners has been retrieved successfully')
-            return Response({"status": status.HTTP_202_ACCEPTED, 'data': serializer.data, 'detail': 'list of owners has been retrieved'})
-        
-        log.error(f'requesting user does not have permission to list owners')
-        return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission access this resource'})
+        medications = self.get_queryset()
+        updated_since = request.query_params.get('updated_since', None)
+        if updated_since:
+            try:
+                since = parse_datetime(updated_since)
+            except ValueError:
+                since = None
+            if since is None:
+                log.error(f'list of medications could not be retrieved because updated_since is not a valid datetime')
+                return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'updated_since must be an iso 8601 datetime'})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            medications = medications.filter(updated_at__gt=since)
+
+        """ pages are cached per api version and url, and dropped as a whole by any catalog change """
+        def load_page():
+            log.info(f'page of medications is not cached, retrieving it from the database')
+            page = self.paginate_queryset(medications)
+            serializer = self.get_serializer(page, many=True)
+            return {'data': list(serializer.data), 'next': self.paginator.get_next_link(), 'previous': self.paginator.get_previous_link()}
+
+        page = catalog_cache.get_or_load(f'list:{catalog_cache.generation}:{request.version}:{request.build_absolute_uri()}', load_page)
+        log.info(f'page of medications has been retrieved successfully')
+        return Response({"status": status.HTTP_202_ACCEPTED, 'data': page['data'],
+                         'next': page['next'], 'previous': page['previous'],
+                         'detail': 'list of medications has been retrieved'})
+
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """
+        typeahead search of the medication catalog by name, tolerant of prefixes and typos
+        accesible to every logged in user
+        """
+        log.info(f'instantiating search_medications function')
+        log.info(f'validating requesting user')
+        if not request.user.is_authenticated:
+            log.error(f'requesting user could not be validated')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})
+
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            log.error(f'medications could not be searched because the query is missing')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'q is required'})
+
+        try:
+            limit = int(request.query_params.get('limit', MEDICATION_SEARCH.get('LIMIT', 10)))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= MEDICATION_SEARCH.get('MAX_LIMIT', 50):
+            log.error(f'medications could not be searched because the limit is out of range')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': f"limit must be between 1 and {MEDICATION_SEARCH.get('MAX_LIMIT', 50)}"})
+
+        """ the index ranks the matches, the database only fills in the current rows of the top ones """
+        hits = medication_index.search(query, limit)
+        medications = self.get_queryset().in_bulk([drug_id for drug_id, name, score in hits])
+        hits = [(medications[drug_id], score) for drug_id, name, score in hits if drug_id in medications]
+        results = self.get_serializer([medication for medication, score in hits], many=True).data
+        for item, (medication, score) in zip(results, hits):
+            item['score'] = score
+
+        log.info(f'{len(results)} medications matched the search query')
+        return Response({'status': status.HTTP_200_OK, 'data': results, 'detail': 'matching medications have been retrieved'})
+
+    @action(detail=False, methods=['get'], url_path='barcode')
+    def barcode(self, request):
+        """
+        looks up the medications matching one or more scanned barcodes (`?codes=` comma separated)
+        accesible to every logged in user
+        """
+        log.info(f'instantiating lookup_barcodes function')
+        log.info(f'validating requesting user')
+        if not request.user.is_authenticated:
+            log.error(f'requesting user could not be validated')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})
+
+        codes = list(dict.fromkeys(code.strip() for code in request.query_params.get('codes', '').split(',') if code.strip()))
+        if not codes or len(codes) > BARCODE_CACHE.get('MAX_CODES', 100):
+            log.error(f'barcodes could not be looked up because {len(codes)} codes were given')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': f"codes must hold between 1 and {BARCODE_CACHE.get('MAX_CODES', 100)} comma separated barcodes"})
+
+        found = lookup_barcodes(codes)
+        missing = [code for code in codes if code not in found]
+        if not found:
+            log.error(f'none of the scanned barcodes matches a medication')
+            return Response({'status': status.HTTP_404_NOT_FOUND, 'missing': missing, 'detail': 'no medication matches the scanned barcodes'})
+
+        serializer = self.get_serializer([found[code] for code in codes if code in found], many=True)
+        log.info(f'{len(found)} of {len(codes)} scanned barcodes have been matched')
+        return Response({'status': status.HTTP_200_OK, 'data': serializer.data, 'missing': missing, 'detail': 'matching medications have been retrieved'})
+
+    def get_medication(self, pk):
+        """
+        retrieves the medication identified by pk, or None if it doesn't exist
+        """
+        try:
+            return self.get_queryset().get(pk=pk)
+        except (Medication.DoesNotExist, ValidationError):
+            return None
 
     def retrieve(self, request, pk=None):
         """
-        retrieves a particular owner instance identified by pk
-        accesible to either app_admin or the user themselve
+        retrieves a particular medication instance identified by pk, tagged with its version as an etag.
+        a matching If-None-Match gets a 304 without a body
+        accesible to every logged in user
         """
-        log.info(f'instantiating retrieve_owner function')
+        log.info(f'instantiating retrieve_medication function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
-            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})
 
-        if (isinstance(request.user, Owner) and request.user.pk == pk):
-            log.info(f'retrieving the owner instance')
-            try:
-                user = Owner.objects.get(pk=pk)
-            except Owner.DoesNotExist:
-                log.error(f'owner instance cant be found on the database')
-                return Response({'status' : status.HTTP_400_BAD_REQUEST, 'detail': 'owner does not exist on the database'})
-            serializer = self.serializer_class(user)        
-            log.info(f'owner instance has been retrieved successfully')
-            return Response({"status" : status.HTTP_200_OK, 'data': serializer.data, 'detail' : 'the requested owner has been retrieved'})
-        
-
-        log.error(f'requesting user does not have permission to retrieve owner instance')
-        return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission to access this resource'})
+        try:
+            medication = catalog_cache.get_medication(pk)
+        except ValidationError:
+            medication = None
+        if medication is None:
+            log.error(f'medication instance cant be found on the database')
+            return Response({'status': status.HTTP_404_NOT_FOUND, 'detail': 'medication does not exist on the database'})
+
+        if etag(medication) in parse_etags(request.headers.get('If-None-Match', '')):
+            log.info(f'requesting user already holds the current version of the medication')
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag(medication)})
+
+        serializer = self.get_serializer(medication)
+        log.info(f'medication instance has been retrieved successfully')
+        return Response({'status': status.HTTP_200_OK, 'data': serializer.data, 'detail': 'the requested medication has been retrieved'},
+                        headers={'ETag': etag(medication)})
 
     def partial_update(self, request, pk=None):
         """
-        updates a owner instance with the request data
-        only accesible to the user and app admin
+        updates a medication instance with the request data, without locking it.
+        the update only applies to the version in If-Match (or the version just read without one),
+        an update made by someone else in between is answered with a 412
+        accesible to store_admin owners
         """
-        log.info(f'instantiating update_owner function')
+        log.info(f'instantiating update_medication function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
-            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})
 
-        if (isinstance(request.user, Owner) and request.user.pk == pk):
-            try:
-                user = Owner.objects.get(pk=pk)
-            except Owner.DoesNotExist:
-                log.error(f'owner instance to be updated cant be found on the database')
-                return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'owner does not exist on out database'})
+        if not (request.user.is_owner and request.user.is_store_admin == True):
+            log.error(f'requesting user does not have permission to update medication instance')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission to access this resource'})
+
+        medication = self.get_medication(pk)
+        if medication is None:
+            log.error(f'medication instance to be updated cant be found on the database')
+            return Response({'status': status.HTTP_404_NOT_FOUND, 'detail': 'medication does not exist on the database'})
+
+        if not if_match(request, medication):
+            return precondition_failed(medication)
+
+        serializer = self.get_serializer(instance=medication, data=request.data, partial=True)
+        if not serializer.is_valid():
+            log.error(f'medication request data could not be validated so the medication was not updated')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'error': serializer.errors, 'detail': 'medication could not be updated due to serializer validation errors'})
+
+        try:
+            serializer.save()
+        except VersionConflict:
+            return precondition_failed(self.get_medication(pk))
+        log.info(f'medication has been updated successfully')
+        return Response({'status': status.HTTP_200_OK, 'data': serializer.data, 'detail': 'medication has been updated successfully'},
+                        headers={'ETag': etag(medication)})
 
-            serializer = self.serializer_class(instance=user, data=request.data, partial=True)
-            if serializer.is_valid():
-                serializer.save()
-                log.info(f'owner has been updated successfully')
-                return Response({"status": status.HTTP_200_OK, 'data': serializer.data, 'detail' : 'owner has been updated successfully'})
-            
-            log.error(f'owner request data could not be validated so new owner was not updated')
-            return Response({'status': status.HTTP_400_BAD_REQUEST, 'error': serializer.errors, 'detail' : 'owner could not be updated due to serializer validation errors'})
-        
-        log.error(f'requesting user does not have permission to update owner instance')
-        return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission to access this resource'})
-        
     def destroy(self, request, pk=None):
         """
-        deletes an instance of an admin_staff (identified by pk).
-        accesible to admin  
+        deletes a medication instance identified by pk, honouring If-Match like partial_update
+        accesible to store_admin owners
         """
-        log.info(f'instantiating delete_admin function')
+        log.info(f'instantiating delete_medication function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
-            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})
 
-        if (isinstance(request.user, Owner) and request.user.pk == pk):
-            try:
-                user = Owner.objects.get(pk=pk)
-            except Owner.DoesNotExist:
-                log.error(f'owner instance to be deleted cant be found on the database')
-                return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'owner does not exist on our database'})
-
-
-            user.delete()
-            log.info(f'owner instance has been deleted successfully')
-            return Response({'status': status.HTTP_200_OK,
-                            'detail': 'owner has been succesfully deleted'})
-        else:        
-            log.error(f'requesting user does not have permission to delete owner instance')
+        if not (request.user.is_owner and request.user.is_store_admin == True):
+            log.error(f'requesting user does not have permission to delete medication instance')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you dont have the permission to perform this action'})
+
+        medication = self.get_medication(pk)
+        if medication is None:
+            log.error(f'medication instance to be deleted cant be found on the database')
+            return Response({'status': status.HTTP_404_NOT_FOUND, 'detail': 'medication does not exist on the database'})
+
+        if not if_match(request, medication):
+            return precondition_failed(medication)
+
+        """ deleting by version too keeps a change made since the read from being deleted unseen """
+        deleted, _ = self.get_queryset().filter(pk=medication.pk, version=medication.version).delete()
+        if not deleted:
+            return precondition_failed(self.get_medication(pk))
+        log.info(f'medication instance has been deleted successfully')
+        return Response({'status': status.HTTP_200_OK, 'detail': 'medication has been succesfully deleted'})
+
+
+def etag(medication):
+    """
+    returns the strong etag of a medication's current version
+    """
+    return f'"{medication.version}"'
+
+
+def parse_etags(header):
+    """
+    returns the etags listed in an If-Match or If-None-Match header
+    """
+    return {tag.strip() for tag in header.split(',') if tag.strip()}
+
+
+def if_match(request, medication):
+    """
+    checks the request's If-Match header against the medication's current version.
+    without the header the version just read is the one the update will be checked against
+    """
+    etags = parse_etags(request.headers.get('If-Match', ''))
+    if etags and '*' not in etags and etag(medication) not in etags:
+        log.error(f'medication has changed since the version the requesting user holds')
+        return False
+    return True
+
+
+def precondition_failed(medication):
+    """
+    answers a conditional request made against an outdated version of a medication
+    """
+    log.error(f'medication was not changed because another user has changed it first')
+    headers = {} if medication is None else {'ETag': etag(medication)}
+    return Response({'status': status.HTTP_412_PRECONDITION_FAILED, 'detail': 'medication has been changed by another user, retrieve it and try again'},
+                    status=status.HTTP_412_PRECONDITION_FAILED, headers=headers)
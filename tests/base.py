@@ -0,0 +1,50 @@
+from users.models import Owner, RetailStaff
+from users.permissions import user_cache
+from users.throttling import buckets
+from stock.cache import catalog_cache
+from django.test import TestCase
+from datetime import date
+
+
+def create_staff(name='retail'):
+    """
+    creates a retail_staff logging in as <name>@mail.com with the password <name>1234
+    """
+    staff = RetailStaff(email=f'{name}@mail.com', first_name=name, last_name='staff', username=name, date_of_birth=date.today())
+    staff.set_password(f'{name}1234')
+    staff.save()
+    return staff
+
+
+def create_owner(name='owner'):
+    """
+    creates a store admin owner logging in as <name>@mail.com with the password <name>1234
+    """
+    owner = Owner(email=f'{name}@mail.com', first_name=name, last_name='kanu', username=name, date_of_birth=date.today(), is_store_admin=True)
+    owner.set_password(f'{name}1234')
+    owner.save()
+    return owner
+
+
+class CacheResetMixin:
+    """
+    clears the in-process user cache, login throttle buckets and catalog cache around every test,
+    so nothing cached by one test serves another
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        user_cache.clear()
+        buckets.clear()
+        catalog_cache.clear()
+
+    def tearDown(self):
+        """Run once after all tests"""
+        catalog_cache.clear()
+        super().tearDown()
+
+
+class CacheResetTestCase(CacheResetMixin, TestCase):
+    """
+    django TestCase starting every test with empty caches
+    """
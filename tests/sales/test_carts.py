@@ -0,0 +1,105 @@
+from sales.models import Cart, CartItem
+from sales.carts import add_to_cart, merge_lines
+from stock.models import Medication
+from users.activity import activity
+from tests.base import CacheResetTestCase, create_staff
+from django.db import connection
+from django.test import Client as Clientt
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+import json
+
+
+class TestAddToCart(CacheResetTestCase):
+    """
+    test suite for the bulk upsert of cart items
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.staff = create_staff()
+        self.paracetamol = Medication.objects.create(name='Paracetamol 500mg', price=Decimal('2.50'), quantity=10)
+        self.ibuprofen = Medication.objects.create(name='Ibuprofen 200mg', price=Decimal('4.00'), quantity=3)
+        self.cart = Cart.objects.create(sales_staff=self.staff)
+
+    def test_merge_lines(self):
+        """
+        lines of the same drug add up
+        """
+        paracetamol, ibuprofen = self.paracetamol, self.ibuprofen
+        merged = merge_lines([(paracetamol, 2), (ibuprofen, 1), (paracetamol, 3), (ibuprofen, 1)])
+        self.assertEqual(merged, {paracetamol.pk: (paracetamol, 5), ibuprofen.pk: (ibuprofen, 2)})
+
+    def test_scanning_a_drug_again_adds_to_its_line(self):
+        """
+        a drug already in the cart has its quantity increased instead of failing on the uniqueness
+        """
+        add_to_cart(self.cart.pk, self.staff.pk, [(self.paracetamol, 2)])
+        items, total = add_to_cart(self.cart.pk, self.staff.pk, [(self.paracetamol, 1), (self.ibuprofen, 1)])
+
+        self.assertEqual([(item.drug_id, item.quantity) for item in items], [(self.ibuprofen.pk, 1), (self.paracetamol.pk, 3)])
+        self.assertEqual(total, Decimal('11.50'))
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 2)
+
+        """ a line keeps the price it was added at """
+        Medication.objects.filter(pk=self.ibuprofen.pk).update(price=Decimal('5.00'))
+        items, total = add_to_cart(self.cart.pk, self.staff.pk, [(self.ibuprofen, 1)])
+        self.assertEqual(CartItem.objects.get(cart=self.cart, drug=self.ibuprofen).price, Decimal('4.00'))
+        self.assertEqual(total, Decimal('15.50'))
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, Decimal('15.50'))
+
+    def test_new_lines_are_priced_from_the_database(self):
+        """
+        a stale medication instance doesn't set the price of a new line
+        """
+        stale = Medication.objects.get(pk=self.paracetamol.pk)
+        Medication.objects.filter(pk=self.paracetamol.pk).update(price=Decimal('3.00'))
+        items, total = add_to_cart(self.cart.pk, self.staff.pk, [(stale, 2)])
+
+        self.assertEqual(items[0].price, Decimal('3.00'))
+        self.assertEqual(total, Decimal('6.00'))
+        self.assertEqual(CartItem.objects.get(cart=self.cart, drug=self.paracetamol).price, Decimal('3.00'))
+
+    def test_upsert_costs_a_constant_number_of_queries(self):
+        """
+        the cart is locked, the lines upserted and read back in as many queries for 30 lines as for one
+        """
+        with CaptureQueriesContext(connection) as single:
+            add_to_cart(self.cart.pk, self.staff.pk, [(self.paracetamol, 1)])
+
+        medications = [Medication.objects.create(name=f'Medication {number}', price=Decimal('1.00'), quantity=5) for number in range(30)]
+        with CaptureQueriesContext(connection) as many:
+            items, total = add_to_cart(self.cart.pk, self.staff.pk, [(medication, 1) for medication in medications])
+        self.assertEqual(len(many), len(single))
+        self.assertEqual(len(items), 31)
+        self.assertEqual(total, Decimal('32.50'))
+
+    def test_only_the_staff_cart_can_be_added_to(self):
+        """
+        lines can't be added to another staff's cart
+        """
+        with self.assertRaises(Cart.DoesNotExist):
+            add_to_cart(self.cart.pk, create_staff('other').pk, [(self.paracetamol, 1)])
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_bulk_endpoint(self):
+        """
+        the endpoint returns the cart lines with their total, validates every line and ignores client prices
+        """
+        client = Clientt()
+        response = client.post('/api/v1/login/', data={'email': 'retail@mail.com', 'password': 'retail1234'})
+        self.assertEqual(response.status_code, 201, "Could not login retail_staff")
+        activity.flush()
+
+        items = [{'drug': str(self.paracetamol.pk), 'quantity': 2}, {'drug': str(self.paracetamol.pk), 'quantity': 1},
+                 {'drug': str(self.ibuprofen.pk), 'quantity': 1, 'price': '3.50'}]
+        response = client.post('/api/v1/cart-item/bulk/', data=json.dumps({'cart': str(self.cart.pk), 'items': items}), content_type='application/json')
+        self.assertEqual(response.data['status'], 200)
+        self.assertEqual(response.data['data']['total_price'], '11.50')
+        self.assertEqual([line['quantity'] for line in response.data['data']['items']], [1, 3])
+
+        items = [{'drug': str(self.paracetamol.pk), 'quantity': 0}]
+        response = client.post('/api/v1/cart-item/bulk/', data=json.dumps({'cart': str(self.cart.pk), 'items': items}), content_type='application/json')
+        self.assertEqual(response.data['status'], 400)
+        self.assertEqual(CartItem.objects.get(cart=self.cart, drug=self.paracetamol).quantity, 3)
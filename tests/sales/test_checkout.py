@@ -0,0 +1,124 @@
+from sales.models import Cart, CartItem, Order, OrderItem
+from sales.checkout import checkout, CheckoutRejected
+from stock.inventory import InsufficientStock
+from stock.models import Medication
+from users.activity import activity
+from stock.cache import catalog_cache
+from tests.base import CacheResetTestCase, create_staff
+from django.db import connection
+from django.test import Client as Clientt
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+
+
+class TestCheckout(CacheResetTestCase):
+    """
+    test suite for turning a cart into an order
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.staff = create_staff()
+        self.paracetamol = Medication.objects.create(name='Paracetamol 500mg', price=Decimal('2.50'), quantity=10)
+        self.ibuprofen = Medication.objects.create(name='Ibuprofen 200mg', price=Decimal('4.00'), quantity=3)
+        self.cart = Cart.objects.create(sales_staff=self.staff)
+        CartItem.objects.create(cart=self.cart, drug=self.paracetamol, quantity=4)
+        CartItem.objects.create(cart=self.cart, drug=self.ibuprofen, quantity=2, price=Decimal('3.50'))
+
+    def test_checkout_turns_the_cart_into_an_order(self):
+        """
+        the order holds the cart lines at their prices, the stock is taken and the cart is gone
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            order, order_items = checkout(self.cart.pk, self.staff.pk)
+
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, Decimal('17.00'))
+        self.assertEqual(order.sales_staff_id, self.staff.pk)
+        prices = dict(OrderItem.objects.filter(order=order).values_list('drug_id', 'price'))
+        self.assertEqual(prices, {self.paracetamol.pk: Decimal('2.50'), self.ibuprofen.pk: Decimal('3.50')})
+        self.assertEqual(len(order_items), 2)
+        self.assertFalse(Cart.objects.filter(pk=self.cart.pk).exists())
+        self.assertFalse(CartItem.objects.exists())
+
+        self.paracetamol.refresh_from_db()
+        self.ibuprofen.refresh_from_db()
+        self.assertEqual((self.paracetamol.quantity, self.ibuprofen.quantity), (6, 1))
+        self.assertEqual(catalog_cache.get_medication(self.paracetamol.pk).quantity, 6)
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        """
+        a 20 line cart costs as many queries as a 2 line one
+        """
+        with CaptureQueriesContext(connection) as small:
+            checkout(self.cart.pk, self.staff.pk)
+
+        cart = Cart.objects.create(sales_staff=self.staff)
+        for number in range(20):
+            medication = Medication.objects.create(name=f'Medication {number}', price=Decimal('1.00'), quantity=5)
+            CartItem.objects.create(cart=cart, drug=medication, quantity=1)
+        with CaptureQueriesContext(connection) as large:
+            order, order_items = checkout(cart.pk, self.staff.pk)
+
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 20)
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, Decimal('20.00'))
+
+    def test_insufficient_stock_leaves_nothing_behind(self):
+        """
+        a line the stock can't cover rolls the whole checkout back
+        """
+        CartItem.objects.filter(drug=self.ibuprofen).update(quantity=5)
+        with self.assertRaises(InsufficientStock) as raised:
+            checkout(self.cart.pk, self.staff.pk)
+
+        self.assertEqual(raised.exception.medication.pk, self.ibuprofen.pk)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 2)
+        self.paracetamol.refresh_from_db()
+        self.assertEqual(self.paracetamol.quantity, 10)
+
+    def test_only_filled_carts_of_the_staff_can_be_checked_out(self):
+        """
+        empty carts and carts of other staff are refused, a cart can't be checked out twice
+        """
+        with self.assertRaises(Cart.DoesNotExist):
+            checkout(self.cart.pk, create_staff('other').pk)
+        with self.assertRaises(CheckoutRejected):
+            checkout(Cart.objects.create(sales_staff=self.staff).pk, self.staff.pk)
+
+        checkout(self.cart.pk, self.staff.pk)
+        with self.assertRaises(Cart.DoesNotExist):
+            checkout(self.cart.pk, self.staff.pk)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_checkout_endpoint(self):
+        """
+        the endpoint returns the order with its items, or a 409 when the stock runs short
+        """
+        client = Clientt()
+        response = client.post('/api/v1/login/', data={'email': 'retail@mail.com', 'password': 'retail1234'})
+        self.assertEqual(response.status_code, 201, "Could not login retail_staff")
+        activity.flush()
+
+        response = client.post('/api/v1/order/checkout/', data={'cart_id': 'not-a-uuid'})
+        self.assertEqual(response.data['status'], 400)
+
+        short = Cart.objects.create(sales_staff=self.staff)
+        CartItem.objects.create(cart=short, drug=self.ibuprofen, quantity=4)
+        response = client.post('/api/v1/order/checkout/', data={'cart_id': short.pk})
+        self.assertEqual(response.data['status'], 409)
+
+        response = client.post('/api/v1/order/checkout/', data={'cart_id': self.cart.pk})
+        self.assertEqual(response.data['status'], 201)
+        self.assertEqual(response.data['data']['total_price'], '17.00')
+        self.assertEqual(len(response.data['data']['items']), 2)
+
+        """ version 2 clients get the items' prices as numbers like the order total """
+        cart = Cart.objects.create(sales_staff=self.staff)
+        CartItem.objects.create(cart=cart, drug=self.paracetamol, quantity=1)
+        response = client.post('/api/v1/order/checkout/', data={'cart_id': cart.pk}, HTTP_ACCEPT='application/json; version=2')
+        self.assertEqual(response.data['status'], 201)
+        self.assertEqual(response.data['data']['total_price'], 2.5)
+        self.assertEqual([item['price'] for item in response.data['data']['items']], [2.5])
@@ -0,0 +1,103 @@
+from sales.models import Cart, CartItem, Order, OrderItem
+from stock.models import Medication
+from users.activity import activity
+from tests.base import CacheResetTestCase, create_owner, create_staff
+from django.db import connection
+from django.test import Client as Clientt
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+
+
+class TestExpand(CacheResetTestCase):
+    """
+    test suite for the nested cart and order representations
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.staff = create_staff()
+        create_owner()
+        self.medications = [Medication.objects.create(name=f'Medication {number}', price=Decimal('2.50'), quantity=50) for number in range(5)]
+        self.order = self.create_order(3)
+
+        self.client = Clientt()
+        response = self.client.post('/api/v1/login/', data={'email': 'retail@mail.com', 'password': 'retail1234'})
+        self.assertEqual(response.status_code, 201, "Could not login retail_staff")
+        self.owner_client = Clientt()
+        response = self.owner_client.post('/api/v1/login/', data={'email': 'owner@mail.com', 'password': 'owner1234'})
+        self.assertEqual(response.status_code, 201, "Could not login owner")
+        activity.flush()
+
+    def tearDown(self):
+        """Run once after all tests"""
+        self.client = self.owner_client = None
+        super().tearDown()
+
+    def create_order(self, lines):
+        order = Order.objects.create(sales_staff=self.staff)
+        for medication in self.medications[:lines]:
+            OrderItem.objects.create(order=order, drug=medication, quantity=2)
+        return order
+
+    def test_receipt_in_one_call(self):
+        """
+        an order expands to its staff and its lines with their medications in two queries
+        """
+        url = f'/api/v1/order/{self.order.pk}/?expand=items,items.drug,sales_staff'
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        data = response.data['data']
+        self.assertEqual(data['sales_staff']['email'], 'retail@mail.com')
+        self.assertNotIn('password', data['sales_staff'])
+        self.assertEqual(data['total_price'], '15.00')
+        self.assertEqual(len(data['items']), 3)
+        self.assertEqual(data['items'][0]['drug']['price'], '2.50')
+
+    def test_expansions_are_optional(self):
+        """
+        without expand the representation is unchanged, items alone keep the medications as keys
+        """
+        data = self.client.get(f'/api/v1/order/{self.order.pk}/').data['data']
+        self.assertEqual(data['sales_staff'], self.staff.pk)
+        self.assertNotIn('items', data)
+
+        with self.assertNumQueries(2):
+            data = self.client.get(f'/api/v1/order/{self.order.pk}/?expand=items').data['data']
+        self.assertEqual({item['drug'] for item in data['items']}, {medication.pk for medication in self.medications[:3]})
+
+    def test_list_query_count_does_not_grow_with_the_orders(self):
+        """
+        listing expanded orders costs as many queries for one order as for many
+        """
+        url = '/api/v1/order/?expand=items,items.drug,sales_staff'
+        with CaptureQueriesContext(connection) as few:
+            response = self.owner_client.get(url)
+        self.assertEqual(len(response.data['data']), 1)
+
+        for lines in range(1, 6):
+            self.create_order(lines)
+        with CaptureQueriesContext(connection) as many:
+            response = self.owner_client.get(url)
+        self.assertEqual(len(response.data['data']), 6)
+        self.assertEqual(len(many), len(few))
+
+    def test_cart_expansion(self):
+        """
+        carts expand like orders
+        """
+        cart = Cart.objects.create(sales_staff=self.staff)
+        CartItem.objects.create(cart=cart, drug=self.medications[0], quantity=1)
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/v1/cart/{cart.pk}/?expand=items.drug,sales_staff')
+        data = response.data['data']
+        self.assertEqual(data['items'][0]['drug']['name'], 'Medication 0')
+        self.assertEqual(data['sales_staff']['username'], 'retail')
+
+    def test_unknown_or_malformed_ids_are_not_found(self):
+        """
+        a missing or non uuid id gets the 404 payload instead of an error
+        """
+        for url in ('/api/v1/order/notauuid/', f'/api/v1/order/{self.medications[0].pk}/', '/api/v1/cart/notauuid/?expand=items'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['status'], 404)
@@ -0,0 +1,117 @@
+from sales.models import Cart, Order
+from users.activity import activity
+from tests.base import CacheResetTestCase, create_owner, create_staff
+from django.db import connection
+from django.test import Client as Clientt
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import datetime, timedelta
+
+
+class TestHistory(CacheResetTestCase):
+    """
+    test suite for the filtered and keyset paginated cart and order history
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.staff, self.other = create_staff(), create_staff('other')
+        create_owner()
+
+        """ 24 orders over 4 days, two of each staff's sharing a time stamp to exercise the tie breaking """
+        self.today = timezone.localdate()
+        for day in range(4):
+            for hour in range(6):
+                time_stamp = timezone.make_aware(datetime.combine(self.today - timedelta(days=day), datetime.min.time()) + timedelta(hours=8 + hour // 2))
+                Order.objects.create(sales_staff=self.staff if hour % 2 else self.other, date=self.today - timedelta(days=day), time_stamp=time_stamp)
+
+        self.client = Clientt()
+        response = self.client.post('/api/v1/login/', data={'email': 'owner@mail.com', 'password': 'owner1234'})
+        self.assertEqual(response.status_code, 201, "Could not login owner")
+        self.retail_client = Clientt()
+        response = self.retail_client.post('/api/v1/login/', data={'email': 'retail@mail.com', 'password': 'retail1234'})
+        self.assertEqual(response.status_code, 201, "Could not login retail_staff")
+        activity.flush()
+
+    def tearDown(self):
+        """Run once after all tests"""
+        self.client = self.retail_client = None
+        super().tearDown()
+
+    def key(self, order):
+        return (order['date'], order['time_stamp'], order['order_id'])
+
+    def test_pages_cover_the_history_newest_first(self):
+        """
+        following next links visits every order once in (date, time_stamp, id) descending order
+        """
+        response = self.client.get('/api/v1/order/?page_size=5')
+        pages = [response.data]
+        while pages[-1]['next']:
+            pages.append(self.client.get(pages[-1]['next']).data)
+
+        orders = [order for page in pages for order in page['data']]
+        self.assertEqual(len(pages), 5)
+        self.assertEqual(len(orders), 24)
+        self.assertEqual(len(set(order['order_id'] for order in orders)), 24)
+        keys = [self.key(order) for order in orders]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        self.assertIsNone(pages[0]['previous'])
+
+        """ a previous link leads back to the page before """
+        previous = self.client.get(pages[2]['previous']).data
+        self.assertEqual([order['order_id'] for order in previous['data']], [order['order_id'] for order in pages[1]['data']])
+
+    def test_page_query_count_does_not_grow_with_the_history(self):
+        """
+        a page deep in the history costs as many queries as the first one
+        """
+        first = self.client.get('/api/v1/order/?page_size=5').data
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/v1/order/?page_size=5')
+        second = first
+        for _ in range(3):
+            second = self.client.get(second['next']).data
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(second['next'])
+        self.assertEqual(len(deep), len(queries))
+        self.assertEqual(len(queries), 1)
+
+    def test_date_and_staff_filters(self):
+        """
+        from, to and staff narrow the history, invalid values are refused
+        """
+        yesterday = (self.today - timedelta(days=1)).isoformat()
+        response = self.client.get(f'/api/v1/order/?from={yesterday}&to={self.today.isoformat()}&staff={self.staff.pk}')
+        self.assertEqual(len(response.data['data']), 6)
+        self.assertEqual({order['sales_staff'] for order in response.data['data']}, {self.staff.pk})
+
+        response = self.client.get(f'/api/v1/order/?to={yesterday}')
+        self.assertEqual(len(response.data['data']), 10)
+        self.assertIsNotNone(response.data['next'])
+
+        self.assertEqual(self.client.get('/api/v1/order/?from=yesterday').data['status'], 400)
+        self.assertEqual(self.client.get('/api/v1/order/?staff=42').data['status'], 400)
+
+    def test_retail_staff_see_their_own_history(self):
+        """
+        retail staff get their own orders of today by default, and never another staff's
+        """
+        response = self.retail_client.get('/api/v1/order/')
+        self.assertEqual(response.data['status'], 200)
+        self.assertEqual(len(response.data['data']), 3)
+
+        response = self.retail_client.get(f'/api/v1/order/?from={(self.today - timedelta(days=3)).isoformat()}&staff={self.other.pk}')
+        self.assertEqual(len(response.data['data']), 10)
+        self.assertEqual({order['sales_staff'] for order in response.data['data']}, {self.staff.pk})
+
+    def test_cart_history(self):
+        """
+        carts are filtered and paginated like orders, an empty history is an empty page
+        """
+        self.assertEqual(self.retail_client.get('/api/v1/cart/').data['data'], [])
+        Cart.objects.create(sales_staff=self.staff)
+        Cart.objects.create(sales_staff=self.other)
+        response = self.retail_client.get('/api/v1/cart/')
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertEqual(len(self.client.get('/api/v1/cart/').data['data']), 2)
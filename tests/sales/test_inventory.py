@@ -0,0 +1,122 @@
+from sales.models import Order, OrderItem
+from sales.serializers import OrderItemSerializer
+from stock.inventory import take_stock, InsufficientStock
+from stock.models import Medication
+from concurrent.futures import ThreadPoolExecutor
+from tests.base import CacheResetMixin, CacheResetTestCase, create_staff
+from django.db import connection
+from django.test import TransactionTestCase, Client as Clientt
+from decimal import Decimal
+import unittest
+
+
+class TestTakeStock(CacheResetTestCase):
+    """
+    test suite for the conditional stock decrement
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.staff = create_staff()
+        self.medication = Medication.objects.create(name='Paracetamol 500mg', price=Decimal('2.50'), quantity=5)
+        self.order = Order.objects.create(sales_staff=self.staff)
+
+    def test_take_stock_is_a_single_conditional_update(self):
+        """
+        stock is taken with one query and refused once it runs out
+        """
+        with self.assertNumQueries(1):
+            take_stock(self.medication, 3)
+        with self.assertRaises(InsufficientStock):
+            take_stock(self.medication, 3)
+        self.medication.refresh_from_db()
+        self.assertEqual(self.medication.quantity, 2)
+
+    def test_stale_instances_do_not_lose_updates(self):
+        """
+        sales made from stale copies of a medication still add up, the database does the arithmetic
+        """
+        first, second = Medication.objects.get(pk=self.medication.pk), Medication.objects.get(pk=self.medication.pk)
+        take_stock(first, 2)
+        take_stock(second, 2)
+        with self.assertRaises(InsufficientStock):
+            take_stock(first, 2)
+        self.medication.refresh_from_db()
+        self.assertEqual(self.medication.quantity, 1)
+
+    def test_order_item_creation_takes_stock(self):
+        """
+        creating an order item takes its quantity, a failed one leaves neither an item nor a decrement
+        """
+        serializer = OrderItemSerializer(data={'order': self.order.pk, 'drug': self.medication.pk, 'quantity': 4})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.medication.refresh_from_db()
+        self.assertEqual(self.medication.quantity, 1)
+
+        other = Order.objects.create(sales_staff=self.staff)
+        serializer = OrderItemSerializer(data={'order': other.pk, 'drug': self.medication.pk, 'quantity': 2})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertRaises(InsufficientStock):
+            serializer.save()
+        self.assertFalse(OrderItem.objects.filter(order=other).exists())
+        self.medication.refresh_from_db()
+        self.assertEqual(self.medication.quantity, 1)
+
+    def test_order_item_quantity_must_be_positive(self):
+        """
+        an order item must take at least one unit
+        """
+        serializer = OrderItemSerializer(data={'order': self.order.pk, 'drug': self.medication.pk, 'quantity': 0})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('quantity', serializer.errors)
+
+    def test_order_item_endpoint_reports_insufficient_stock(self):
+        """
+        the order item endpoint refuses a sale the stock can't cover
+        """
+        client = Clientt()
+        response = client.post('/api/v1/login/', data={'email': 'retail@mail.com', 'password': 'retail1234'})
+        self.assertEqual(response.status_code, 201, "Could not login retail_staff")
+
+        response = client.post('/api/v1/order-item/', data={'order': self.order.pk, 'drug': self.medication.pk, 'quantity': 6})
+        self.assertEqual(response.data['status'], 409)
+        response = client.post('/api/v1/order-item/', data={'order': self.order.pk, 'drug': self.medication.pk, 'quantity': 5})
+        self.assertEqual(response.data['status'], 201)
+        self.medication.refresh_from_db()
+        self.assertEqual(self.medication.quantity, 0)
+
+
+@unittest.skipIf(connection.vendor == 'sqlite', 'sqlite serialises writers, run against postgres to exercise row locking')
+class TestConcurrentCheckouts(CacheResetMixin, TransactionTestCase):
+    """
+    fires parallel sales at the same medication
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.staff = create_staff()
+        self.medication = Medication.objects.create(name='Paracetamol 500mg', price=Decimal('2.50'), quantity=50)
+
+    def sell(self, n):
+        try:
+            order = Order.objects.create(sales_staff=self.staff)
+            serializer = OrderItemSerializer(data={'order': order.pk, 'drug': self.medication.pk, 'quantity': 3})
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            return True
+        except InsufficientStock:
+            return False
+        finally:
+            connection.close()
+
+    def test_parallel_sales_never_oversell(self):
+        """
+        of 40 parallel sales of 3 units from 50, exactly 16 succeed and 2 units are left
+        """
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(self.sell, range(40)))
+        self.medication.refresh_from_db()
+        self.assertEqual(results.count(True), 16)
+        self.assertEqual(self.medication.quantity, 2)
+        self.assertEqual(OrderItem.objects.count(), 16)
@@ -0,0 +1,144 @@
+from sales.models import Cart, CartItem, Order, OrderItem
+from sales.serializers import CartItemSerializer, OrderItemSerializer
+from sales.totals import find_drift
+from stock.models import Medication
+from tests.base import CacheResetTestCase, create_staff
+from django.core.management import call_command
+from decimal import Decimal
+from io import StringIO
+
+
+class TestRunningTotals(CacheResetTestCase):
+    """
+    test suite for the server maintained cart and order totals
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.staff = create_staff()
+        self.paracetamol = Medication.objects.create(name='Paracetamol 500mg', price=Decimal('2.50'), quantity=10)
+        self.ibuprofen = Medication.objects.create(name='Ibuprofen 200mg', price=Decimal('4.00'), quantity=10)
+        self.cart = Cart.objects.create(sales_staff=self.staff)
+
+    def total(self, parent):
+        parent.refresh_from_db()
+        return parent.total_price
+
+    def test_line_changes_adjust_the_cart_total(self):
+        """
+        inserting, updating and deleting lines keeps the total equal to the sum of the lines
+        """
+        line = CartItem.objects.create(cart=self.cart, drug=self.paracetamol, quantity=2)
+        self.assertEqual(line.price, Decimal('2.50'))
+        CartItem.objects.create(cart=self.cart, drug=self.ibuprofen, quantity=1, price=Decimal('3.00'))
+        self.assertEqual(self.total(self.cart), Decimal('8.00'))
+
+        line = CartItem.objects.get(pk=line.pk)
+        line.quantity = 4
+        line.save()
+        self.assertEqual(self.total(self.cart), Decimal('13.00'))
+
+        line.delete()
+        self.assertEqual(self.total(self.cart), Decimal('3.00'))
+        self.assertEqual(find_drift(CartItem), [])
+
+    def test_totals_do_not_follow_catalog_prices(self):
+        """
+        a line keeps the price it was added at when the medication's price changes
+        """
+        CartItem.objects.create(cart=self.cart, drug=self.paracetamol, quantity=2)
+        self.paracetamol.price = Decimal('9.99')
+        self.paracetamol.save()
+        self.assertEqual(self.total(self.cart), Decimal('5.00'))
+        self.assertEqual(find_drift(CartItem), [])
+
+    def test_lines_are_priced_from_the_database(self):
+        """
+        a line saved with a stale medication instance takes the price stored on the database
+        """
+        Medication.objects.filter(pk=self.paracetamol.pk).update(price=Decimal('3.00'))
+        line = CartItem.objects.create(cart=self.cart, drug=self.paracetamol, quantity=2)
+        self.assertEqual(line.price, Decimal('3.00'))
+        self.assertEqual(self.total(self.cart), Decimal('6.00'))
+
+    def test_concurrent_edits_of_a_line_do_not_drift(self):
+        """
+        edits made from copies loaded before each other adjust the total from the stored amount, not the loaded one
+        """
+        line = CartItem.objects.create(cart=self.cart, drug=self.paracetamol, quantity=2)
+        first, second, third = (CartItem.objects.get(pk=line.pk) for _ in range(3))
+        first.quantity = 4
+        first.save()
+        second.quantity = 5
+        second.save()
+        self.assertEqual(self.total(self.cart), Decimal('12.50'))
+
+        third.delete()
+        self.assertEqual(self.total(self.cart), Decimal('0.00'))
+        self.assertEqual(find_drift(CartItem), [])
+
+    def test_moving_a_line_adjusts_both_parents(self):
+        """
+        a line moved to another order leaves the first one's total for the second one's
+        """
+        first, second = Order.objects.create(sales_staff=self.staff), Order.objects.create(sales_staff=self.staff)
+        line = OrderItem.objects.create(order=first, drug=self.ibuprofen, quantity=2)
+        line = OrderItem.objects.get(pk=line.pk)
+        line.order = second
+        line.save()
+        self.assertEqual((self.total(first), self.total(second)), (Decimal('0.00'), Decimal('8.00')))
+
+    def test_serializers_cannot_set_totals(self):
+        """
+        the total is read only, the lines written through the serializers adjust it
+        """
+        serializer = CartItemSerializer(data={'cart': self.cart.pk, 'drug': self.paracetamol.pk, 'quantity': 3})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.assertEqual(self.total(self.cart), Decimal('7.50'))
+
+        order = Order.objects.create(sales_staff=self.staff)
+        serializer = OrderItemSerializer(data={'order': order.pk, 'drug': self.ibuprofen.pk, 'quantity': 2})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.assertEqual(self.total(order), Decimal('8.00'))
+
+    def test_serializers_cannot_set_prices(self):
+        """
+        a price sent by the client is ignored, and a line moved to another medication takes its price
+        """
+        serializer = CartItemSerializer(data={'cart': self.cart.pk, 'drug': self.paracetamol.pk, 'quantity': 2, 'price': '0.01'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        line = serializer.save()
+        self.assertEqual(line.price, Decimal('2.50'))
+
+        serializer = CartItemSerializer(line, data={'drug': self.ibuprofen.pk, 'price': '0.01'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.save().price, Decimal('4.00'))
+        self.assertEqual(self.total(self.cart), Decimal('8.00'))
+
+    def test_deleting_a_cart_skips_the_adjustments(self):
+        """
+        lines deleted along with their cart don't update it one by one
+        """
+        for medication in (self.paracetamol, self.ibuprofen):
+            CartItem.objects.create(cart=self.cart, drug=medication, quantity=1)
+        with self.assertNumQueries(3):
+            self.cart.delete()
+
+    def test_reconcile_command_flags_and_fixes_drift(self):
+        """
+        drifted totals are reported, and rewritten with --fix
+        """
+        CartItem.objects.create(cart=self.cart, drug=self.paracetamol, quantity=2)
+        Cart.objects.filter(pk=self.cart.pk).update(total_price=Decimal('1.00'))
+
+        out, err = StringIO(), StringIO()
+        call_command('reconcile_totals', stdout=out, stderr=err)
+        self.assertIn('1 drifted totals found', out.getvalue())
+        self.assertIn(str(self.cart.pk), err.getvalue())
+        self.assertEqual(self.total(self.cart), Decimal('1.00'))
+
+        call_command('reconcile_totals', '--fix', stdout=out, stderr=err)
+        self.assertEqual(self.total(self.cart), Decimal('5.00'))
+        self.assertEqual(find_drift(CartItem), [])
@@ -0,0 +1,82 @@
+from stock.models import Medication
+from stock.inventory import adjust_stock, AdjustmentRejected
+from stock.barcodes import lookup_barcodes
+from users.models import Owner
+from tests.base import CacheResetTestCase
+from django.test import Client as Clientt
+from decimal import Decimal
+from datetime import date
+import json
+import uuid
+
+
+class TestStockAdjustment(CacheResetTestCase):
+    """
+    test suite for bulk stocktake adjustments
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.medications = Medication.objects.bulk_create(
+            [Medication(name=f'drug{n:04}', price=Decimal('1.00'), quantity=10, barcode=f'B{n}') for n in range(2000)])
+
+    def test_stocktake_is_one_update(self):
+        """
+        a 2,000 line stocktake mixing deltas and counts costs one update and one read back
+        """
+        deltas = {medication.pk: -n % 7 for n, medication in enumerate(self.medications[:1000])}
+        absolutes = {medication.pk: n for n, medication in enumerate(self.medications[1000:])}
+        with self.assertNumQueries(2 + 2):
+            adjusted = adjust_stock(deltas, absolutes)
+
+        self.assertEqual(len(adjusted), 2000)
+        self.assertEqual(adjusted[self.medications[3].pk], (10 + (-3 % 7), 1))
+        self.assertEqual(adjusted[self.medications[1005].pk], (5, 1))
+        self.assertEqual(Medication.objects.get(pk=self.medications[1005].pk).quantity, 5)
+
+    def test_negative_or_missing_rolls_everything_back(self):
+        """
+        nothing is adjusted when a medication is missing or would drop below zero
+        """
+        first, second = self.medications[0], self.medications[1]
+        with self.assertRaises(AdjustmentRejected) as rejected:
+            adjust_stock({first.pk: 5, second.pk: -11}, {})
+        self.assertEqual(rejected.exception.drug_ids, [str(second.pk)])
+
+        missing = uuid.uuid4()
+        with self.assertRaises(AdjustmentRejected) as rejected:
+            adjust_stock({first.pk: 5}, {missing: 1})
+        self.assertEqual(rejected.exception.drug_ids, [str(missing)])
+        self.assertEqual(Medication.objects.get(pk=first.pk).quantity, 10)
+
+    def test_adjustment_evicts_cached_scans(self):
+        """
+        cached scans see the counted quantity
+        """
+        lookup_barcodes(['B0'])
+        with self.captureOnCommitCallbacks(execute=True):
+            adjust_stock({}, {self.medications[0].pk: 3})
+        self.assertEqual(lookup_barcodes(['B0'])['B0'].quantity, 3)
+
+    def test_adjust_endpoint(self):
+        """
+        store admins post a stocktake and get the resulting quantities back
+        """
+        owner = Owner(email='owner@mail.com', first_name='owner', last_name='kanu', username='owner', date_of_birth=date.today(), is_store_admin=True)
+        owner.set_password('owner1234')
+        owner.save()
+        client = Clientt()
+        response = client.post('/api/v1/login/', data={'email': 'owner@mail.com', 'password': 'owner1234'})
+        self.assertEqual(response.status_code, 201, "Could not login owner")
+
+        first, second = str(self.medications[0].pk), str(self.medications[1].pk)
+        post = lambda data: client.post('/api/v1/medication/adjust/', data=json.dumps(data), content_type='application/json')
+        response = post({'delta': {first: -4}, 'absolute': {second: 0}})
+        self.assertEqual(response.data['status'], 200)
+        self.assertEqual(response.data['data'], {first: {'quantity': 6, 'version': 1}, second: {'quantity': 0, 'version': 1}})
+
+        self.assertEqual(post({'delta': {second: -1}}).data['status'], 409)
+        self.assertEqual(post({'delta': {first: 1}, 'absolute': {first: 1}}).data['status'], 400)
+        self.assertEqual(post({'absolute': {first: -1}}).data['status'], 400)
+        self.assertEqual(post({'delta': {'not-a-uuid': 1}}).data['status'], 400)
+        self.assertEqual(post({}).data['status'], 400)
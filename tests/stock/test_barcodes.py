@@ -0,0 +1,97 @@
+from stock.models import Medication
+from stock.barcodes import lookup_barcodes
+from stock.cache import catalog_cache
+from stock.serializers import MedicationSerializer
+from users.models import RetailStaff
+from tests.base import CacheResetTestCase
+from django.db import IntegrityError, transaction
+from django.test import Client as Clientt
+from decimal import Decimal
+from datetime import date
+
+
+class TestBarcodeLookup(CacheResetTestCase):
+    """
+    test suite for scanning medications by barcode
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.client = Clientt()
+        staff = RetailStaff(email='retail@mail.com', first_name='retail', last_name='staff', username='retail', date_of_birth=date.today())
+        staff.set_password('retail1234')
+        staff.save()
+        self.paracetamol = Medication.objects.create(name='Paracetamol 500mg', price=Decimal('2.50'), quantity=10, barcode='5012345678900')
+        self.ibuprofen = Medication.objects.create(name='Ibuprofen 400mg', price=Decimal('3.00'), quantity=4, barcode='SKU-0042')
+        Medication.objects.create(name='Loose Cotton Wool', price=Decimal('1.00'), quantity=3)
+        response = self.client.post('/api/v1/login/', data={'email': 'retail@mail.com', 'password': 'retail1234'})
+        self.assertEqual(response.status_code, 201, "Could not login retail_staff")
+
+    def tearDown(self):
+        """Run once after all tests"""
+        self.client = None
+        super().tearDown()
+
+    def test_barcodes_are_unique(self):
+        """
+        two medications can't share a barcode, while any number can have none
+        """
+        Medication.objects.create(name='Plasters', price=Decimal('1.00'), quantity=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Medication.objects.create(name='Fake Paracetamol', price=Decimal('1.00'), quantity=1, barcode='5012345678900')
+
+    def test_batch_lookup_reads_through_the_cache(self):
+        """
+        a batch of codes costs one query, and none once the codes are cached
+        """
+        with self.assertNumQueries(1):
+            found = lookup_barcodes(['5012345678900', 'SKU-0042', 'unknown'])
+        self.assertEqual({code: medication.pk for code, medication in found.items()},
+                         {'5012345678900': self.paracetamol.pk, 'SKU-0042': self.ibuprofen.pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(len(lookup_barcodes(['5012345678900', 'SKU-0042'])), 2)
+
+        """ scans live on the catalog cache and are dropped by its invalidation """
+        catalog_cache.invalidate([self.ibuprofen.pk], barcodes=['SKU-0042'])
+        self.assertIsNone(catalog_cache.get('barcode:SKU-0042'))
+        self.assertIsNotNone(catalog_cache.get('barcode:5012345678900'))
+
+    def test_saves_and_deletes_evict_the_cache(self):
+        """
+        committed changes evict both the new and the previous barcode
+        """
+        lookup_barcodes(['5012345678900', 'SKU-0042'])
+        with self.captureOnCommitCallbacks(execute=True):
+            paracetamol = Medication.objects.get(pk=self.paracetamol.pk)
+            paracetamol.barcode = '5012345678917'
+            paracetamol.quantity = 9
+            paracetamol.save()
+            self.ibuprofen.delete()
+
+        self.assertEqual(lookup_barcodes(['5012345678900', 'SKU-0042']), {})
+        self.assertEqual(lookup_barcodes(['5012345678917'])['5012345678917'].quantity, 9)
+
+    def test_serializer_validates_barcodes(self):
+        """
+        blank barcodes are stored as none and only letters, digits and dashes are accepted
+        """
+        serializer = MedicationSerializer(data={'name': 'Plasters', 'price': '1.00', 'quantity': 1, 'barcode': ' '})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertIsNone(serializer.validated_data['barcode'])
+        serializer = MedicationSerializer(data={'name': 'Plasters', 'price': '1.00', 'quantity': 1, 'barcode': '50123 <b>'})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('barcode', serializer.errors)
+
+    def test_lookup_endpoint(self):
+        """
+        matches come back in the scanned order along with the codes that matched nothing
+        """
+        response = self.client.get('/api/v1/medication/barcode/?codes=SKU-0042,nope,5012345678900')
+        self.assertEqual(response.data['status'], 200)
+        self.assertEqual([item['name'] for item in response.data['data']], ['Ibuprofen 400mg', 'Paracetamol 500mg'])
+        self.assertEqual(response.data['missing'], ['nope'])
+
+        response = self.client.get('/api/v1/medication/barcode/?codes=nope')
+        self.assertEqual(response.data['status'], 404)
+        self.assertEqual(self.client.get('/api/v1/medication/barcode/').data['status'], 400)
+        self.assertEqual(Clientt().get('/api/v1/medication/barcode/?codes=SKU-0042').data['status'], 403)
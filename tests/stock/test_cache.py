@@ -0,0 +1,145 @@
+from stock.cache import CatalogCache, LOCAL_TIMEOUT, catalog_cache, catalog_lookups
+from stock.inventory import take_stock
+from stock.models import Medication
+from users.models import RetailStaff
+from users.activity import activity
+from concurrent.futures import ThreadPoolExecutor
+from tests.base import CacheResetTestCase
+from django.core.cache import caches
+from django.test import SimpleTestCase, Client as Clientt
+from decimal import Decimal
+from datetime import date
+from threading import Event
+from unittest import mock
+import time
+
+
+class TestCatalogCache(SimpleTestCase):
+    """
+    test suite for the catalog cache mechanics
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        caches['default'].clear()
+
+    def test_concurrent_misses_load_once(self):
+        """
+        a stampede of misses on one key calls the loader a single time
+        """
+        cache, calls, release = CatalogCache(), [], Event()
+
+        def loader():
+            calls.append(1)
+            release.wait(5)
+            return 'value'
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = [pool.submit(cache.get_or_load, 'key', loader) for _ in range(8)]
+            time.sleep(0.05)
+            release.set()
+            self.assertEqual([result.result() for result in results], ['value'] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get_or_load('key', lambda: 'reloaded'), 'value')
+
+    def test_loads_racing_an_invalidation_are_not_kept(self):
+        """
+        a value loaded while the catalog changed is served but not cached
+        """
+        cache = CatalogCache()
+
+        def loader():
+            cache.invalidate(['drug'])
+            return 'stale'
+
+        self.assertEqual(cache.get_or_load('key', loader), 'stale')
+        self.assertIsNone(cache.get('key'))
+
+    def test_shared_tier_serves_other_workers(self):
+        """
+        a row loaded by one worker is a shared hit for another, and invalidation reaches both tiers
+        """
+        first, second = CatalogCache(shared='default'), CatalogCache(shared='default')
+        self.assertEqual(first.local.ttl, LOCAL_TIMEOUT, 'the local tier must not outlive other workers invalidations')
+        first.get_or_load('medication:1', lambda: 'paracetamol')
+        hits = catalog_lookups.labels('shared', 'hit')._value.get()
+        self.assertEqual(second.get_or_load('medication:1', lambda: 'loaded again'), 'paracetamol')
+        self.assertEqual(catalog_lookups.labels('shared', 'hit')._value.get(), hits + 1)
+
+        generation = second.generation
+        first.invalidate([1])
+        self.assertEqual(second.generation, generation + 1)
+        self.assertIsNone(first.get('medication:1'))
+
+    def test_local_tier_drops_other_workers_stale_entries(self):
+        """
+        an entry invalidated by another worker stops being served locally after LOCAL_TIMEOUT seconds
+        """
+        first, second = CatalogCache(shared='default'), CatalogCache(shared='default')
+        second.get_or_load('medication:1', lambda: 'paracetamol')
+        first.invalidate([1])
+        self.assertEqual(second.get('medication:1'), 'paracetamol')
+        later = time.monotonic() + LOCAL_TIMEOUT + 1
+        with mock.patch('users.cache.time.monotonic', return_value=later):
+            self.assertIsNone(second.get('medication:1'))
+
+
+class TestCatalogCaching(CacheResetTestCase):
+    """
+    test suite for the cached catalog reads
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.client = Clientt()
+        staff = RetailStaff(email='retail@mail.com', first_name='retail', last_name='staff', username='retail', date_of_birth=date.today())
+        staff.set_password('retail1234')
+        staff.save()
+        self.medication = Medication.objects.create(name='Paracetamol 500mg', price=Decimal('2.50'), quantity=10)
+        response = self.client.post('/api/v1/login/', data={'email': 'retail@mail.com', 'password': 'retail1234'})
+        self.assertEqual(response.status_code, 201, "Could not login retail_staff")
+        activity.flush()
+
+    def tearDown(self):
+        """Run once after all tests"""
+        self.client = None
+        super().tearDown()
+
+    def test_retrieve_reads_through_the_cache(self):
+        """
+        the first retrieve loads the medication, the next ones cost no query
+        """
+        url = f'/api/v1/medication/{self.medication.pk}/'
+        misses = catalog_lookups.labels('local', 'miss')._value.get()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).data['data']['quantity'], 10)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data['data']['quantity'], 10)
+        self.assertEqual(catalog_lookups.labels('local', 'miss')._value.get(), misses + 1)
+
+    def test_listing_pages_are_cached_until_a_change(self):
+        """
+        a repeated page costs no query until a medication changes
+        """
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/medication/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/medication/')
+        self.assertEqual(response.data['data'][0]['quantity'], 10)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            take_stock(self.medication, 4)
+        self.assertEqual(self.client.get('/api/v1/medication/').data['data'][0]['quantity'], 6)
+
+    def test_saves_and_deletes_invalidate(self):
+        """
+        committed saves and deletes evict the cached medication
+        """
+        catalog_cache.get_medication(self.medication.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.medication.price = Decimal('3.00')
+            self.medication.save()
+        self.assertEqual(catalog_cache.get_medication(self.medication.pk).price, Decimal('3.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.medication.delete()
+        self.assertIsNone(catalog_cache.get_medication(self.medication.pk))
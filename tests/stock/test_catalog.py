@@ -0,0 +1,71 @@
+from stock.models import Medication
+from users.models import RetailStaff
+from users.activity import activity
+from tests.base import CacheResetTestCase
+from django.test import Client as Clientt
+from django.utils import timezone
+from rest_framework import status
+from decimal import Decimal
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+
+class TestMedicationCatalog(CacheResetTestCase):
+    """
+    test suite for the paginated medication catalog
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.client = Clientt()
+        staff = RetailStaff(email='retail@mail.com', first_name='retail', last_name='staff', username='retail', date_of_birth=date.today())
+        staff.set_password('retail1234')
+        staff.save()
+        for n in range(30):
+            Medication.objects.create(name=f'drug{n:02}', price=Decimal(n), quantity=n)
+        response = self.client.post('/api/v1/login/', data={'email': 'retail@mail.com', 'password': 'retail1234'})
+        self.assertEqual(response.status_code, 201, "Could not login retail_staff")
+        activity.flush()
+
+    def tearDown(self):
+        """Run once after all tests"""
+        self.client = None
+        super().tearDown()
+
+    def test_catalog_pages_in_name_order(self):
+        """
+        a pos terminal pages through the whole catalog by name, one bounded query per page
+        """
+        names, url = [], '/api/v1/medication/?page_size=12'
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.data['status'], status.HTTP_202_ACCEPTED)
+            names += [medication['name'] for medication in response.data['data']]
+            url = response.data['next']
+        self.assertEqual(names, [f'drug{n:02}' for n in range(30)])
+
+    def test_sparse_fieldset(self):
+        """
+        ?fields= returns only the requested fields
+        """
+        response = self.client.get('/api/v1/medication/?fields=drug_id,name,price,unknown&page_size=1')
+        self.assertEqual(set(response.data['data'][0]), {'drug_id', 'name', 'price'})
+
+    def test_updated_since_sync(self):
+        """
+        ?updated_since= returns only medications changed after the given time, oldest change first
+        """
+        since = timezone.now()
+        Medication.objects.filter(name__in=['drug05', 'drug20']).update(updated_at=since + timedelta(seconds=5))
+        medication = Medication.objects.get(name='drug01')
+        medication.quantity = 99
+        medication.save()
+
+        response = self.client.get('/api/v1/medication/?' + urlencode({'updated_since': since.isoformat(), 'fields': 'name'}))
+        names = [medication['name'] for medication in response.data['data']]
+        self.assertEqual(names[0], 'drug01')
+        self.assertEqual(sorted(names[1:]), ['drug05', 'drug20'])
+
+        response = self.client.get('/api/v1/medication/?updated_since=yesterday')
+        self.assertEqual(response.data['status'], status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,131 @@
+from stock.models import Medication
+from stock.imports import read_rows, import_medications
+from stock.barcodes import lookup_barcodes
+from stock.search import medication_index
+from users.models import Owner
+from tests.base import CacheResetTestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client as Clientt
+from decimal import Decimal
+from datetime import date
+from io import BytesIO, StringIO
+from unittest import mock
+import tempfile
+
+
+class TestMedicationImport(CacheResetTestCase):
+    """
+    test suite for the streaming medication import
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.paracetamol = Medication.objects.create(name='Paracetamol 500mg', price=Decimal('2.50'), quantity=10, barcode='5012345678900')
+
+    def tearDown(self):
+        """Run once after all tests"""
+        medication_index.build([])
+        medication_index.invalidate()
+        super().tearDown()
+
+    def test_csv_rows_create_and_update_by_barcode(self):
+        """
+        known barcodes get their price and name updated, unknown ones are created
+        """
+        csv = b'barcode,name,price,quantity\n5012345678900,Paracetamol 500mg Caplets,"1,200.50",\nSKU-1,Ibuprofen 400mg,3.00,12\n'
+        report = import_medications(read_rows(BytesIO(csv), 'csv'))
+        self.assertEqual((report.rows, report.created, report.updated, report.failed), (2, 1, 1, 0))
+
+        self.paracetamol.refresh_from_db()
+        self.assertEqual((self.paracetamol.name, self.paracetamol.price), ('Paracetamol 500mg Caplets', Decimal('1200.50')))
+        self.assertEqual(self.paracetamol.quantity, 10, 'a blank quantity must not overwrite the stock')
+        self.assertEqual(self.paracetamol.version, 1)
+        self.assertEqual(Medication.objects.get(barcode='SKU-1').quantity, 12)
+
+    def test_price_list_only_updates_prices(self):
+        """
+        a price list without names updates known barcodes and rejects unknown ones
+        """
+        ndjson = b'{"barcode": "5012345678900", "price": 3}\n\n{"barcode": "SKU-9", "price": 1}\nnot json\n'
+        report = import_medications(read_rows(BytesIO(ndjson), 'ndjson'))
+        self.assertEqual((report.rows, report.updated, report.failed), (3, 1, 2))
+        self.assertEqual([error['line'] for error in report.errors], [4, 3])
+        self.paracetamol.refresh_from_db()
+        self.assertEqual((self.paracetamol.name, self.paracetamol.price), ('Paracetamol 500mg', Decimal('3.00')))
+
+    def test_invalid_rows_are_reported_not_written(self):
+        """
+        bad rows are rejected with their line numbers while the rest are imported
+        """
+        csv = b'barcode,name,price\nok-1,Good,1\nbad code,Bad,1\nok-2,<span>Bold</span>,1\nok-3,Cheap,free\nok-1,Good again,2\n'
+        report = import_medications(read_rows(BytesIO(csv), 'csv'))
+        self.assertEqual((report.created, report.failed), (1, 4))
+        self.assertEqual(sorted(error['line'] for error in report.errors), [2, 3, 4, 5])
+        self.assertEqual(Medication.objects.get(barcode='ok-1').name, 'Good again')
+
+    def test_chunks_are_written_in_bulk(self):
+        """
+        each chunk costs a lookup and one upsert (within a savepoint here), whatever its size
+        """
+        csv = b'barcode,name,price\n' + b''.join(f'B{n},Drug {n},{n}\n'.encode() for n in range(50))
+        progress = []
+        with self.assertNumQueries(2 * 4):
+            report = import_medications(read_rows(BytesIO(csv), 'csv'), chunk_size=25, progress=lambda report: progress.append(report.created))
+        self.assertEqual(report.created, 50)
+        self.assertEqual(progress, [25, 50, 50])
+
+    def test_concurrent_edit_keeps_its_own_version(self):
+        """
+        an edit landing between the import's read and its upsert never shares its version with the imported row
+        """
+        bulk_create = Medication.objects.bulk_create
+
+        def edit_then_upsert(*args, **kwargs):
+            medication = Medication.objects.get(pk=self.paracetamol.pk)
+            medication.price = Decimal('9.99')
+            medication.save_version(['price'])
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(Medication.objects, 'bulk_create', side_effect=edit_then_upsert):
+            import_medications(read_rows(BytesIO(b'barcode,price\n5012345678900,1.25\n'), 'csv'))
+        self.paracetamol.refresh_from_db()
+        self.assertEqual((self.paracetamol.price, self.paracetamol.version), (Decimal('1.25'), 2))
+
+    def test_import_evicts_cached_scans(self):
+        """
+        a cached scan sees the imported price
+        """
+        lookup_barcodes(['5012345678900'])
+        import_medications(read_rows(BytesIO(b'barcode,price\n5012345678900,4\n'), 'csv'))
+        self.assertEqual(lookup_barcodes(['5012345678900'])['5012345678900'].price, Decimal('4.00'))
+
+    def test_management_command(self):
+        """
+        the command streams a file and reports its progress
+        """
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as upload:
+            upload.write(b'{"barcode": "SKU-1", "name": "Ibuprofen 400mg", "price": "3.00"}\n')
+            upload.flush()
+            out = StringIO()
+            call_command('import_medications', upload.name, stdout=out)
+        self.assertIn('imported 1 of 1 rows', out.getvalue())
+        self.assertTrue(Medication.objects.filter(barcode='SKU-1').exists())
+
+    def test_upload_endpoint(self):
+        """
+        store admins upload a file and get the import report back
+        """
+        owner = Owner(email='owner@mail.com', first_name='owner', last_name='kanu', username='owner', date_of_birth=date.today(), is_store_admin=True)
+        owner.set_password('owner1234')
+        owner.save()
+        client = Clientt()
+        response = client.post('/api/v1/login/', data={'email': 'owner@mail.com', 'password': 'owner1234'})
+        self.assertEqual(response.status_code, 201, "Could not login owner")
+
+        upload = SimpleUploadedFile('prices.csv', b'barcode,price\n5012345678900,5\nSKU-404,1\n', content_type='text/csv')
+        response = client.post('/api/v1/medication/import/', data={'file': upload})
+        self.assertEqual(response.data['status'], 207)
+        self.assertEqual(response.data['data']['updated'], 1)
+        self.assertEqual(response.data['data']['failed'], 1)
+        self.assertEqual(client.post('/api/v1/medication/import/', data={}).data['status'], 400)
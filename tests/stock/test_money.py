@@ -0,0 +1,78 @@
+from stock.models import Medication
+from stock.money import parse_money
+from stock.serializers import MedicationSerializer
+from sales.models import Order
+from users.models import RetailStaff
+from django.test import TestCase, SimpleTestCase
+from django.db.models import Sum
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+from decimal import Decimal
+from datetime import date
+import json
+
+
+class TestParseMoney(SimpleTestCase):
+    """
+    test suite for parsing the legacy price strings
+    """
+    def test_legacy_formats(self):
+        """
+        separators and currency marks are ignored and amounts are rounded to kobo
+        """
+        self.assertEqual(parse_money('1,200'), Decimal('1200.00'))
+        self.assertEqual(parse_money('N350.5'), Decimal('350.50'))
+        self.assertEqual(parse_money('₦ 99.999'), Decimal('100.00'))
+        self.assertIsNone(parse_money('free'))
+        self.assertIsNone(parse_money(''))
+        self.assertIsNone(parse_money(None))
+
+
+class TestMoneyFields(TestCase):
+    """
+    test suite for the numeric money columns and their wire formats
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        self.medication = Medication.objects.create(name='paracetamol', price=Decimal('1200.50'), quantity=10)
+
+    def versioned_request(self, version='1'):
+        request = Request(APIRequestFactory().get('/'))
+        request.version = version
+        return request
+
+    def test_version_one_keeps_string_amounts(self):
+        """
+        clients without a version keep getting prices as strings
+        """
+        data = MedicationSerializer(self.medication, context={'request': self.versioned_request()}).data
+        self.assertEqual(json.loads(JSONRenderer().render(data))['price'], '1200.50')
+
+    def test_version_two_gets_numbers(self):
+        """
+        version 2 clients get prices as json numbers
+        """
+        data = MedicationSerializer(self.medication, context={'request': self.versioned_request('2')}).data
+        self.assertEqual(json.loads(JSONRenderer().render(data))['price'], 1200.5)
+
+    def test_string_and_number_input(self):
+        """
+        both wire formats are accepted and negative prices are rejected
+        """
+        for price in ('15.5', 15.5):
+            serializer = MedicationSerializer(data={'name': 'vitamin c', 'price': price, 'quantity': 3})
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            self.assertEqual(serializer.validated_data['price'], Decimal('15.50'))
+        self.assertFalse(MedicationSerializer(data={'name': 'vitamin c', 'price': '-1', 'quantity': 3}).is_valid())
+
+    def test_database_arithmetic(self):
+        """
+        order totals can be summed and compared in sql
+        """
+        staff = RetailStaff.objects.create(email='retail@mail.com', first_name='retail', last_name='staff', username='retail', date_of_birth=date.today())
+        for total in ('100.25', '900', '1000.10'):
+            Order.objects.create(sales_staff=staff, total_price=Decimal(total))
+        self.assertEqual(Order.objects.aggregate(total=Sum('total_price'))['total'], Decimal('2000.35'))
+        self.assertEqual(Order.objects.filter(total_price__gt=500).count(), 2)
+        self.assertEqual(Order.objects.order_by('-total_price').first().total_price, Decimal('1000.10'))
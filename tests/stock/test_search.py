@@ -0,0 +1,152 @@
+from stock.models import Medication
+from stock.search import SearchIndex, medication_index
+from users.models import RetailStaff
+from tests.base import CacheResetTestCase
+from django.test import SimpleTestCase, Client as Clientt
+from decimal import Decimal
+from datetime import date
+import time
+
+
+class TestSearchIndex(SimpleTestCase):
+    """
+    test suite for the in-memory prefix and trigram index
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        self.index = SearchIndex()
+        self.index.build(enumerate(['Paracetamol 500mg', 'Paracetamol', 'Panadol Extra', 'Amoxicillin 250mg', 'Co-Amoxiclav 625mg', 'Ibuprofen Syrup']))
+
+    def test_name_prefix_ranks_before_word_prefix(self):
+        """
+        names starting with the query come first (shortest first), then names with a word starting with it
+        """
+        results = self.index.search('amox')
+        self.assertEqual([name for key, name, score in results], ['Amoxicillin 250mg', 'Co-Amoxiclav 625mg'])
+        self.assertGreater(results[0][2], results[1][2])
+        self.assertEqual([name for key, name, score in self.index.search('para', limit=1)], ['Paracetamol'])
+
+    def test_every_query_word_is_a_prefix(self):
+        """
+        each word of a multi word query must start a word of the name
+        """
+        self.assertEqual([name for key, name, score in self.index.search('amox 250')], ['Amoxicillin 250mg'])
+        self.assertEqual([name for key, name, score in self.index.search('ibu syr')], ['Ibuprofen Syrup'])
+
+    def test_typos_are_tolerated(self):
+        """
+        a misspelt query still finds the medication through trigram similarity
+        """
+        self.assertEqual(self.index.search('paracetmol')[0][1], 'Paracetamol')
+        self.assertEqual(self.index.search('ibuprofin')[0][1], 'Ibuprofen Syrup')
+        self.assertEqual(self.index.search('xyzzy'), [])
+
+    def test_add_rename_and_remove(self):
+        """
+        entries can be added, renamed and removed without a rebuild
+        """
+        self.index.add(10, 'Cetirizine 10mg')
+        self.assertEqual(self.index.search('cetir')[0][:2], (10, 'Cetirizine 10mg'))
+        self.index.add(10, 'Loratadine 10mg')
+        self.assertEqual(self.index.search('cetir'), [])
+        self.assertEqual(self.index.search('lora')[0][0], 10)
+        self.index.remove(10)
+        self.assertEqual(self.index.search('lora'), [])
+        self.assertEqual(len(self.index), 6)
+
+    def test_latency_on_a_large_catalog(self):
+        """
+        typeahead queries stay fast with tens of thousands of entries
+        """
+        index = SearchIndex()
+        index.build((n, f'drug{n:05} {n % 7 * 50}mg tablets') for n in range(20000))
+        timings = []
+        for query in ['d', 'drug1', 'drug12', 'tab', '300', 'tablest']:
+            start = time.perf_counter()
+            self.assertTrue(index.search(query))
+            timings.append(time.perf_counter() - start)
+        self.assertLess(max(timings), 0.1)
+
+
+class TestMedicationSearch(CacheResetTestCase):
+    """
+    test suite for the medication search endpoint
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        medication_index.build([])
+        self.client = Clientt()
+        staff = RetailStaff(email='retail@mail.com', first_name='retail', last_name='staff', username='retail', date_of_birth=date.today())
+        staff.set_password('retail1234')
+        staff.save()
+        self.paracetamol = Medication.objects.create(name='Paracetamol 500mg', price=Decimal('2.50'), quantity=10)
+        self.amoxicillin = Medication.objects.create(name='Amoxicillin 250mg', price=Decimal('5.00'), quantity=4)
+        medication_index.built_at = None
+        response = self.client.post('/api/v1/login/', data={'email': 'retail@mail.com', 'password': 'retail1234'})
+        self.assertEqual(response.status_code, 201, "Could not login retail_staff")
+
+    def tearDown(self):
+        """Run once after all tests"""
+        medication_index.build([])
+        medication_index.built_at = None
+        self.client = None
+        super().tearDown()
+
+    def test_search_returns_ranked_medications(self):
+        """
+        the index is built on first use and matches come back with their current rows and score
+        """
+        response = self.client.get('/api/v1/medication/search/?q=parcetamol')
+        self.assertEqual(response.data['status'], 200)
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertEqual(response.data['data'][0]['drug_id'], str(self.paracetamol.drug_id))
+        self.assertEqual(response.data['data'][0]['quantity'], 10)
+        self.assertIn('score', response.data['data'][0])
+
+    def test_search_needs_a_query_and_a_sane_limit(self):
+        """
+        a missing query or an out of range limit is rejected
+        """
+        self.assertEqual(self.client.get('/api/v1/medication/search/').data['status'], 400)
+        self.assertEqual(self.client.get('/api/v1/medication/search/?q=amox&limit=0').data['status'], 400)
+        self.assertEqual(self.client.get('/api/v1/medication/search/?q=amox&limit=many').data['status'], 400)
+
+    def test_search_requires_login(self):
+        """
+        anonymous requests are refused
+        """
+        response = Clientt().get('/api/v1/medication/search/?q=amox')
+        self.assertEqual(response.data['status'], 403)
+
+    def test_saves_and_deletes_update_the_index(self):
+        """
+        committed saves and deletes reach the built index without a rebuild
+        """
+        medication_index.ensure_built()
+        with self.captureOnCommitCallbacks(execute=True):
+            ibuprofen = Medication.objects.create(name='Ibuprofen 400mg', price=Decimal('3.00'), quantity=7)
+            self.amoxicillin.name = 'Co-Amoxiclav 625mg'
+            self.amoxicillin.save()
+            self.paracetamol.delete()
+
+        self.assertEqual([key for key, name, score in medication_index.search('ibu')], [ibuprofen.drug_id])
+        self.assertEqual([name for key, name, score in medication_index.search('co amox')], ['Co-Amoxiclav 625mg'])
+        self.assertEqual(medication_index.search('paracetamol'), [])
+        response = self.client.get('/api/v1/medication/search/?q=ibuprofen')
+        self.assertEqual(response.data['data'][0]['name'], 'Ibuprofen 400mg')
+
+    def test_searches_keep_the_old_index_during_a_rebuild(self):
+        """
+        while another thread rebuilds a stale index, searches answer from the current one without waiting
+        """
+        medication_index.ensure_built()
+        Medication.objects.create(name='Paracetamol Syrup', price=Decimal('1.50'), quantity=2)
+        medication_index.invalidate()
+        with medication_index._rebuilding:
+            with self.assertNumQueries(0):
+                results = medication_index.search('paracetamol')
+        self.assertEqual([name for key, name, score in results], ['Paracetamol 500mg'])
+        self.assertIsNone(medication_index.built_at)
+
+        self.assertEqual(len(medication_index.search('paracetamol')), 2)
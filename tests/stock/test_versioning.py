@@ -0,0 +1,112 @@
+from stock.models import Medication, VersionConflict
+from stock.inventory import take_stock
+from stock.search import medication_index
+from users.models import Owner
+from tests.base import CacheResetTestCase
+from django.test import Client as Clientt
+from decimal import Decimal
+from datetime import date
+import json
+
+
+class TestMedicationVersioning(CacheResetTestCase):
+    """
+    test suite for optimistic concurrency on medication updates
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.client = Clientt()
+        owner = Owner(email='owner@mail.com', first_name='owner', last_name='kanu', username='owner', date_of_birth=date.today(), is_store_admin=True)
+        owner.set_password('owner1234')
+        owner.save()
+        self.medication = Medication.objects.create(name='Paracetamol 500mg', price=Decimal('2.50'), quantity=10)
+        self.url = f'/api/v1/medication/{self.medication.pk}/'
+        response = self.client.post('/api/v1/login/', data={'email': 'owner@mail.com', 'password': 'owner1234'})
+        self.assertEqual(response.status_code, 201, "Could not login owner")
+
+    def tearDown(self):
+        """Run once after all tests"""
+        medication_index.build([])
+        medication_index.built_at = None
+        self.client = None
+        super().tearDown()
+
+    def patch(self, data, **headers):
+        return self.client.patch(self.url, data=json.dumps(data), content_type='application/json', headers=headers)
+
+    def test_save_version_is_a_compare_and_swap(self):
+        """
+        a stale copy can't overwrite a newer version and leaves the row untouched
+        """
+        first, second = Medication.objects.get(pk=self.medication.pk), Medication.objects.get(pk=self.medication.pk)
+        first.price = Decimal('3.00')
+        first.save_version(['price'])
+        self.assertEqual(first.version, 1)
+
+        second.quantity = 99
+        with self.assertRaises(VersionConflict):
+            second.save_version(['quantity'])
+        self.medication.refresh_from_db()
+        self.assertEqual((self.medication.price, self.medication.quantity, self.medication.version), (Decimal('3.00'), 10, 1))
+
+    def test_sales_bump_the_version(self):
+        """
+        stock taken by a sale makes an edit based on the earlier quantity conflict
+        """
+        take_stock(self.medication, 2)
+        self.medication.quantity = 20
+        with self.assertRaises(VersionConflict):
+            self.medication.save_version(['quantity'])
+
+    def test_retrieve_sends_an_etag(self):
+        """
+        retrieve tags the medication with its version and answers a matching If-None-Match with a 304
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['status'], 200)
+        self.assertEqual(response['ETag'], '"0"')
+        response = self.client.get(self.url, headers={'If-None-Match': '"0"'})
+        self.assertEqual(response.status_code, 304)
+
+    def test_patch_with_current_etag_updates(self):
+        """
+        a patch against the current version applies and returns the next etag
+        """
+        response = self.patch({'price': '3.10'}, **{'If-Match': '"0"'})
+        self.assertEqual(response.data['status'], 200)
+        self.assertEqual(response['ETag'], '"1"')
+        self.assertEqual(response.data['data']['version'], 1)
+        self.medication.refresh_from_db()
+        self.assertEqual(self.medication.price, Decimal('3.10'))
+
+    def test_patch_with_stale_etag_is_refused(self):
+        """
+        the second of two admins editing the same version gets a 412 and overwrites nothing
+        """
+        self.assertEqual(self.patch({'price': '3.10'}, **{'If-Match': '"0"'}).data['status'], 200)
+        response = self.patch({'quantity': 50}, **{'If-Match': '"0"'})
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response['ETag'], '"1"')
+        self.medication.refresh_from_db()
+        self.assertEqual((self.medication.price, self.medication.quantity), (Decimal('3.10'), 10))
+
+    def test_version_is_read_only(self):
+        """
+        clients can't move the version themselves
+        """
+        self.patch({'version': 7})
+        self.medication.refresh_from_db()
+        self.assertEqual(self.medication.version, 1)
+
+    def test_delete_with_stale_etag_is_refused(self):
+        """
+        a medication changed since it was read isn't deleted
+        """
+        take_stock(self.medication, 1)
+        response = self.client.delete(self.url, headers={'If-Match': '"0"'})
+        self.assertEqual(response.status_code, 412)
+        self.assertTrue(Medication.objects.filter(pk=self.medication.pk).exists())
+        response = self.client.delete(self.url, headers={'If-Match': '"1"'})
+        self.assertEqual(response.data['status'], 200)
+        self.assertFalse(Medication.objects.filter(pk=self.medication.pk).exists())
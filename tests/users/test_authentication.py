@@ -0,0 +1,167 @@
+from users.models import Owner, RetailStaff
+from users.authentication import JWTCookieAuthentication
+from users.tokens import revoke_tokens, rotate_tokens, version_key, TOKEN_VERSION_CACHE, TOKEN_VERSION_TTL
+from tests.base import CacheResetTestCase
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F
+from users.activity import activity
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.exceptions import TokenError
+from django.test import RequestFactory, Client as Clientt
+from rest_framework import status
+from django.contrib.auth.hashers import make_password, PBKDF2SHA1PasswordHasher
+from datetime import date
+from unittest import mock
+import time
+
+
+class TestClaimsAuthentication(CacheResetTestCase):
+    """
+    test suite for authorizing requests from the jwt claims
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.client = Clientt()
+        self.owner = Owner(email='owner@mail.com', first_name='owner', last_name='kanu', username='owner', date_of_birth=date.today(), is_store_admin=True)
+        self.owner.set_password('owner1234')
+        self.owner.save()
+
+    def tearDown(self):
+        """Run once after all tests"""
+        self.client = None
+        super().tearDown()
+
+    def login(self):
+        response = self.client.post('/api/v1/login/', data={'email': 'owner@mail.com', 'password': 'owner1234'})
+        self.assertEqual(response.status_code, 201, "Could not login owner")
+        return response
+
+    def test_login_issues_authorization_claims(self):
+        """
+        the access token carries the role, store admin flag and token version
+        """
+        token = AccessToken(self.login().data['access'])
+        self.assertEqual(token['role'], 'owner')
+        self.assertEqual(token['is_store_admin'], True)
+        self.assertEqual(token['ver'], 0)
+
+    def test_requests_are_authorized_without_user_lookup(self):
+        """
+        a logged in user is authenticated from its claims without touching the database
+        """
+        token = self.login().data['access']
+        request = RequestFactory().get('/api/v1/retail-staff/')
+        request.COOKIES['jwt'] = token
+        with self.assertNumQueries(0):
+            user, _ = JWTCookieAuthentication().authenticate(request)
+        self.assertEqual(user.pk, self.owner.pk)
+        self.assertTrue(user.is_owner)
+        self.assertTrue(user.is_store_admin)
+
+        RetailStaff.objects.create(email='retail@mail.com', first_name='retail', last_name='staff', username='retail', date_of_birth=date.today())
+        response = self.client.get('/api/v1/retail-staff/')
+        self.assertEqual(response.data['status'], status.HTTP_202_ACCEPTED)
+        self.assertEqual(len(response.data['data']), 1)
+
+    def test_logout_closes_the_session(self):
+        """
+        a token can no longer be used after its session is logged out
+        """
+        self.login()
+        response = self.client.post('/api/v1/logout/')
+        self.assertEqual(response.data['status'], status.HTTP_200_OK)
+
+        response = self.client.get('/api/v1/retail-staff/')
+        self.assertEqual(response.data['status'], status.HTTP_403_FORBIDDEN)
+
+    def test_password_change_revokes_tokens(self):
+        """
+        tokens issued before a password change are rejected
+        """
+        token = self.login().data['access']
+        revoke_tokens(self.owner)
+        request = RequestFactory().get('/api/v1/retail-staff/')
+        request.COOKIES['jwt'] = token
+        self.assertIsNone(JWTCookieAuthentication().authenticate(request))
+
+    def test_revocation_is_seen_without_a_cached_version(self):
+        """
+        a worker that has no cached token version reads it from the database instead of trusting the token
+        """
+        token = self.login().data['access']
+        Owner.objects.filter(pk=self.owner.pk).update(token_version=F('token_version') + 1)
+        caches[TOKEN_VERSION_CACHE].delete(version_key(self.owner.pk))
+        request = RequestFactory().get('/api/v1/retail-staff/')
+        request.COOKIES['jwt'] = token
+        with self.assertNumQueries(1):
+            self.assertIsNone(JWTCookieAuthentication().authenticate(request))
+        with self.assertNumQueries(0):
+            self.assertIsNone(JWTCookieAuthentication().authenticate(request))
+
+    def test_revocation_reaches_other_workers(self):
+        """
+        a worker with its own cache stops accepting revoked tokens once its cached version expires
+        """
+        login = self.login()
+        request = RequestFactory().get('/api/v1/retail-staff/')
+        request.COOKIES['jwt'] = login.data['access']
+        other_worker = {TOKEN_VERSION_CACHE: LocMemCache('other-worker', {})}
+        with mock.patch('users.tokens.caches', other_worker):
+            self.assertIsNotNone(JWTCookieAuthentication().authenticate(request))
+
+        revoke_tokens(self.owner)
+        later = mock.Mock(time=mock.Mock(return_value=time.time() + TOKEN_VERSION_TTL + 1))
+        with mock.patch('users.tokens.caches', other_worker), mock.patch('django.core.cache.backends.locmem.time', later):
+            self.assertIsNone(JWTCookieAuthentication().authenticate(request))
+            with self.assertRaises(TokenError):
+                rotate_tokens(login.data['refresh'])
+
+
+class TestLoginView(CacheResetTestCase):
+    """
+    test suite for the login view
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.client = Clientt()
+        self.staff = RetailStaff(email='retail@mail.com', first_name='retail', last_name='staff', username='retail', date_of_birth=date.today())
+        self.staff.set_password('retail1234')
+        self.staff.save()
+
+    def tearDown(self):
+        """Run once after all tests"""
+        self.client = None
+        super().tearDown()
+
+    def test_login_resolves_user_with_one_query(self):
+        """
+        a retail_staff login costs one lookup and the outstanding token record, and never writes the user row
+        """
+        """ activity left by earlier tests would otherwise be flushed inside the block once the interval elapses """
+        activity.flush()
+        with self.assertNumQueries(2):
+            response = self.client.post('/api/v1/login/', data={'email': 'retail@mail.com', 'password': 'retail1234'})
+        self.assertEqual(response.status_code, 201, "Could not login retail_staff")
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'retail_staff')
+
+    def test_login_rejects_unknown_email_and_bad_password(self):
+        """
+        unknown emails and wrong passwords are both unauthorized
+        """
+        response = self.client.post('/api/v1/login/', data={'email': 'nobody@mail.com', 'password': 'retail1234'})
+        self.assertEqual(response.data['status'], status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post('/api/v1/login/', data={'email': 'retail@mail.com', 'password': 'wrong'})
+        self.assertEqual(response.data['status'], status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_upgrades_outdated_password_hash(self):
+        """
+        a password stored with a different cost is rehashed with the configured one on login
+        """
+        self.staff.password = make_password('retail1234', hasher=PBKDF2SHA1PasswordHasher())
+        self.staff.save()
+        response = self.client.post('/api/v1/login/', data={'email': 'retail@mail.com', 'password': 'retail1234'})
+        self.assertEqual(response.status_code, 201, "Could not login retail_staff")
+        self.assertTrue(RetailStaff.objects.get(pk=self.staff.pk).password.startswith('pbkdf2_sha256$'))
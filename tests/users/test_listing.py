@@ -0,0 +1,71 @@
+from users.models import Owner, RetailStaff
+from users.activity import activity
+from tests.base import CacheResetTestCase
+from django.test import Client as Clientt
+from rest_framework import status
+from datetime import date
+
+
+class TestStaffListing(CacheResetTestCase):
+    """
+    test suite for the paginated and searchable user listings
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.client = Clientt()
+        owner = Owner(email='owner@mail.com', first_name='owner', last_name='kanu', username='owner', date_of_birth=date.today(), is_store_admin=True)
+        owner.set_password('owner1234')
+        owner.save()
+        for n in range(25):
+            RetailStaff.objects.create(email=f'staff{n:02}@mail.com', first_name=f'first{n % 3}', last_name=f'last{n // 2:02}', username=f'staff{n}', phone_number=f'0803{n:07}', date_of_birth=date.today())
+        response = self.client.post('/api/v1/login/', data={'email': 'owner@mail.com', 'password': 'owner1234'})
+        self.assertEqual(response.status_code, 201, "Could not login owner")
+        activity.flush()
+
+    def tearDown(self):
+        """Run once after all tests"""
+        self.client = None
+        super().tearDown()
+
+    def test_pages_cover_every_staff_once_in_order(self):
+        """
+        following the next links visits every retail_staff exactly once, ordered by name
+        """
+        emails, url, pages = [], '/api/v1/retail-staff/?page_size=10', 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.data['status'], status.HTTP_202_ACCEPTED)
+            self.assertLessEqual(len(response.data['data']), 10)
+            emails += [user['email'] for user in response.data['data']]
+            url, pages = response.data['next'], pages + 1
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(emails), 25)
+        expected = RetailStaff.objects.order_by('last_name', 'first_name', 'id').values_list('email', flat=True)
+        self.assertEqual(emails, list(expected))
+
+    def test_page_cost_does_not_grow_with_the_table(self):
+        """
+        a page is one bounded query plus the prefetched groups and permissions, whatever the number of staff
+        """
+        with self.assertNumQueries(3) as queries:
+            self.client.get('/api/v1/retail-staff/?page_size=5')
+        self.assertIn('LIMIT 6', queries.captured_queries[0]['sql'])
+
+    def test_prefix_search(self):
+        """
+        ?q= matches the start of names, emails and phone numbers, ignoring case
+        """
+        response = self.client.get('/api/v1/retail-staff/?q=LAST01')
+        self.assertEqual(sorted(user['username'] for user in response.data['data']), ['staff2', 'staff3'])
+
+        response = self.client.get('/api/v1/retail-staff/?q=staff24@')
+        self.assertEqual([user['username'] for user in response.data['data']], ['staff24'])
+
+        response = self.client.get('/api/v1/retail-staff/?q=08030000007')
+        self.assertEqual([user['username'] for user in response.data['data']], ['staff7'])
+
+        response = self.client.get('/api/v1/owner/?q=kan')
+        self.assertEqual([user['email'] for user in response.data['data']], ['owner@mail.com'])
+        self.assertIsNone(response.data['next'])
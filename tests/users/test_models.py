@@ -0,0 +1,107 @@
+from users.models import CustomUser, Owner, AdminStaff, RetailStaff
+from users.permissions import fetch_user
+from users.serializers import OwnerSerializer, RetailSerializer
+from sales.models import Cart
+from django.test import TestCase, TransactionTestCase
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from datetime import date
+
+
+class TestRoleProxies(TestCase):
+    """
+    test suite for the owner, admin_staff and retail_staff proxies of the single user table
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        self.owner = Owner.objects.create(email='owner@mail.com', first_name='owner', last_name='kanu', username='owner', date_of_birth=date.today(), is_store_admin=True)
+        self.admin = AdminStaff.objects.create(email='admin@mail.com', first_name='admin', last_name='staff', username='admin', date_of_birth=date.today())
+        self.staff = RetailStaff.objects.create(email='retail@mail.com', first_name='retail', last_name='staff', username='retail', date_of_birth=date.today())
+
+    def test_proxies_set_and_filter_by_role(self):
+        """
+        each proxy stores its role and its manager only returns users of that role
+        """
+        self.assertEqual(Owner(email='new@mail.com').role, CustomUser.ROLE_OWNER)
+        self.assertEqual(CustomUser.objects.get(pk=self.staff.pk).role, CustomUser.ROLE_RETAIL_STAFF)
+        self.assertEqual(list(Owner.objects.all()), [self.owner])
+        self.assertEqual(list(AdminStaff.objects.all()), [self.admin])
+        self.assertEqual(list(RetailStaff.objects.values_list('email', flat=True)), ['retail@mail.com'])
+        self.assertFalse(RetailStaff.objects.filter(pk=self.owner.pk).exists())
+        self.assertTrue(Owner.objects.get(pk=self.owner.pk).is_staff)
+
+    def test_fetch_user_reads_one_table(self):
+        """
+        a user is resolved to its proxy type with a single query and no join
+        """
+        with self.assertNumQueries(1) as queries:
+            user = fetch_user(email='admin@mail.com')
+        self.assertNotIn('JOIN', queries.captured_queries[0]['sql'])
+        self.assertIsInstance(user, AdminStaff)
+        self.assertTrue(user.is_admin_staff)
+
+        base = CustomUser.objects.create_user('plain@mail.com', 'plain1234')
+        self.assertIsNone(fetch_user(pk=base.pk))
+
+    def test_sales_staff_joins_the_user_table_once(self):
+        """
+        carts reference the user table directly and still hand out retail_staff instances
+        """
+        Cart.objects.create(sales_staff=self.staff)
+        with self.assertNumQueries(1) as queries:
+            cart = Cart.objects.select_related('sales_staff').get()
+        self.assertEqual(queries.captured_queries[0]['sql'].count('JOIN'), 1)
+        self.assertIsInstance(cart.sales_staff, RetailStaff)
+
+    def test_serializers_keep_role_specific_fields(self):
+        """
+        owner and staff serializers expose the same fields as before and never write the role
+        """
+        self.assertIn('is_store_admin', OwnerSerializer(self.owner).data)
+        self.assertNotIn('nationality', OwnerSerializer(self.owner).data)
+        self.assertNotIn('is_store_admin', RetailSerializer(self.staff).data)
+
+        serializer = RetailSerializer(self.staff, data={'role': CustomUser.ROLE_OWNER, 'is_store_admin': True}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.staff.refresh_from_db()
+        self.assertEqual(self.staff.role, CustomUser.ROLE_RETAIL_STAFF)
+        self.assertFalse(self.staff.is_store_admin)
+
+
+class TestCollapseMigration(TransactionTestCase):
+    """
+    test suite for the migration from the multi-table user models to the single user table
+    """
+    before = [('users', '0001_initial'), ('sales', '0002_initial')]
+    after = [('users', '0004_collapse_user_tables'), ('sales', '0004_sales_staff_to_retailstaff')]
+
+    def tearDown(self):
+        """Run once after all tests"""
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_profiles_and_sales_are_carried_over(self):
+        """
+        every profile of a database created from the multi-table schema is copied onto custom_user
+        with its role and carts keep their sales_staff
+        """
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        owner = apps.get_model('users', 'Owner').objects.create(email='owner@mail.com', first_name='owner', last_name='kanu', username='owner', date_of_birth=date(1990, 1, 1), is_store_admin=True)
+        staff = apps.get_model('users', 'RetailStaff').objects.create(email='retail@mail.com', first_name='retail', last_name='staff', username='retail', date_of_birth=date(1995, 1, 1), nationality='NG')
+        apps.get_model('sales', 'Cart').objects.create(sales_staff_id=staff.pk)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        apps = executor.loader.project_state(self.after).apps
+        users = apps.get_model('users', 'CustomUser').objects
+        self.assertEqual(users.get(pk=owner.pk).token_version, 0)
+        self.assertEqual(users.get(pk=owner.pk).role, 'owner')
+        self.assertTrue(users.get(pk=owner.pk).is_store_admin)
+        self.assertEqual(users.get(pk=staff.pk).role, 'retail_staff')
+        self.assertEqual(users.get(pk=staff.pk).nationality, 'NG')
+        self.assertEqual(users.get(pk=staff.pk).date_of_birth, date(1995, 1, 1))
+        self.assertEqual(apps.get_model('sales', 'Cart').objects.get().sales_staff_id, staff.pk)
+        self.assertNotIn('users_owner', connection.introspection.table_names())
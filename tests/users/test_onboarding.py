@@ -0,0 +1,79 @@
+from users.models import Owner, RetailStaff
+from tests.base import CacheResetTestCase
+from django.test import Client as Clientt, override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from datetime import date
+import json
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TestBulkOnboarding(CacheResetTestCase):
+    """
+    test suite for the bulk retail_staff onboarding endpoint
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.client = Clientt()
+        owner = Owner(email='owner@mail.com', first_name='owner', last_name='kanu', username='owner', date_of_birth=date.today(), is_store_admin=True)
+        owner.set_password('owner1234')
+        owner.save()
+        response = self.client.post('/api/v1/login/', data={'email': 'owner@mail.com', 'password': 'owner1234'})
+        self.assertEqual(response.status_code, 201, "Could not login owner")
+
+    def tearDown(self):
+        """Run once after all tests"""
+        self.client = None
+        super().tearDown()
+
+    def row(self, n, **fields):
+        row = {'email': f'staff{n}@mail.com', 'first_name': f'first{n}', 'last_name': f'last{n}', 'username': f'staff{n}', 'password': 'staff1234', 'confirm_password': 'staff1234'}
+        row.update(fields)
+        return row
+
+    def test_json_rows_are_created_with_one_insert(self):
+        """
+        every valid row is created in a single bulk insert and can log in
+        """
+        rows = [self.row(n) for n in range(40)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/v1/retail-staff/bulk/', data=json.dumps(rows), content_type='application/json')
+        self.assertEqual(response.data['status'], status.HTTP_201_CREATED)
+        self.assertEqual(RetailStaff.objects.count(), 40)
+        self.assertEqual(len([query for query in queries.captured_queries if query['sql'].startswith('INSERT')]), 1)
+        self.assertTrue(RetailStaff.objects.get(email='staff7@mail.com').check_password('staff1234'))
+        self.assertNotIn('password', response.data['data'][0]['data'])
+
+    def test_invalid_rows_are_reported_without_aborting(self):
+        """
+        bad, repeated and already registered rows get their own errors while the rest are created
+        """
+        RetailStaff.objects.create(email='staff3@mail.com', first_name='taken', last_name='taken', username='taken', date_of_birth=date.today())
+        rows = [self.row(0), self.row(1, confirm_password='different'), self.row(0), self.row(3), self.row(4, email='not-an-email'), self.row(5)]
+        response = self.client.post('/api/v1/retail-staff/bulk/', data=json.dumps(rows), content_type='application/json')
+        self.assertEqual(response.data['status'], status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([row['row'] for row in response.data['data'] if 'error' in row], [1, 2, 3, 4])
+        self.assertEqual(sorted(RetailStaff.objects.values_list('email', flat=True)), ['staff0@mail.com', 'staff3@mail.com', 'staff5@mail.com'])
+
+    def test_csv_upload(self):
+        """
+        a csv with a header row is onboarded like a json array
+        """
+        upload = 'email,first_name,last_name,username,phone_number,password,confirm_password\n'
+        upload += 'csv1@mail.com,ada,obi,ada,08030000001,staff1234,staff1234\n'
+        upload += 'csv2@mail.com,ben,eze,ben,,staff1234,staff1234\n'
+        response = self.client.post('/api/v1/retail-staff/bulk/', data=upload, content_type='text/csv')
+        self.assertEqual(response.data['status'], status.HTTP_201_CREATED)
+        self.assertEqual(RetailStaff.objects.get(email='csv1@mail.com').phone_number, '08030000001')
+        self.assertIsNone(RetailStaff.objects.get(email='csv2@mail.com').phone_number)
+
+    def test_upload_must_be_a_list_of_rows(self):
+        """
+        an empty or non list upload is rejected
+        """
+        response = self.client.post('/api/v1/retail-staff/bulk/', data=json.dumps(self.row(0)), content_type='application/json')
+        self.assertEqual(response.data['status'], status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/api/v1/retail-staff/bulk/', data=json.dumps([]), content_type='application/json')
+        self.assertEqual(response.data['status'], status.HTTP_400_BAD_REQUEST)
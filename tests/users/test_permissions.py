@@ -0,0 +1,104 @@
+from users.models import RetailStaff
+from users.permissions import resolve_user, verify_claims, user_cache
+from users.authentication import JWTCookieAuthentication
+from users.activity import ActivityTracker, activity
+from users.sessions import registry
+from django.test import TestCase, RequestFactory
+from users.tokens import issue_tokens
+from django.utils import timezone
+from datetime import date
+
+
+class TestResolveUser(TestCase):
+    """
+    test suite for the cache-backed user resolver and the claims verification
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        user_cache.clear()
+        self.factory = RequestFactory()
+        self.staff = RetailStaff.objects.create(email='retail@mail.com', first_name='retail', last_name='staff', username='retail', date_of_birth=date.today())
+        activity.flush()
+
+    def tearDown(self):
+        """Run once after all tests"""
+        user_cache.clear()
+
+    def get_request(self, user, open_session=True):
+        access = issue_tokens(user).access_token
+        if open_session:
+            registry.open(access['jti'], user.pk)
+        request = self.factory.get('/')
+        request.COOKIES['jwt'] = str(access)
+        return request
+
+    def test_resolve_user_uses_single_query(self):
+        """
+        a retail_staff is resolved with one query and then served from the cache
+        """
+        with self.assertNumQueries(1):
+            user = resolve_user(self.staff.pk)
+        self.assertIsInstance(user, RetailStaff)
+        self.assertEqual(user.first_name, 'retail')
+        self.assertEqual(user.email, 'retail@mail.com')
+
+        with self.assertNumQueries(0):
+            self.assertIsInstance(resolve_user(self.staff.pk), RetailStaff)
+
+    def test_verified_request_does_not_touch_the_user_row(self):
+        """
+        a verified request is authorized from its claims, the user row is only read when asked for
+        """
+        request = self.get_request(self.staff)
+        with self.assertNumQueries(0):
+            user, token = JWTCookieAuthentication().authenticate(request)
+        self.assertTrue(verify_claims(user))
+
+        with self.assertNumQueries(1):
+            self.assertIsInstance(user.get_user(), RetailStaff)
+        with self.assertNumQueries(0):
+            self.assertIsInstance(user.get_user(), RetailStaff)
+
+    def test_verification_requires_a_live_session(self):
+        """
+        a valid token without an open session is rejected without a database lookup
+        """
+        request = self.get_request(self.staff, open_session=False)
+        with self.assertNumQueries(0):
+            self.assertIsNone(JWTCookieAuthentication().authenticate(request))
+
+    def test_cache_is_invalidated_on_save_and_delete(self):
+        """
+        saving or deleting a user evicts it from the cache
+        """
+        resolve_user(self.staff.pk)
+        self.staff.first_name = 'renamed'
+        self.staff.save()
+        self.assertEqual(resolve_user(self.staff.pk).first_name, 'renamed')
+
+        self.staff.delete()
+        self.assertIsNone(resolve_user(self.staff.pk))
+
+    def test_activity_is_flushed_in_batches(self):
+        """
+        tracked activity is written to last_login with a single bulk update
+        """
+        other = RetailStaff.objects.create(email='other@mail.com', first_name='other', last_name='staff', username='other', date_of_birth=date.today())
+        tracker = ActivityTracker(flush_interval=3600)
+        seen = timezone.now()
+        tracker.touch(self.staff.pk, seen)
+        tracker.touch(other.pk, seen)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(tracker.flush(), 2)
+        self.assertEqual(RetailStaff.objects.get(pk=other.pk).last_login, seen)
+        self.assertEqual(tracker.flush(), 0)
+
+    def test_invalid_token_is_rejected(self):
+        """
+        an undecodable token is rejected without a database lookup
+        """
+        request = self.factory.get('/')
+        request.COOKIES['jwt'] = 'not-a-token'
+        with self.assertNumQueries(0):
+            self.assertIsNone(JWTCookieAuthentication().authenticate(request))
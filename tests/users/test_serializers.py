@@ -0,0 +1,39 @@
+from users.models import RetailStaff
+from users.serializers import RetailSerializer
+from django.test import TestCase
+from unittest import mock
+from datetime import date
+
+
+class TestRetailSerializer(TestCase):
+    """
+    test suite for password handling in the retail_serializer
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        self.staff = RetailStaff(email='retail@mail.com', first_name='retail', last_name='staff', username='retail', date_of_birth=date.today())
+        self.staff.set_password('retail1234')
+        self.staff.save()
+
+    def test_partial_update_without_password_skips_hashing(self):
+        """
+        updating other fields keeps the stored hash and never hashes
+        """
+        encoded = self.staff.password
+        serializer = RetailSerializer(instance=self.staff, data={'last_name': 'idan'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with mock.patch('users.serializers.hash_password') as hash_password:
+            serializer.save()
+        hash_password.assert_not_called()
+        staff = RetailStaff.objects.get(pk=self.staff.pk)
+        self.assertEqual(staff.last_name, 'idan')
+        self.assertEqual(staff.password, encoded)
+
+    def test_partial_update_with_password_rehashes(self):
+        """
+        a new password is hashed and stored
+        """
+        serializer = RetailSerializer(instance=self.staff, data={'password': 'changed1234', 'confirm_password': 'changed1234'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.assertTrue(RetailStaff.objects.get(pk=self.staff.pk).check_password('changed1234'))
@@ -0,0 +1,118 @@
+from users.sessions import SessionRegistry, LocalSessionBackend, CacheSessionBackend
+from users.throttling import buckets
+from users.models import Owner
+from django.test import TestCase, SimpleTestCase, Client as Clientt
+from rest_framework import status
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import mock
+
+
+class SessionBackendTests:
+    """
+    behaviour shared by every session registry backend
+    """
+    def get_backend(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        """Run once before all tests"""
+        self.registry = SessionRegistry(self.get_backend(), idle_timeout=timedelta(minutes=5))
+
+    def test_open_touch_and_close(self):
+        """
+        a session resolves to its user until it is closed
+        """
+        self.registry.open('token-1', 'user-1')
+        self.assertEqual(self.registry.touch('token-1'), 'user-1')
+        self.registry.close('token-1')
+        self.assertIsNone(self.registry.touch('token-1'))
+        self.assertIsNone(self.registry.touch(None))
+
+    def test_sessions_of_one_user_are_independent(self):
+        """
+        a user may hold several sessions and closing one keeps the others
+        """
+        self.registry.open('token-1', 'user-1')
+        self.registry.open('token-2', 'user-1')
+        self.registry.close('token-1')
+        self.assertEqual(self.registry.touch('token-2'), 'user-1')
+
+
+class TestLocalSessionBackend(SessionBackendTests, SimpleTestCase):
+    """
+    test suite for the in-process session backend
+    """
+    def get_backend(self):
+        return LocalSessionBackend()
+
+    def test_idle_sessions_expire_and_touch_extends_them(self):
+        """
+        sessions expire after the idle timeout unless they are touched
+        """
+        with mock.patch('users.sessions.time.monotonic', return_value=1000):
+            self.registry.open('token-1', 'user-1')
+            self.registry.open('token-2', 'user-2')
+        with mock.patch('users.sessions.time.monotonic', return_value=1200):
+            self.assertEqual(self.registry.touch('token-1'), 'user-1')
+        with mock.patch('users.sessions.time.monotonic', return_value=1400):
+            self.assertEqual(self.registry.touch('token-1'), 'user-1')
+            self.assertIsNone(self.registry.touch('token-2'))
+            self.assertEqual(len(self.registry.backend), 1)
+
+    def test_size_is_bounded(self):
+        """
+        the oldest sessions are evicted once max_size is reached
+        """
+        backend = LocalSessionBackend(max_size=2)
+        for session_id in ('token-1', 'token-2', 'token-3'):
+            backend.open(session_id, 'user-1', 300)
+        self.assertIsNone(backend.touch('token-1', 300))
+        self.assertEqual(len(backend), 2)
+
+    def test_concurrent_logins(self):
+        """
+        sessions opened from many threads at once are all registered
+        """
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda n: self.registry.open(f'token-{n}', 'user-1'), range(200)))
+        self.assertEqual(len(self.registry.backend), 200)
+        self.assertTrue(all(self.registry.touch(f'token-{n}') == 'user-1' for n in range(200)))
+
+
+class TestCacheSessionBackend(SessionBackendTests, SimpleTestCase):
+    """
+    test suite for the shared cache session backend
+    """
+    def get_backend(self):
+        return CacheSessionBackend(prefix='test-session')
+
+
+class TestConcurrentLogins(TestCase):
+    """
+    test suite for several live sessions of a single user
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        buckets.clear()
+        owner = Owner(email='owner@mail.com', first_name='owner', last_name='kanu', username='owner', date_of_birth=date.today(), is_store_admin=True)
+        owner.set_password('owner1234')
+        owner.save()
+
+    def login(self):
+        client = Clientt()
+        response = client.post('/api/v1/login/', data={'email': 'owner@mail.com', 'password': 'owner1234'})
+        self.assertEqual(response.status_code, 201, "Could not login owner")
+        return client
+
+    def test_logout_only_ends_its_own_session(self):
+        """
+        two terminals log in as the same user and logging out one keeps the other
+        """
+        first, second = self.login(), self.login()
+        self.assertEqual(first.get('/api/v1/retail-staff/').data['status'], status.HTTP_202_ACCEPTED)
+        self.assertEqual(second.get('/api/v1/retail-staff/').data['status'], status.HTTP_202_ACCEPTED)
+
+        self.assertEqual(first.post('/api/v1/logout/').data['status'], status.HTTP_200_OK)
+        self.assertEqual(first.get('/api/v1/retail-staff/').data['status'], status.HTTP_403_FORBIDDEN)
+        self.assertEqual(second.get('/api/v1/retail-staff/').data['status'], status.HTTP_202_ACCEPTED)
@@ -0,0 +1,115 @@
+from users.models import RetailStaff
+from users.throttling import LocalBucketStore, CacheBucketStore, buckets
+from tests.base import CacheResetTestCase
+from django.test import SimpleTestCase, Client as Clientt
+from prometheus_client import REGISTRY
+from datetime import date
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TestBucketStores(SimpleTestCase):
+    """
+    test suite for the token bucket stores
+    """
+    def test_local_bucket_empties_and_refills(self):
+        """
+        a bucket allows `capacity` attempts and then one more per refill period
+        """
+        store = LocalBucketStore()
+        with mock.patch('users.throttling.time.monotonic', return_value=1000):
+            self.assertEqual([store.take('key', 3, 1 / 60)[0] for _ in range(4)], [True, True, True, False])
+            self.assertAlmostEqual(store.take('key', 3, 1 / 60)[1], 60)
+        with mock.patch('users.throttling.time.monotonic', return_value=1060):
+            self.assertEqual([store.take('key', 3, 1 / 60)[0] for _ in range(2)], [True, False])
+
+    def test_local_store_is_bounded(self):
+        """
+        the least recently used buckets are dropped once max_size are held
+        """
+        store = LocalBucketStore(max_size=2)
+        for key in ('a', 'b', 'c'):
+            store.take(key, 1, 1)
+        self.assertEqual(list(store._buckets), ['b', 'c'])
+
+    def test_cache_bucket_empties(self):
+        """
+        the shared store keeps buckets on the django cache
+        """
+        store = CacheBucketStore(prefix='test-throttle')
+        self.assertEqual([store.take('key', 2, 1 / 60)[0] for _ in range(3)], [True, True, False])
+
+    def test_cache_bucket_is_atomic(self):
+        """
+        concurrent attempts on one key never get more than the capacity between them
+        """
+        store = CacheBucketStore(prefix='test-throttle-race')
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: store.take('key', 5, 5 / 60), range(40)))
+        self.assertEqual(sum(allowed for allowed, wait in results), 5)
+        self.assertTrue(all(0 < wait <= 60 for allowed, wait in results if not allowed))
+
+
+class TestLoginThrottle(CacheResetTestCase):
+    """
+    test suite for throttling the login view
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.client = Clientt()
+        self.staff = RetailStaff(email='retail@mail.com', first_name='retail', last_name='staff', username='retail', date_of_birth=date.today())
+        self.staff.set_password('retail1234')
+        self.staff.save()
+
+    def tearDown(self):
+        """Run once after all tests"""
+        self.client = None
+        super().tearDown()
+
+    def login(self, email, password='wrong', address='10.0.0.1'):
+        return self.client.post('/api/v1/login/', data={'email': email, 'password': password}, REMOTE_ADDR=address)
+
+    def test_email_is_throttled_before_any_lookup_or_hashing(self):
+        """
+        once an email's bucket is empty, attempts are rejected without queries or password checks
+        """
+        for _ in range(5):
+            self.login('retail@mail.com')
+
+        rejected = REGISTRY.get_sample_value('login_throttle_decisions_total', {'scope': 'email', 'decision': 'rejected'}) or 0
+        with mock.patch('users.views.check_user_password') as check_user_password, self.assertNumQueries(0):
+            response = self.login('Retail@mail.com ', password='retail1234', address='10.0.0.2')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        check_user_password.assert_not_called()
+        self.assertEqual(REGISTRY.get_sample_value('login_throttle_decisions_total', {'scope': 'email', 'decision': 'rejected'}), rejected + 1)
+
+        response = self.login('other@mail.com')
+        self.assertEqual(response.data['status'], 401)
+
+    def test_address_is_throttled_across_emails(self):
+        """
+        an address spraying many emails is limited by its own bucket
+        """
+        for n in range(30):
+            self.assertNotEqual(self.login(f'user{n}@mail.com').status_code, 429)
+        self.assertEqual(self.login('retail@mail.com', password='retail1234').status_code, 429)
+        self.assertEqual(self.login('retail@mail.com', password='retail1234', address='10.0.0.2').status_code, 201)
+
+    def test_malformed_bodies_are_refused_not_crashed_on(self):
+        """
+        a json body that is not an object still gets a response from the view instead of a server error
+        """
+        response = self.client.post('/api/v1/login/', data='[1]', content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 400)
+
+    def test_metrics_endpoint_exports_throttle_counters(self):
+        """
+        the throttle counters are served by the django_prometheus endpoint
+        """
+        self.login('retail@mail.com')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'login_throttle_decisions_total', response.content)
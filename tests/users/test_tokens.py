@@ -0,0 +1,94 @@
+from users.models import Owner
+from users.tokens import revoke_tokens
+from tests.base import CacheResetTestCase
+from django.test import TestCase, Client as Clientt
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from datetime import date, timedelta
+from io import StringIO
+
+
+class TestRefreshView(CacheResetTestCase):
+    """
+    test suite for the token refresh view
+    """
+    def setUp(self):
+        """Run once before all tests"""
+        super().setUp()
+        self.client = Clientt()
+        self.owner = Owner(email='owner@mail.com', first_name='owner', last_name='kanu', username='owner', date_of_birth=date.today(), is_store_admin=True)
+        self.owner.set_password('owner1234')
+        self.owner.save()
+
+    def tearDown(self):
+        """Run once after all tests"""
+        self.client = None
+        super().tearDown()
+
+    def login(self):
+        response = self.client.post('/api/v1/login/', data={'email': 'owner@mail.com', 'password': 'owner1234'})
+        self.assertEqual(response.status_code, 201, "Could not login owner")
+        return response
+
+    def test_refresh_from_cookie_rotates_tokens(self):
+        """
+        the refresh cookie is exchanged for a new session and the used refresh token is blacklisted
+        """
+        login = self.login()
+        response = self.client.post('/api/v1/refresh/')
+        self.assertEqual(response.data['status'], status.HTTP_202_ACCEPTED)
+        self.assertNotEqual(response.data['refresh'], login.data['refresh'])
+        self.assertEqual(response.cookies['jwt'].value, response.data['access'])
+
+        """ the new access token works and the replaced one has lost its session """
+        self.assertEqual(self.client.get('/api/v1/retail-staff/').data['status'], status.HTTP_202_ACCEPTED)
+        self.client.cookies['jwt'] = login.data['access']
+        self.assertEqual(self.client.get('/api/v1/retail-staff/').data['status'], status.HTTP_403_FORBIDDEN)
+
+        response = self.client.post('/api/v1/refresh/', data={'refresh': login.data['refresh']})
+        self.assertEqual(response.data['status'], status.HTTP_401_UNAUTHORIZED)
+
+    def test_malformed_body_is_refused(self):
+        """
+        a json body that is not an object is refused instead of crashing the view
+        """
+        response = self.client.post('/api/v1/refresh/', data='[1]', content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_is_rejected_after_revocation_and_logout(self):
+        """
+        refresh tokens stop working once revoked or once their session logs out
+        """
+        refresh = self.login().data['refresh']
+        revoke_tokens(self.owner)
+        response = self.client.post('/api/v1/refresh/', data={'refresh': refresh})
+        self.assertEqual(response.data['status'], status.HTTP_401_UNAUTHORIZED)
+
+        refresh = self.login().data['refresh']
+        self.client.post('/api/v1/logout/')
+        response = self.client.post('/api/v1/refresh/', data={'refresh': refresh})
+        self.assertEqual(response.data['status'], status.HTTP_401_UNAUTHORIZED)
+
+
+class TestPruneTokens(TestCase):
+    """
+    test suite for the prune_tokens command
+    """
+    def test_expired_tokens_are_deleted_in_batches(self):
+        """
+        only expired outstanding tokens and their blacklist entries are deleted
+        """
+        now = timezone.now()
+        for n in range(5):
+            token = OutstandingToken.objects.create(jti=f'expired-{n}', token='token', expires_at=now - timedelta(days=1))
+            BlacklistedToken.objects.create(token=token)
+        OutstandingToken.objects.create(jti='live', token='token', expires_at=now + timedelta(days=1))
+
+        out = StringIO()
+        call_command('prune_tokens', batch_size=2, stdout=out)
+        self.assertIn('deleted 5 expired outstanding tokens and 5 blacklisted tokens', out.getvalue())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertEqual(BlacklistedToken.objects.count(), 0)
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.utils import timezone
+from users.models import CustomUser
+from threading import Lock
+import atexit
+import time
+import logging
+
+log = logging.getLogger('main')
+
+SESSION_ACTIVITY = getattr(settings, 'SESSION_ACTIVITY', {})
+
+
+class ActivityTracker:
+    """
+    records when each user was last seen in memory and writes the timestamps
+    to custom_user.last_login in batches, instead of saving the user row on every request
+    """
+    def __init__(self, flush_interval=30, batch_size=500):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending = {}
+        self._lock = Lock()
+        self._last_flush = time.monotonic()
+
+    def touch(self, user_id, when=None):
+        """
+        records activity for user_id and flushes pending timestamps once the interval has elapsed
+        """
+        when = when or timezone.now()
+        with self._lock:
+            self._pending[str(user_id)] = when
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        writes pending last_login timestamps to the database with batched bulk updates
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return 0
+
+        log.info(f'flushing last_login for {len(pending)} users')
+        users = [CustomUser(pk=user_id, last_login=when) for user_id, when in pending.items()]
+        try:
+            CustomUser.objects.bulk_update(users, ['last_login'], batch_size=self.batch_size)
+        except Exception:
+            log.exception(f'flushing last_login failed, the timestamps will be retried on the next flush')
+            with self._lock:
+                for user_id, when in pending.items():
+                    self._pending.setdefault(user_id, when)
+            return 0
+        return len(users)
+
+
+activity = ActivityTracker(
+    flush_interval=SESSION_ACTIVITY.get('FLUSH_INTERVAL', 30),
+    batch_size=SESSION_ACTIVITY.get('BATCH_SIZE', 500),
+)
+atexit.register(activity.flush)
@@ -0,0 +1,105 @@
+from uuid import UUID
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from users.models import CustomUser
+from users.permissions import resolve_user, verify_claims
+import logging
+
+log = logging.getLogger('main')
+
+
+class ClaimsUser(TokenUser):
+    """
+    a stateless user built from the authorization claims of a validated access token.
+    the user row is only retrieved when a view asks for it through get_user.
+    """
+    @cached_property
+    def id(self):
+        return UUID(str(self.token['user_id']))
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def role(self):
+        return self.token.get('role', None)
+
+    @cached_property
+    def is_store_admin(self):
+        return self.token.get('is_store_admin', False)
+
+    @cached_property
+    def version(self):
+        return self.token.get('ver', 0)
+
+    @cached_property
+    def session_id(self):
+        return self.token.get('jti', None)
+
+    @property
+    def is_owner(self):
+        """
+        checks if the token was issued to an owner
+        """
+        return self.role == CustomUser.ROLE_OWNER
+
+    @property
+    def is_admin_staff(self):
+        """
+        checks if the token was issued to an admin_staff
+        """
+        return self.role == CustomUser.ROLE_ADMIN_STAFF
+
+    @property
+    def is_retail_staff(self):
+        """
+        checks if the token was issued to a retail_staff
+        """
+        return self.role == CustomUser.ROLE_RETAIL_STAFF
+
+    def get_user(self):
+        """
+        retrieves the full user instance behind the claims
+        """
+        return resolve_user(self.pk)
+
+
+class JWTCookieAuthentication(JWTStatelessUserAuthentication):
+    """
+    authenticates requests from the jwt cookie (or the authorization header) and
+    authorizes them from the token claims alone.
+    failures leave the request anonymous so views can answer in their usual format.
+    """
+    def authenticate(self, request):
+        log.info(f"verifying requesting user's token claims")
+        raw_token = request.COOKIES.get('jwt', None)
+        if raw_token is None:
+            header = self.get_header(request)
+            raw_token = self.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            log.error(f"verification failed due to absence of jwt token in request")
+            return None
+
+        try:
+            validated_token = self.get_validated_token(raw_token)
+            user = self.get_user(validated_token)
+        except (InvalidToken, AuthenticationFailed):
+            log.error(f"verification failed due to jwt token issues")
+            return None
+
+        if user.role is None:
+            log.error(f"verification failed because the jwt token carries no authorization claims")
+            return None
+
+        if not verify_claims(user):
+            return None
+
+        log.info(f"requesting user has been verified from the token claims")
+        return user, validated_token
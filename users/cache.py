@@ -0,0 +1,67 @@
+from collections import OrderedDict
+from threading import Lock
+import time
+import logging
+
+log = logging.getLogger('main')
+
+
+class TTLCache:
+    """
+    a bounded, thread safe in-process cache.
+    entries expire after `ttl` seconds and the least recently used entry is
+    evicted once `max_size` entries are held.
+    """
+    def __init__(self, max_size=1024, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        """
+        returns the cached value for key or default if it is missing or stale
+        """
+        with self._lock:
+            entry = self._data.get(key, None)
+            if entry is None:
+                return default
+
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        stores value under key, evicting the least recently used entry if full
+        """
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """
+        removes key from the cache if present
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """
+        empties the cache
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key, None) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
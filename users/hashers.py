@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+PASSWORD_HASHING = getattr(settings, 'PASSWORD_HASHING', {})
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    pbkdf2_sha256 hasher whose cost comes from settings.PASSWORD_HASHING['ITERATIONS'].
+    it keeps the pbkdf2_sha256 algorithm name, so existing hashes still verify and are
+    upgraded to the configured cost the next time their user logs in.
+    """
+    iterations = PASSWORD_HASHING.get('ITERATIONS', PBKDF2PasswordHasher.iterations)
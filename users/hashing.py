@@ -0,0 +1,87 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from threading import BoundedSemaphore
+import os
+import logging
+
+log = logging.getLogger('main')
+
+PASSWORD_HASHING = getattr(settings, 'PASSWORD_HASHING', {})
+
+MAX_WORKERS = PASSWORD_HASHING.get('MAX_WORKERS', None) or max(1, (os.cpu_count() or 2) // 2)
+MAX_QUEUED = PASSWORD_HASHING.get('MAX_QUEUED', MAX_WORKERS * 4)
+TIMEOUT = PASSWORD_HASHING.get('TIMEOUT', 5)
+
+
+class HashingBusy(Exception):
+    """
+    raised when the hashing executor is saturated and cannot take more work in time
+    """
+
+
+# hash work runs on a bounded pool so it can only ever occupy MAX_WORKERS cores
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='password-hashing')
+_slots = BoundedSemaphore(MAX_WORKERS + MAX_QUEUED)
+
+
+def submit_hashing(func, *args):
+    """
+    queues func on the hashing executor and returns its future
+    """
+    if not _slots.acquire(timeout=TIMEOUT):
+        log.error(f'password hashing executor is saturated, rejecting hashing request')
+        raise HashingBusy('password hashing is currently saturated')
+
+    try:
+        future = _executor.submit(func, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def run_hashing(func, *args):
+    """
+    runs func on the hashing executor and waits for its result
+    """
+    return submit_hashing(func, *args).result()
+
+
+def hash_password(raw_password):
+    """
+    hashes raw_password with the configured hasher on the hashing executor
+    """
+    return run_hashing(make_password, raw_password)
+
+
+def hash_passwords(raw_passwords):
+    """
+    hashes many passwords in parallel on the hashing executor, returning the hashes in order.
+    at most MAX_WORKERS are queued at a time so logins can still get through during a bulk job
+    """
+    hashes = []
+    in_flight = deque()
+    for raw_password in raw_passwords:
+        if len(in_flight) >= MAX_WORKERS:
+            hashes.append(in_flight.popleft().result())
+        in_flight.append(submit_hashing(make_password, raw_password))
+
+    while in_flight:
+        hashes.append(in_flight.popleft().result())
+    return hashes
+
+
+def check_user_password(user, raw_password):
+    """
+    checks raw_password against user on the hashing executor.
+    a correct password stored with an outdated hasher or cost is rehashed and saved.
+    """
+    is_correct, must_update = run_hashing(verify_password, raw_password, user.password)
+    if is_correct and must_update:
+        log.info(f'upgrading the stored password hash of the requesting user')
+        user.password = hash_password(raw_password)
+        user.save(update_fields=['password'])
+    return is_correct
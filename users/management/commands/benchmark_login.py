@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from users.hashing import hash_password, check_user_password, MAX_WORKERS
+from users.models import CustomUser
+import os
+import time
+
+
+class Command(BaseCommand):
+    """
+    measures password verification throughput, the cpu bound part of a login,
+    through the bounded hashing executor
+    """
+    help = 'benchmarks login password checks per second and per core'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help='number of password checks to run')
+        parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 1, help='number of concurrent login requests')
+
+    def handle(self, *args, **options):
+        logins = options['logins']
+        concurrency = options['concurrency']
+
+        """ an unsaved user is enough, a correct password with the current cost never triggers a save """
+        user = CustomUser(email='benchmark@mail.com')
+        user.password = hash_password('benchmark-password')
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as requests:
+            results = list(requests.map(lambda _: check_user_password(user, 'benchmark-password'), range(logins)))
+        elapsed = time.perf_counter() - start
+
+        if not all(results):
+            self.stderr.write('some password checks failed')
+            return
+
+        cores = min(MAX_WORKERS, concurrency, os.cpu_count() or 1)
+        rate = logins / elapsed
+        self.stdout.write(f'{logins} logins with {concurrency} concurrent requests in {elapsed:.2f}s')
+        self.stdout.write(f'hashing workers: {MAX_WORKERS}, cores used: {cores}')
+        self.stdout.write(f'throughput: {rate:.1f} logins/s, {rate / cores:.1f} logins/s per core')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+import logging
+
+log = logging.getLogger('main')
+
+
+class Command(BaseCommand):
+    """
+    deletes expired outstanding and blacklisted refresh tokens in small batches,
+    keeping the blacklist tables (and the lookup on every refresh) from growing forever.
+    meant to run on a schedule, e.g. daily from cron
+    """
+    help = 'deletes expired outstanding and blacklisted tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='number of rows deleted per query')
+
+    def prune(self, queryset, batch_size):
+        """
+        deletes the rows of queryset one batch of primary keys at a time
+        """
+        deleted = 0
+        while True:
+            batch = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                return deleted
+            deleted += queryset.model.objects.filter(pk__in=batch).delete()[0]
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+
+        """ blacklist rows go first so deleting the outstanding rows has nothing left to cascade to """
+        blacklisted = self.prune(BlacklistedToken.objects.filter(token__expires_at__lte=now), batch_size)
+        outstanding = self.prune(OutstandingToken.objects.filter(expires_at__lte=now), batch_size)
+
+        log.info(f'pruned {outstanding} expired outstanding tokens and {blacklisted} blacklisted tokens')
+        self.stdout.write(f'deleted {outstanding} expired outstanding tokens and {blacklisted} blacklisted tokens')
@@ -1,8 +1,25 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import models
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 
 
-class CustomUserManager(BaseUserManager):
+class UserQuerySet(models.QuerySet):
+    """
+    queryset of the user models
+    """
+    def search(self, term):
+        """
+        prefix search on first name, last name, email and phone number, served by the user search indexes
+        """
+        term = term.strip()
+        return self.filter(
+            Q(first_name__istartswith=term) | Q(last_name__istartswith=term)
+            | Q(email__istartswith=term) | Q(phone_number__startswith=term)
+        )
+
+
+class CustomUserManager(BaseUserManager.from_queryset(UserQuerySet)):
     """
     Custom user model manager where email is the unique identifier
     for authentication instead of usernames.
@@ -31,4 +48,11 @@ class CustomUserManager(BaseUserManager):
             raise ValueError(_("Superuser must have is_staff=True."))
         if extra_fields.get("is_superuser") is not True:
             raise ValueError(_("Superuser must have is_superuser=True."))
-        return self.create_user(email, password, **extra_fields)
\ No newline at end of file
+        return self.create_user(email, password, **extra_fields)
+
+class RoleUserManager(CustomUserManager):
+    """
+    manager of the proxy user models, limited to the users with the proxy's role
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(role=self.model.proxy_role)
@@ -0,0 +1,97 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:03
+
+import datetime
+import django.db.models.deletion
+import django.utils.timezone
+import django_prometheus.models
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomUser',
+            fields=[
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('email', models.EmailField(max_length=254, unique=True, verbose_name='email address')),
+                ('is_staff', models.BooleanField(default=False)),
+                ('is_active', models.BooleanField(default=False)),
+                ('date_joined', models.DateField(default=datetime.date.today)),
+                ('last_login', models.DateTimeField(default=django.utils.timezone.now)),
+                ('is_authenticated', models.BooleanField(default=False)),
+                ('department', models.CharField(blank=True, max_length=15)),
+                ('groups', models.ManyToManyField(to='auth.group')),
+                ('user_permissions', models.ManyToManyField(to='auth.permission')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AdminStaff',
+            fields=[
+                ('customuser_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('first_name', models.CharField(max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('username', models.CharField(max_length=100)),
+                ('other_names', models.CharField(blank=True, max_length=100)),
+                ('gender', models.CharField(blank=True, max_length=20)),
+                ('phone_number', models.CharField(max_length=15, null=True)),
+                ('date_of_birth', models.DateField(blank=True)),
+                ('nationality', models.CharField(blank=True, max_length=100)),
+                ('address', models.CharField(blank=True, max_length=200)),
+            ],
+            options={
+                'ordering': ['last_name', 'first_name'],
+            },
+            bases=(django_prometheus.models.ExportModelOperationsMixin('admin staff'), 'users.customuser'),
+        ),
+        migrations.CreateModel(
+            name='Owner',
+            fields=[
+                ('customuser_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('first_name', models.CharField(max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('username', models.CharField(max_length=100)),
+                ('gender', models.CharField(blank=True, max_length=20)),
+                ('phone_number', models.CharField(max_length=15, null=True)),
+                ('date_of_birth', models.DateField(blank=True)),
+                ('address', models.CharField(blank=True, max_length=200)),
+                ('is_store_admin', models.BooleanField(default=False)),
+            ],
+            options={
+                'ordering': ['last_name', 'first_name'],
+            },
+            bases=(django_prometheus.models.ExportModelOperationsMixin('owner'), 'users.customuser'),
+        ),
+        migrations.CreateModel(
+            name='RetailStaff',
+            fields=[
+                ('customuser_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('first_name', models.CharField(max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('username', models.CharField(max_length=100)),
+                ('other_names', models.CharField(blank=True, max_length=100)),
+                ('gender', models.CharField(blank=True, max_length=20)),
+                ('phone_number', models.CharField(max_length=15, null=True)),
+                ('date_of_birth', models.DateField(blank=True)),
+                ('nationality', models.CharField(blank=True, max_length=100)),
+                ('address', models.CharField(blank=True, max_length=200)),
+            ],
+            options={
+                'ordering': ['last_name', 'first_name'],
+            },
+            bases=(django_prometheus.models.ExportModelOperationsMixin('retail staff'), 'users.customuser'),
+        ),
+    ]
@@ -0,0 +1,179 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:10
+
+import django_prometheus.models
+from django.db import migrations, models
+from django.db.migrations.loader import MigrationLoader
+
+
+# profile columns copied from each child table into custom_user
+PROFILES = [
+    ('users_owner', 'owner', ['first_name', 'last_name', 'username', 'gender', 'phone_number', 'date_of_birth', 'address', 'is_store_admin']),
+    ('users_adminstaff', 'admin_staff', ['first_name', 'last_name', 'username', 'other_names', 'gender', 'phone_number', 'date_of_birth', 'nationality', 'address']),
+    ('users_retailstaff', 'retail_staff', ['first_name', 'last_name', 'username', 'other_names', 'gender', 'phone_number', 'date_of_birth', 'nationality', 'address']),
+]
+
+
+def copy_profiles(apps, schema_editor):
+    """
+    copies every owner, admin_staff and retail_staff profile onto its custom_user row and sets its role,
+    with a single UPDATE ... FROM per table however many users there are
+    """
+    quote = schema_editor.quote_name
+    for table, role, fields in PROFILES:
+        columns = ', '.join(f"{quote(field)} = profile.{quote(field)}" for field in fields)
+        schema_editor.execute(
+            f"UPDATE {quote('users_customuser')} SET {quote('role')} = %s, {columns} "
+            f"FROM {quote(table)} AS profile WHERE {quote('users_customuser')}.{quote('id')} = profile.{quote('customuser_ptr_id')}",
+            [role],
+        )
+
+
+def restore_profiles(apps, schema_editor):
+    """
+    copies the profiles back into the owner, admin_staff and retail_staff tables
+    """
+    quote = schema_editor.quote_name
+    for table, role, fields in PROFILES:
+        columns = ', '.join(quote(field) for field in fields)
+        schema_editor.execute(
+            f"INSERT INTO {quote(table)} ({quote('customuser_ptr_id')}, {columns}) "
+            f"SELECT {quote('id')}, {columns} FROM {quote('users_customuser')} WHERE {quote('role')} = %s",
+            [role],
+        )
+
+
+def drop_child_tables(apps, schema_editor):
+    """
+    drops the owner, admin_staff and retail_staff tables once their rows have been copied
+    """
+    for table, role, fields in PROFILES:
+        schema_editor.execute(schema_editor.sql_delete_table % {'table': schema_editor.quote_name(table)})
+
+
+def create_child_tables(apps, schema_editor):
+    """
+    recreates the owner, admin_staff and retail_staff tables from the initial migration state
+    """
+    state = MigrationLoader(schema_editor.connection).project_state(('users', '0001_initial'))
+    for name in ('Owner', 'AdminStaff', 'RetailStaff'):
+        schema_editor.create_model(state.apps.get_model('users', name))
+
+
+class Migration(migrations.Migration):
+    """
+    collapses the multi-table user models into custom_user with a role column,
+    Owner, AdminStaff and RetailStaff become proxy models
+    """
+
+    dependencies = [
+        ('users', '0003_remove_customuser_is_authenticated'),
+        ('sales', '0003_sales_staff_to_customuser'),
+    ]
+
+    operations = [
+        # the child models leave the migration state first, their fields would clash with the new
+        # custom_user fields, while their tables are kept until the profiles have been copied
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.DeleteModel(name='AdminStaff'),
+                migrations.DeleteModel(name='Owner'),
+                migrations.DeleteModel(name='RetailStaff'),
+            ],
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='role',
+            field=models.CharField(blank=True, choices=[('owner', 'Owner'), ('admin_staff', 'Admin Staff'), ('retail_staff', 'Retail Staff')], db_index=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='first_name',
+            field=models.CharField(default='', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='last_name',
+            field=models.CharField(default='', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='username',
+            field=models.CharField(default='', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='other_names',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='gender',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='phone_number',
+            field=models.CharField(max_length=15, null=True),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='date_of_birth',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='nationality',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='address',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='is_store_admin',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(copy_profiles, restore_profiles),
+        migrations.RunPython(drop_child_tables, create_child_tables),
+        migrations.CreateModel(
+            name='AdminStaff',
+            fields=[
+            ],
+            options={
+                'ordering': ['last_name', 'first_name'],
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=(django_prometheus.models.ExportModelOperationsMixin('admin staff'), 'users.customuser'),
+        ),
+        migrations.CreateModel(
+            name='Owner',
+            fields=[
+            ],
+            options={
+                'ordering': ['last_name', 'first_name'],
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=(django_prometheus.models.ExportModelOperationsMixin('owner'), 'users.customuser'),
+        ),
+        migrations.CreateModel(
+            name='RetailStaff',
+            fields=[
+            ],
+            options={
+                'ordering': ['last_name', 'first_name'],
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=(django_prometheus.models.ExportModelOperationsMixin('retail staff'), 'users.customuser'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:20
+
+from django.db import migrations, models
+from django.db.models import TextField
+from django.db.models.functions import Cast, Upper
+
+
+def search_indexes():
+    """
+    pattern indexes serving the `?q=` prefix search, only postgresql can use them for LIKE 'term%'.
+    the expressions match the UPPER(column::text) that istartswith compiles to
+    """
+    from django.contrib.postgres.indexes import OpClass
+    return [
+        models.Index(OpClass(Upper(Cast(field, TextField())), name='text_pattern_ops'), name=f'users_{field}_search_idx')
+        for field in ('first_name', 'last_name', 'email')
+    ] + [models.Index(fields=['phone_number'], opclasses=['varchar_pattern_ops'], name='users_phone_number_search_idx')]
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    CustomUser = apps.get_model('users', 'CustomUser')
+    for index in search_indexes():
+        schema_editor.add_index(CustomUser, index)
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    CustomUser = apps.get_model('users', 'CustomUser')
+    for index in search_indexes():
+        schema_editor.remove_index(CustomUser, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0004_collapse_user_tables'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['role', 'last_name', 'first_name', 'id'], name='users_role_name_idx'),
+        ),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
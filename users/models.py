@@ -4,8 +4,9 @@ from django.db import models
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from datetime import date
-from .managers import CustomUserManager
+from .managers import CustomUserManager, RoleUserManager
 from datetime import datetime
+from django.utils import timezone
 from django_prometheus.models import ExportModelOperationsMixin
 import logging
 from django.contrib.auth.models import Group, Permission
@@ -15,39 +16,105 @@ log = logging.getLogger('main')
 class CustomUser(AbstractBaseUser, PermissionsMixin):
     """ 
     Base User class.
+    every user lives in this table, owners, admin_staff and retail_staff are proxies told apart by role.
     """
+    ROLE_OWNER = 'owner'
+    ROLE_ADMIN_STAFF = 'admin_staff'
+    ROLE_RETAIL_STAFF = 'retail_staff'
+    ROLE_CHOICES = [
+        (ROLE_OWNER, 'Owner'),
+        (ROLE_ADMIN_STAFF, 'Admin Staff'),
+        (ROLE_RETAIL_STAFF, 'Retail Staff'),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     email = models.EmailField(_("email address"), unique=True)
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES, blank=True, db_index=True)
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=False)
-    date_joined = models.DateField(default=date.today())
-    last_login = models.DateTimeField(default=datetime.now())
-    is_authenticated = models.BooleanField(default=False)
+    date_joined = models.DateField(default=date.today)
+    last_login = models.DateTimeField(default=timezone.now)
     department = models.CharField(max_length=15, blank=True)
+    token_version = models.PositiveIntegerField(default=0)
     groups = models.ManyToManyField(Group)
     user_permissions = models.ManyToManyField(Permission)
 
+    # profile fields of every role, other_names and nationality are unused by owners
+    # and is_store_admin only applies to owners
+    first_name = models.CharField(max_length=100)
+    last_name = models.CharField(max_length=100)
+    username = models.CharField(max_length=100)
+    other_names = models.CharField(max_length=100, blank=True)
+    gender = models.CharField(max_length=20, blank=True)
+    phone_number = models.CharField(null=True, max_length=15)
+    date_of_birth = models.DateField(null=True, blank=True)
+    nationality = models.CharField(max_length=100, blank=True)
+    address = models.CharField(max_length=200, blank=True)
+    is_store_admin = models.BooleanField(default=False)
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
+    # role given to new instances of a proxy model, None on the base model
+    proxy_role = None
+
     objects = CustomUserManager()
 
+    class Meta:
+        indexes = [
+            # backs the role filtered, name ordered listings of the proxy models
+            models.Index(fields=['role', 'last_name', 'first_name', 'id'], name='users_role_name_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.proxy_role is not None and not self.role:
+            self.role = self.proxy_role
+
+    def get_concrete_user(self):
+        """
+        Returns this user as an owner, admin_staff or retail_staff instance, without another query.
+        """
+        model = ROLE_MODELS.get(self.role, None)
+        if model is None:
+            return None
+        if not isinstance(self, model):
+            self.__class__ = model
+        return self
+
+    @property
+    def is_owner(self):
+        """
+        checks if the user is an owner
+        """
+        return self.role == self.ROLE_OWNER
+
+    @property
+    def is_admin_staff(self):
+        """
+        checks if the user is an admin_staff
+        """
+        return self.role == self.ROLE_ADMIN_STAFF
+
+    @property
+    def is_retail_staff(self):
+        """
+        checks if the user is a retail_staff
+        """
+        return self.role == self.ROLE_RETAIL_STAFF
+
 
 class Owner(ExportModelOperationsMixin('owner'), CustomUser):
     """ 
-    Defines Owner model which inherits from the customUser class.
+    Defines Owner model, a proxy for the customUser rows with the owner role.
     """
-    first_name = models.CharField(max_length=100)
-    last_name = models.CharField(max_length=100)
-    username = models.CharField(max_length=100)
-    gender = models.CharField(max_length=20, blank=True)
-    phone_number = models.CharField(null=True, max_length=15)
-    date_of_birth = models.DateField(blank=True)
-    address = models.CharField(max_length=200, blank=True)
-    is_store_admin = models.BooleanField(default=False)
+    proxy_role = CustomUser.ROLE_OWNER
+
+    objects = RoleUserManager()
 
 # sort our get_absolute_url return reverse function
     class Meta:
+        proxy = True
         ordering = ['last_name', 'first_name']
     
     def get_absolute_url(self):
@@ -74,20 +141,15 @@ class Owner(ExportModelOperationsMixin('owner'), CustomUser):
 
 class RetailStaff(ExportModelOperationsMixin('retail staff'), CustomUser):
     """ 
-    Defines model for retail staff which inherits from the customUser class.
+    Defines model for retail staff, a proxy for the customUser rows with the retail_staff role.
     """
-    first_name = models.CharField(max_length=100)
-    last_name = models.CharField(max_length=100)
-    username = models.CharField(max_length=100)
-    other_names = models.CharField(max_length=100, blank=True)
-    gender = models.CharField(max_length=20, blank=True)
-    phone_number = models.CharField(null=True, max_length=15)
-    date_of_birth = models.DateField(blank=True)
-    nationality = models.CharField(max_length=100, blank=True)
-    address = models.CharField(max_length=200, blank=True)
+    proxy_role = CustomUser.ROLE_RETAIL_STAFF
+
+    objects = RoleUserManager()
 
 # sort our get_absolute_url return reverse function
     class Meta:
+        proxy = True
         ordering = ['last_name', 'first_name']
     
     def get_absolute_url(self):
@@ -113,20 +175,15 @@ class RetailStaff(ExportModelOperationsMixin('retail staff'), CustomUser):
 
 class AdminStaff(ExportModelOperationsMixin('admin staff'), CustomUser):
     """
-    Defines model for admin staff which inherits from the customUser class.
+    Defines model for admin staff, a proxy for the customUser rows with the admin_staff role.
     """
-    first_name = models.CharField(max_length=100)
-    last_name = models.CharField(max_length=100)
-    username = models.CharField(max_length=100)
-    other_names = models.CharField(max_length=100, blank=True)
-    gender = models.CharField(max_length=20, blank=True)
-    phone_number = models.CharField(null=True, max_length=15)
-    date_of_birth = models.DateField(blank=True)
-    nationality = models.CharField(max_length=100, blank=True)
-    address = models.CharField(max_length=200, blank=True)
+    proxy_role = CustomUser.ROLE_ADMIN_STAFF
+
+    objects = RoleUserManager()
 
 # sort our get_absolute_url return reverse function
     class Meta:
+        proxy = True
         ordering = ['last_name', 'first_name']
     
     def get_absolute_url(self):
@@ -149,3 +206,10 @@ class AdminStaff(ExportModelOperationsMixin('admin staff'), CustomUser):
         super().save(*args, **kwargs)
         log.info(f'admin_staff has been successfully saved')
 
+
+# proxy model of each role, used to hand out the right user type from a single query
+ROLE_MODELS = {
+    CustomUser.ROLE_OWNER: Owner,
+    CustomUser.ROLE_ADMIN_STAFF: AdminStaff,
+    CustomUser.ROLE_RETAIL_STAFF: RetailStaff,
+}
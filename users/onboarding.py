@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from users.hashing import hash_passwords
+from users.models import CustomUser
+import logging
+
+log = logging.getLogger('main')
+
+BULK_ONBOARDING = getattr(settings, 'BULK_ONBOARDING', {})
+
+MAX_ROWS = BULK_ONBOARDING.get('MAX_ROWS', 1000)
+BATCH_SIZE = BULK_ONBOARDING.get('BATCH_SIZE', 200)
+
+
+def onboard_users(rows, serializer_class, batch_size=BATCH_SIZE):
+    """
+    validates rows with serializer_class, hashes the passwords of the valid rows in parallel and
+    inserts them with one bulk insert per batch.
+    returns one result per row, a row that fails never stops the others from being created
+    """
+    log.info(f'onboarding {len(rows)} users in bulk')
+    results = [None] * len(rows)
+    valid = []
+    seen = set()
+    for index, row in enumerate(rows):
+        serializer = serializer_class(data=row)
+        if not serializer.is_valid():
+            results[index] = {'row': index, 'error': serializer.errors}
+            continue
+
+        email = serializer.validated_data['email']
+        if email in seen:
+            results[index] = {'row': index, 'error': {'email': ['this email appears more than once in the upload']}}
+            continue
+        seen.add(email)
+        valid.append((index, serializer))
+
+    """ one query for the emails already taken instead of one per row """
+    taken = set(CustomUser.objects.filter(email__in=seen).values_list('email', flat=True))
+    pending = []
+    for index, serializer in valid:
+        if serializer.validated_data['email'] in taken:
+            results[index] = {'row': index, 'error': {'email': ['custom user with this email address already exists.']}}
+        else:
+            pending.append((index, serializer))
+
+    hashes = hash_passwords([serializer.validated_data['password'] for index, serializer in pending])
+    users = []
+    for (index, serializer), password in zip(pending, hashes):
+        data = dict(serializer.validated_data)
+        data.pop('confirm_password', None)
+        data['password'] = password
+        users.append((index, serializer, serializer_class.Meta.model(**data)))
+
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        try:
+            with transaction.atomic():
+                serializer_class.Meta.model.objects.bulk_create([user for index, serializer, user in batch])
+        except IntegrityError:
+            """ a row of the batch was taken meanwhile, retrying the batch row by row """
+            log.error(f'bulk insert of an onboarding batch failed, inserting its rows one at a time')
+            for index, serializer, user in batch:
+                try:
+                    with transaction.atomic():
+                        user.save(force_insert=True)
+                except IntegrityError:
+                    results[index] = {'row': index, 'error': {'email': ['custom user with this email address already exists.']}}
+                    continue
+                serializer.instance = user
+                results[index] = {'row': index, 'data': serializer.data}
+            continue
+
+        for index, serializer, user in batch:
+            serializer.instance = user
+            results[index] = {'row': index, 'data': serializer.data}
+
+    log.info(f'{len([result for result in results if "data" in result])} of {len(rows)} users have been onboarded')
+    return results
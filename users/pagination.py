@@ -0,0 +1,11 @@
+from rest_framework.pagination import CursorPagination
+
+
+class StaffCursorPagination(CursorPagination):
+    """
+    keyset pagination over the user listings, following the models' last_name, first_name ordering.
+    id breaks ties between users with the same name so pages never skip or repeat a user
+    """
+    ordering = ('last_name', 'first_name', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,20 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+import codecs
+import csv
+
+
+class CSVParser(BaseParser):
+    """
+    parses a csv upload with a header row into a list of dicts, one per row.
+    empty cells are left out so optional fields fall back to their defaults
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        try:
+            reader = csv.DictReader(codecs.iterdecode(stream, encoding))
+            return [{key: value for key, value in row.items() if key and value not in (None, '')} for row in reader]
+        except (csv.Error, UnicodeDecodeError) as exc:
+            raise ParseError(f'CSV parse error - {exc}')
@@ -1,61 +1,66 @@
-import jwt
+from copy import copy
 from django.conf import settings
-from users.models import Owner, AdminStaff, RetailStaff
-from datetime import datetime, timedelta
-from django.utils import timezone
+from users.models import CustomUser
+from users.cache import TTLCache
+from users.activity import activity
+from users.tokens import token_version
+from users.sessions import registry
 import logging
 
 log = logging.getLogger('main')
 
+USER_CACHE = getattr(settings, 'USER_CACHE', {})
 
-def get_user(request):
+# recently resolved users, keyed by user id and invalidated by the users.signals receivers
+user_cache = TTLCache(max_size=USER_CACHE.get('MAX_SIZE', 1024), ttl=USER_CACHE.get('TTL', 30))
+
+
+def fetch_user(**lookup):
+        """
+        retrieves the concrete (owner, admin_staff or retail_staff) user matching lookup
+        in a single query against the custom_user table
         """
-        retrieves the requesting user instance from the jwt cookie
-        """ 
-        log.info(f"verifying requesting user's permissions via the get_user function")
-        token = request.COOKIES.get('jwt', None)
-        if token is None:
-            log.error(f"verification failed due to absence of jwt token in request cookie")
-            return None
-            
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-        except:
-            log.error(f"verification failed due to jwt token issues")
-            user = None
+            base = CustomUser.objects.get(**lookup)
+        except CustomUser.DoesNotExist:
+            return None
+        return base.get_concrete_user()
 
-        log.info(f"jwt token & payload sorted successsfully, now retrieveing requesting user")
-        try:
-            user = Owner.objects.get(id=payload['user_id'])
-        except:
 
-            try: 
-                user = AdminStaff.objects.get(id=payload['user_id'])
-            except:
+def resolve_user(user_id):
+        """
+        retrieves the concrete user identified by user_id, using the user cache when possible
+        """
+        key = str(user_id)
+        user = user_cache.get(key)
+        if user is None:
+            log.info(f"requesting user is not cached, retrieving it from the database")
+            user = fetch_user(id=user_id)
+            if user is None:
+                return None
+            user_cache.set(key, user)
+
+        """ each request gets its own copy so changes to it never leak into the cache """
+        return copy(user)
 
-                try:
-                    user = RetailStaff.objects.get(id=payload['user_id'])
-                except:
-                    user = None                
 
-        if user is not None:
-            if user.is_authenticated == False:
-                log.error(f"verification failed because requesting user is not logged in")
-                return None
-                                   
-            expiration = user.last_login + timedelta(minutes=5)
-            if timezone.now() < expiration:    
-                user.last_login = datetime.now()
-                user.save()
-                log.info(f"requesting user has been retrieved and verified successfully")
-                return user
-            else:
-                user.is_authenticated = False
-                user.save()
-                log.error(f"verification failed because requesting user's session has expired")
-                return None           
-        else:
-            log.error(f"verification failed because requesting user couldn't be found on the database")
-            return None
+def verify_claims(claims_user):
+        """
+        verifies a claims-only user against the session registry and the token version,
+        only touching the database when the version isn't cached
+        """
+        if registry.touch(claims_user.session_id) is None:
+            log.error(f"verification failed because requesting user's session has expired or was closed")
+            return False
 
+        """ a version missing from the cache (another worker, a restart, an eviction) is read from the database once """
+        current = token_version(claims_user.pk)
+        if current is None:
+            log.error(f"verification failed because requesting user couldn't be found on the database")
+            return False
+        if claims_user.version < current:
+            log.error(f"verification failed because the requesting user's token has been revoked")
+            return False
 
+        activity.touch(claims_user.pk)
+        return True
@@ -1,4 +1,5 @@
-from django.contrib.auth.hashers import make_password
+from users.hashing import hash_password
+from users.tokens import revoke_tokens
 from users.models import Owner, AdminStaff, RetailStaff
 from rest_framework import serializers
 import logging
@@ -14,8 +15,8 @@ class OwnerSerializer(serializers.ModelSerializer):
     confirm_password = serializers.CharField(write_only=True)
     class Meta:
         model = Owner
-        fields = '__all__'
-        read_only_fields = ['id', 'is_active', 'is_staff', 'is_superuser']
+        exclude = ['other_names', 'nationality']
+        read_only_fields = ['id', 'role', 'token_version', 'is_active', 'is_staff', 'is_superuser']
         extra_kwargs = {
             'password': {'write_only': True},
         }
@@ -25,7 +26,7 @@ class OwnerSerializer(serializers.ModelSerializer):
         Validates request data.
         """
         log.info(f'validating owner data from request')
-        if data['password'] != data['confirm_password']:
+        if data.get('password', None) != data.get('confirm_password', None):
             log.error(f'validation of owner data from request failed because password and confirm_passwords dont match')
             raise serializers.ValidationError("Passwords do not match.")
         
@@ -92,19 +93,25 @@ class OwnerSerializer(serializers.ModelSerializer):
         """
         log.info(f'creating a new owner using the request data via the owner_serializer class')
         validated_data.pop('confirm_password', None)
-        validated_data['password'] = make_password(validated_data.get('password'))
+        validated_data['password'] = hash_password(validated_data.get('password'))
         log.info(f'new owner has been created successfully via the owner_serializer class')
         return super(OwnerSerializer, self).create(validated_data)
     
     def update(self, instance, validated_data):
         """
-        updates an existing owner and hashes the password.
+        updates an existing owner, hashing the password only when a new one is given.
         """
         log.info(f'updating an existing owner using the request data via the owner_serializer class')
         validated_data.pop('confirm_password', None)
-        validated_data['password'] = make_password(validated_data['password'])
+        password = validated_data.pop('password', None)
+        if password is not None:
+            validated_data['password'] = hash_password(password)
         log.info(f'existing owner has been updated successfully via the owner_serializer class')
-        return super(OwnerSerializer, self).update(instance, validated_data)
+        instance = super(OwnerSerializer, self).update(instance, validated_data)
+        if password is not None:
+            """ tokens issued for the old password must stop working """
+            revoke_tokens(instance)
+        return instance
 
 class AdminSerializer(serializers.ModelSerializer):
     """
@@ -114,8 +121,8 @@ class AdminSerializer(serializers.ModelSerializer):
     confirm_password = serializers.CharField(write_only=True)
     class Meta:
         model = AdminStaff
-        fields = '__all__'
-        read_only_fields = ['id', 'is_active', 'is_staff', 'is_superuser']
+        exclude = ['is_store_admin']
+        read_only_fields = ['id', 'role', 'token_version', 'is_active', 'is_staff', 'is_superuser']
         extra_kwargs = {
             'password': {'write_only': True},
         }
@@ -125,7 +132,7 @@ class AdminSerializer(serializers.ModelSerializer):
         Validates request data.
         """
         log.info(f'validating admin_staff data from request')
-        if data['password'] != data['confirm_password']:
+        if data.get('password', None) != data.get('confirm_password', None):
             log.error(f'validation of admin_staff data from request failed because password and confirm_passwords dont match')
             raise serializers.ValidationError("Passwords do not match.")
         
@@ -192,19 +199,25 @@ class AdminSerializer(serializers.ModelSerializer):
         """
         log.info(f'creating a new admin_staff using the request data via the admin_serializer class')
         validated_data.pop('confirm_password', None)
-        validated_data['password'] = make_password(validated_data.get('password'))
+        validated_data['password'] = hash_password(validated_data.get('password'))
         log.info(f'new admin_staff has been created successfully via the admin_serializer class')
         return super(AdminSerializer, self).create(validated_data)
     
     def update(self, instance, validated_data):
         """
-        updates an existing admin and hashes the password.
+        updates an existing admin, hashing the password only when a new one is given.
         """
         log.info(f'updating an existing admin_staff using the request data via the admin_serializer class')
         validated_data.pop('confirm_password', None)
-        validated_data['password'] = make_password(validated_data['password'])
+        password = validated_data.pop('password', None)
+        if password is not None:
+            validated_data['password'] = hash_password(password)
         log.info(f'existing admin_staff has been updated successfully via the admin_serializer class')
-        return super(AdminSerializer, self).update(instance, validated_data)
+        instance = super(AdminSerializer, self).update(instance, validated_data)
+        if password is not None:
+            """ tokens issued for the old password must stop working """
+            revoke_tokens(instance)
+        return instance
 
 class RetailSerializer(serializers.ModelSerializer):
     """
@@ -214,8 +227,8 @@ class RetailSerializer(serializers.ModelSerializer):
     confirm_password = serializers.CharField(write_only=True)
     class Meta:
         model = RetailStaff
-        fields = '__all__'
-        read_only_fields = ['id', 'is_active', 'is_staff', 'is_superuser']
+        exclude = ['is_store_admin']
+        read_only_fields = ['id', 'role', 'token_version', 'is_active', 'is_staff', 'is_superuser']
         extra_kwargs = {
             'password': {'write_only': True},
         }
@@ -225,7 +238,7 @@ class RetailSerializer(serializers.ModelSerializer):
         Validates request data.
         """
         log.info(f'validating retail_staff data from request')
-        if data['password'] != data['confirm_password']:
+        if data.get('password', None) != data.get('confirm_password', None):
             log.error(f'validation of retail_staff data from request failed because password and confirm_passwords dont match')
             raise serializers.ValidationError("Passwords do not match.")
         
@@ -292,19 +305,38 @@ class RetailSerializer(serializers.ModelSerializer):
         """
         log.info(f'creating a new retail_staff using the request data via the retail_serializer class')
         validated_data.pop('confirm_password', None)
-        validated_data['password'] = make_password(validated_data.get('password'))
+        validated_data['password'] = hash_password(validated_data.get('password'))
         log.info(f'new retail_staff has been created successfully via the retail_serializer class')
         return super(RetailSerializer, self).create(validated_data)
     
     def update(self, instance, validated_data):
         """
-        updates an existing reatail_staff and hashes the password.
+        updates an existing reatail_staff, hashing the password only when a new one is given.
         """
         log.info(f'updating an existing retail_staff using the request data via the retail_serializer class')
         validated_data.pop('confirm_password', None)
-        validated_data['password'] = make_password(validated_data['password'])
+        password = validated_data.pop('password', None)
+        if password is not None:
+            validated_data['password'] = hash_password(password)
         log.info(f'existing retail_staff has been updated successfully via the retail_serializer class')
-        return super(RetailSerializer, self).update(instance, validated_data)
+        instance = super(RetailSerializer, self).update(instance, validated_data)
+        if password is not None:
+            """ tokens issued for the old password must stop working """
+            revoke_tokens(instance)
+        return instance
+
+
+class RetailBulkSerializer(RetailSerializer):
+    """
+    This class validates a single row of a bulk retail_staff upload.
+    email uniqueness is checked once for the whole upload instead of once per row.
+    """
+    class Meta(RetailSerializer.Meta):
+        exclude = ['is_store_admin', 'groups', 'user_permissions']
+        extra_kwargs = {
+            'password': {'write_only': True},
+            'email': {'validators': []},
+        }
 
 
 class UserLoginSerializer(serializers.Serializer):
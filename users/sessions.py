@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from datetime import timedelta
+from threading import Lock
+import time
+import logging
+
+log = logging.getLogger('main')
+
+SESSION_REGISTRY = getattr(settings, 'SESSION_REGISTRY', {})
+
+
+class SessionBackend:
+    """
+    storage interface for the session registry.
+    sessions are keyed by token id, hold the user id and expire after `ttl` seconds without a touch.
+    """
+    def open(self, session_id, user_id, ttl):
+        raise NotImplementedError
+
+    def touch(self, session_id, ttl):
+        """
+        extends a live session and returns its user id, or None if it is missing or expired
+        """
+        raise NotImplementedError
+
+    def close(self, session_id):
+        raise NotImplementedError
+
+
+class LocalSessionBackend(SessionBackend):
+    """
+    in-process session storage, only suitable when every request of a session reaches the same worker.
+    entries are kept in expiry order so evicting stale sessions is O(1) per session.
+    """
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self._sessions = OrderedDict()
+        self._lock = Lock()
+
+    def _evict(self, now):
+        while self._sessions:
+            session_id, (user_id, expires) = next(iter(self._sessions.items()))
+            if expires > now and len(self._sessions) <= self.max_size:
+                break
+            self._sessions.popitem(last=False)
+
+    def open(self, session_id, user_id, ttl):
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session_id] = (str(user_id), now + ttl)
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+
+    def touch(self, session_id, ttl):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._sessions.get(session_id, None)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], now + ttl)
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def close(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            self._evict(time.monotonic())
+            return len(self._sessions)
+
+
+class CacheSessionBackend(SessionBackend):
+    """
+    session storage on a django cache, shared by every worker when the cache is (e.g. redis or memcached)
+    """
+    def __init__(self, cache='default', prefix='session'):
+        self.cache = caches[cache]
+        self.prefix = prefix
+
+    def key(self, session_id):
+        return f'{self.prefix}:{session_id}'
+
+    def open(self, session_id, user_id, ttl):
+        self.cache.set(self.key(session_id), str(user_id), timeout=ttl)
+
+    def touch(self, session_id, ttl):
+        key = self.key(session_id)
+        user_id = self.cache.get(key)
+        if user_id is not None:
+            self.cache.touch(key, timeout=ttl)
+        return user_id
+
+    def close(self, session_id):
+        self.cache.delete(self.key(session_id))
+
+
+class SessionRegistry:
+    """
+    tracks live login sessions with a sliding idle timeout
+    """
+    def __init__(self, backend, idle_timeout=timedelta(minutes=5)):
+        self.backend = backend
+        self.idle_timeout = idle_timeout
+
+    @property
+    def ttl(self):
+        return self.idle_timeout.total_seconds()
+
+    def open(self, session_id, user_id):
+        """
+        starts a session for user_id
+        """
+        log.info(f'opening a login session for the requesting user')
+        self.backend.open(str(session_id), user_id, self.ttl)
+
+    def touch(self, session_id):
+        """
+        returns the user id of a live session and restarts its idle timeout, or None if it has expired
+        """
+        if session_id is None:
+            return None
+        return self.backend.touch(str(session_id), self.ttl)
+
+    def close(self, session_id):
+        """
+        ends a session
+        """
+        log.info(f'closing the login session of the requesting user')
+        self.backend.close(str(session_id))
+
+
+registry = SessionRegistry(
+    import_string(SESSION_REGISTRY.get('BACKEND', 'users.sessions.LocalSessionBackend'))(**SESSION_REGISTRY.get('OPTIONS', {})),
+    idle_timeout=SESSION_REGISTRY.get('IDLE_TIMEOUT', timedelta(minutes=5)),
+)
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from users.models import CustomUser
+from users.permissions import user_cache
+import logging
+
+log = logging.getLogger('main')
+
+
+@receiver(post_save)
+def evict_saved_user(sender, instance, **kwargs):
+    """
+    evicts a saved user from the user cache
+    """
+    if not isinstance(instance, CustomUser):
+        return
+
+    log.info(f'evicting saved user from the user cache')
+    user_cache.delete(str(instance.pk))
+
+
+@receiver(post_delete)
+def evict_deleted_user(sender, instance, **kwargs):
+    """
+    evicts a deleted user from the user cache
+    """
+    if not isinstance(instance, CustomUser):
+        return
+
+    log.info(f'evicting deleted user from the user cache')
+    user_cache.delete(str(instance.pk))
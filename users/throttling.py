@@ -0,0 +1,148 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+from prometheus_client import Counter
+from threading import Lock
+import hashlib
+import time
+import logging
+
+log = logging.getLogger('main')
+
+LOGIN_THROTTLE = getattr(settings, 'LOGIN_THROTTLE', {})
+
+# exported through the django_prometheus /metrics endpoint
+throttle_decisions = Counter(
+    'login_throttle_decisions_total',
+    'login attempts allowed or rejected by the login throttles',
+    ['scope', 'decision'],
+)
+
+
+class LocalBucketStore:
+    """
+    in-process token bucket storage, each worker limits the attempts it sees on its own.
+    the least recently used buckets are dropped once `max_size` are held.
+    """
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self._buckets = OrderedDict()
+        self._lock = Lock()
+
+    def take(self, key, capacity, refill_rate):
+        """
+        takes a token from the bucket under key, returns (allowed, seconds until the next token)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / refill_rate
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    attempt counters on a django cache, shared by every worker when the cache is (e.g. redis or memcached).
+    the bucket is approximated by a fixed window of capacity / refill_rate seconds counted with the cache's
+    atomic add and incr, so concurrent attempts on one key can't both get the last token.
+    """
+    def __init__(self, cache='default', prefix='throttle'):
+        self.cache = caches[cache]
+        self.prefix = prefix
+
+    def take(self, key, capacity, refill_rate):
+        """
+        counts an attempt in the current window of key, returns (allowed, seconds until the window ends)
+        """
+        window = capacity / refill_rate
+        now = time.time()
+        start = now - now % window
+        key = f'{self.prefix}:{key}:{int(start)}'
+        timeout = int(window) + 1
+        self.cache.add(key, 0, timeout=timeout)
+        try:
+            attempts = self.cache.incr(key)
+        except ValueError:
+            """ the counter was evicted or expired between the add and the incr """
+            self.cache.add(key, 0, timeout=timeout)
+            attempts = self.cache.incr(key)
+        allowed = attempts <= capacity
+        return allowed, 0 if allowed else start + window - now
+
+
+buckets = import_string(LOGIN_THROTTLE.get('STORE', 'users.throttling.LocalBucketStore'))(**LOGIN_THROTTLE.get('OPTIONS', {}))
+
+
+class LoginThrottle(BaseThrottle):
+    """
+    token bucket limiter for login attempts.
+    `rate` uses the rest_framework format ('5/min'): the bucket holds that many
+    attempts and refills at the same pace.
+    """
+    scope = None
+    default_rate = None
+
+    def __init__(self):
+        attempts, period = LOGIN_THROTTLE.get(self.scope.upper(), self.default_rate).split('/')
+        self.capacity = int(attempts)
+        self.refill_rate = self.capacity / {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        self.wait_time = None
+
+    def get_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        key = self.get_key(request)
+        if key is None:
+            return True
+
+        allowed, self.wait_time = buckets.take(f'{self.scope}:{key}', self.capacity, self.refill_rate)
+        throttle_decisions.labels(self.scope, 'allowed' if allowed else 'rejected').inc()
+        if not allowed:
+            log.error(f'login attempt rejected by the {self.scope} login throttle')
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+
+class LoginIPThrottle(LoginThrottle):
+    """
+    limits login attempts per client address
+    """
+    scope = 'ip'
+    default_rate = '30/min'
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class LoginEmailThrottle(LoginThrottle):
+    """
+    limits login attempts per targeted email, whichever address they come from
+    """
+    scope = 'email'
+    default_rate = '5/min'
+
+    def get_key(self, request):
+        """ a malformed body (e.g. a json list) has no email, it is left to the view to refuse """
+        if not isinstance(request.data, Mapping):
+            return None
+        email = request.data.get('email', None)
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()
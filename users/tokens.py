@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from users.models import CustomUser
+import logging
+
+log = logging.getLogger('main')
+
+TOKEN_VERSION_CACHE = getattr(settings, 'TOKEN_VERSION_CACHE', 'default')
+
+# seconds a cached token version is trusted for. a revocation only refreshes the cache of the worker handling it,
+# so on a per-process cache the others see it once their copy expires. None keeps it for the refresh lifetime,
+# which is only safe when TOKEN_VERSION_CACHE is shared by every worker
+TOKEN_VERSION_TTL = getattr(settings, 'TOKEN_VERSION_TTL', 10)
+
+
+def version_key(user_id):
+    """
+    cache key holding the current token version of a user
+    """
+    return f'token_version:{user_id}'
+
+
+def issue_tokens(user):
+    """
+    creates a refresh/access token pair carrying the claims needed to authorize the user
+    without retrieving it from the database
+    """
+    log.info(f'issuing tokens with authorization claims for the requesting user')
+    refresh = RefreshToken.for_user(user)
+    refresh['email'] = user.email
+    refresh['role'] = user.role
+    refresh['is_staff'] = user.is_staff
+    refresh['is_store_admin'] = getattr(user, 'is_store_admin', False)
+    refresh['ver'] = user.token_version
+    """ spares the first requests of the session from reading the version back """
+    remember_token_version(user.pk, user.token_version)
+    return refresh
+
+
+def current_token_version(user_id):
+    """
+    returns the known token version of a user, or None when it has not been recorded
+    """
+    return caches[TOKEN_VERSION_CACHE].get(version_key(user_id))
+
+
+def remember_token_version(user_id, version):
+    """
+    records the token version of a user for TOKEN_VERSION_TTL seconds, or as long as its refresh tokens can live
+    """
+    timeout = TOKEN_VERSION_TTL
+    if timeout is None:
+        timeout = settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()
+    caches[TOKEN_VERSION_CACHE].set(version_key(user_id), version, timeout=timeout)
+
+
+def revoke_tokens(user):
+    """
+    invalidates every token issued to user by bumping its token version
+    """
+    log.info(f'revoking the tokens issued to the requesting user')
+    CustomUser.objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    user.token_version = CustomUser.objects.values_list('token_version', flat=True).get(pk=user.pk)
+    remember_token_version(user.pk, user.token_version)
+    return user.token_version
+
+
+def token_version(user_id):
+    """
+    returns the current token version of a user, reading it from the database when it is not cached
+    """
+    version = current_token_version(user_id)
+    if version is None:
+        try:
+            version = CustomUser.objects.values_list('token_version', flat=True).get(pk=user_id)
+        except CustomUser.DoesNotExist:
+            return None
+        remember_token_version(user_id, version)
+    return version
+
+
+def rotate_tokens(raw_refresh):
+    """
+    exchanges a refresh token for a new refresh/access pair and blacklists the used refresh token.
+    raises TokenError if the refresh token is invalid, blacklisted or revoked
+    """
+    log.info(f'rotating the refresh token of the requesting user')
+    refresh = RefreshToken(raw_refresh)
+    version = token_version(refresh[api_settings.USER_ID_CLAIM])
+    if version is None or refresh.get('ver', 0) < version:
+        raise TokenError('Token has been revoked')
+
+    refresh.blacklist()
+    refresh.set_jti()
+    refresh.set_exp()
+    refresh.set_iat()
+    return refresh
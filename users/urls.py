@@ -1,6 +1,6 @@
 from django.urls import path
 from rest_framework import routers
-from users.views import OwnerViewSet, RetailStaffViewSet, AdminStaffViewSet, LoginView, LogoutView
+from users.views import OwnerViewSet, RetailStaffViewSet, AdminStaffViewSet, LoginView, LogoutView, RefreshView
 
 
 router = routers.SimpleRouter()
@@ -12,6 +12,7 @@ router.register(r'api/v1/retail-staff', RetailStaffViewSet, basename='retail')
 urlpatterns = [
     path('api/v1/login/', LoginView.as_view(), name='login'),
     path('api/v1/logout/', LogoutView.as_view(), name='logout'),
+    path('api/v1/refresh/', RefreshView.as_view(), name='refresh'),
 ]
 
 urlpatterns += router.urls
\ No newline at end of file
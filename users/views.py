@@ -3,14 +3,26 @@ from django.shortcuts import render
 # Create your views here.
 from users.models import Owner, AdminStaff, RetailStaff
 from rest_framework.response import Response
-from users.serializers import OwnerSerializer, AdminSerializer, RetailSerializer, UserLoginSerializer
+from users.serializers import OwnerSerializer, AdminSerializer, RetailSerializer, RetailBulkSerializer, UserLoginSerializer
 from rest_framework import status
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
-from users.permissions import get_user
+from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from users.permissions import fetch_user
+from users.tokens import issue_tokens, rotate_tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from users.sessions import registry
+from users.hashing import check_user_password, HashingBusy
+from users.activity import activity
+from users.pagination import StaffCursorPagination
+from users.throttling import LoginIPThrottle, LoginEmailThrottle
+from users.onboarding import onboard_users, MAX_ROWS
+from users.parsers import CSVParser
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework import status, viewsets
 from datetime import datetime, timedelta
 from django.utils import timezone
+from collections.abc import Mapping
 import logging
 
 log = logging.getLogger('main')
@@ -19,8 +31,9 @@ class OwnerViewSet(viewsets.ModelViewSet):
     """
     a viewset suite to handle crud operations on owner model
     """
-    queryset = Owner.objects.all()
+    queryset = Owner.objects.prefetch_related('groups', 'user_permissions')
     serializer_class = OwnerSerializer
+    pagination_class = StaffCursorPagination
 
     def create(self, request):
         """
@@ -29,8 +42,7 @@ class OwnerViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating create_owner function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
@@ -55,16 +67,21 @@ class OwnerViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating list_owners function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, Owner) and request.user.is_store_admin == True):
-            users = self.queryset
-            serializer = self.serializer_class(users, many=True)
-            log.info(f'list of owners has been retrieved successfully')
-            return Response({"status": status.HTTP_202_ACCEPTED, 'data': serializer.data, 'detail': 'list of owners has been retrieved'})
+        if (request.user.is_owner and request.user.is_store_admin == True):
+            users = self.get_queryset()
+            search = request.query_params.get('q', None)
+            if search:
+                users = users.search(search)
+            page = self.paginate_queryset(users)
+            serializer = self.serializer_class(page, many=True)
+            log.info(f'page of owners has been retrieved successfully')
+            return Response({"status": status.HTTP_202_ACCEPTED, 'data': serializer.data,
+                             'next': self.paginator.get_next_link(), 'previous': self.paginator.get_previous_link(),
+                             'detail': 'list of owners has been retrieved'})
         
         log.error(f'requesting user does not have permission to list owners')
         return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission access this resource'})
@@ -76,12 +93,11 @@ class OwnerViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating retrieve_owner function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, Owner) and request.user.pk == pk) or ((isinstance(request.user, Owner) and request.user.is_store_admin == True)):
+        if (request.user.is_owner and str(request.user.pk) == pk) or ((request.user.is_owner and request.user.is_store_admin == True)):
             log.info(f'retrieving the owner instance')
             try:
                 user = Owner.objects.get(pk=pk)
@@ -103,12 +119,11 @@ class OwnerViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating update_owner function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, Owner) and request.user.pk == pk):
+        if (request.user.is_owner and str(request.user.pk) == pk):
             try:
                 user = Owner.objects.get(pk=pk)
             except Owner.DoesNotExist:
@@ -134,12 +149,11 @@ class OwnerViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating delete_admin function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, Owner) and request.user.pk == pk) or (instance(request.user, Owner) and request.user.is_store_admin == True):
+        if (request.user.is_owner and str(request.user.pk) == pk) or (request.user.is_owner and request.user.is_store_admin == True):
             try:
                 user = Owner.objects.get(pk=pk)
             except Owner.DoesNotExist:
@@ -160,8 +174,9 @@ class AdminStaffViewSet(viewsets.ModelViewSet):
     """
     a viewset suite to handle crud operations on admin_staff model
     """
-    queryset = AdminStaff.objects.all()
+    queryset = AdminStaff.objects.prefetch_related('groups', 'user_permissions')
     serializer_class = AdminSerializer
+    pagination_class = StaffCursorPagination
 
     def create(self, request):
         """
@@ -170,12 +185,11 @@ class AdminStaffViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating create_admin_staff function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if isinstance(request.user, Owner) and request.user.is_store_admin == True:
+        if request.user.is_owner and request.user.is_store_admin == True:
             log.info(f'instantiating admin_staff_serializer class with request data')
             serializer = self.serializer_class(data=request.data)
             if serializer.is_valid():
@@ -196,16 +210,21 @@ class AdminStaffViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating list_admin_staff function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, Owner) and request.user.is_store_admin == True):
-            users = self.queryset
-            serializer = self.serializer_class(users, many=True)
-            log.info(f'list of admin_staff has been retrieved successfully')
-            return Response({"status": status.HTTP_202_ACCEPTED, 'data': serializer.data, 'detail': 'list of admin_staff has been retrieved'})
+        if (request.user.is_owner and request.user.is_store_admin == True):
+            users = self.get_queryset()
+            search = request.query_params.get('q', None)
+            if search:
+                users = users.search(search)
+            page = self.paginate_queryset(users)
+            serializer = self.serializer_class(page, many=True)
+            log.info(f'page of admin_staff has been retrieved successfully')
+            return Response({"status": status.HTTP_202_ACCEPTED, 'data': serializer.data,
+                             'next': self.paginator.get_next_link(), 'previous': self.paginator.get_previous_link(),
+                             'detail': 'list of admin_staff has been retrieved'})
         
         log.error(f'requesting user does not have permission to list admin_staff')
         return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission access this resource'})
@@ -217,12 +236,11 @@ class AdminStaffViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating retrieve_admin_staff function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, AdminStaff) and request.user.pk == pk) or (isinstance(request.user, Owner) and request.user.is_store_admin == True):
+        if (request.user.is_admin_staff and str(request.user.pk) == pk) or (request.user.is_owner and request.user.is_store_admin == True):
             log.info(f'retrieving the admin_staff instance')
             try:
                 user = AdminStaff.objects.get(pk=pk)
@@ -244,12 +262,11 @@ class AdminStaffViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating update_admin_staff function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, AdminStaff) and request.user.pk == pk):
+        if (request.user.is_admin_staff and str(request.user.pk) == pk):
             try:
                 user = AdminStaff.objects.get(pk=pk)
             except AdminStaff.DoesNotExist:
@@ -275,12 +292,11 @@ class AdminStaffViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating delete_admin_staff function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, AdminStaff) and request.user.pk == pk) or (isinstance(request.user, Owner) and request.user.is_store_admin == True):
+        if (request.user.is_admin_staff and str(request.user.pk) == pk) or (request.user.is_owner and request.user.is_store_admin == True):
             try:
                 user = AdminStaff.objects.get(pk=pk)
             except AdminStaff.DoesNotExist:
@@ -300,8 +316,9 @@ class RetailStaffViewSet(viewsets.ModelViewSet):
     """
     a viewset suite to handle crud operations on retail_staff model
     """
-    queryset = RetailStaff.objects.all()
+    queryset = RetailStaff.objects.prefetch_related('groups', 'user_permissions')
     serializer_class = RetailSerializer
+    pagination_class = StaffCursorPagination
 
     def create(self, request):
         """
@@ -310,12 +327,11 @@ class RetailStaffViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating create_retail_staff function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if isinstance(request.user, Owner) and request.user.is_store_admin == True:
+        if request.user.is_owner and request.user.is_store_admin == True:
             log.info(f'instantiating retail_staff_serializer class with request data')
             serializer = self.serializer_class(data=request.data)
             if serializer.is_valid():
@@ -329,6 +345,43 @@ class RetailStaffViewSet(viewsets.ModelViewSet):
             log.error(f'requesting user does not have permission to create new retail_staff')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission access this resource'})
 
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[JSONParser, CSVParser])
+    def bulk_create(self, request):
+        """
+        creates many retail_staff from a json array or a csv upload
+        accesible to store admins
+        """
+        log.info(f'instantiating bulk_create_retail_staff function')
+        log.info(f'validating requesting user')
+        if not request.user.is_authenticated:
+            log.error(f'requesting user could not be validated')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})
+
+        if not (request.user.is_owner and request.user.is_store_admin == True):
+            log.error(f'requesting user does not have permission to create new retail_staff')
+            return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission access this resource'})
+
+        rows = request.data
+        if not isinstance(rows, list) or not rows or len(rows) > MAX_ROWS or not all(isinstance(row, dict) for row in rows):
+            log.error(f'bulk retail_staff upload is not a list of 1 to {MAX_ROWS} rows')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': f'upload a json array or csv of 1 to {MAX_ROWS} retail_staff'})
+
+        try:
+            results = onboard_users(rows, RetailBulkSerializer)
+        except HashingBusy:
+            log.error(f'bulk retail_staff upload could not be processed because password hashing is saturated')
+            return Response({'status': status.HTTP_503_SERVICE_UNAVAILABLE, 'detail': 'Onboarding is temporarily unavailable, please try again'})
+
+        created = len([result for result in results if 'data' in result])
+        if created == len(results):
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'status': response_status, 'data': results,
+                         'detail': f'{created} of {len(results)} retail_staff have been created'})
+
     def list(self, request):
         """
         retrieves a list of all available retail_staff on the platform
@@ -336,16 +389,21 @@ class RetailStaffViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating list_retail_staff function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, Owner) and request.user.is_store_admin == True):
-            users = self.queryset
-            serializer = self.serializer_class(users, many=True)
-            log.info(f'list of retail_staff has been retrieved successfully')
-            return Response({"status": status.HTTP_202_ACCEPTED, 'data': serializer.data, 'detail': 'list of retail_staff has been retrieved'})
+        if (request.user.is_owner and request.user.is_store_admin == True):
+            users = self.get_queryset()
+            search = request.query_params.get('q', None)
+            if search:
+                users = users.search(search)
+            page = self.paginate_queryset(users)
+            serializer = self.serializer_class(page, many=True)
+            log.info(f'page of retail_staff has been retrieved successfully')
+            return Response({"status": status.HTTP_202_ACCEPTED, 'data': serializer.data,
+                             'next': self.paginator.get_next_link(), 'previous': self.paginator.get_previous_link(),
+                             'detail': 'list of retail_staff has been retrieved'})
         
         log.error(f'requesting user does not have permission to list retail_staff')
         return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'You dont have permission access this resource'})
@@ -357,12 +415,11 @@ class RetailStaffViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating retrieve_retail_staff function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, RetailStaff) and request.user.pk == pk) or (isinstance(request.user, Owner) and request.user.is_store_admin == True):
+        if (request.user.is_retail_staff and str(request.user.pk) == pk) or (request.user.is_owner and request.user.is_store_admin == True):
             log.info(f'retrieving the retail_staff instance')
             try:
                 user = RetailStaff.objects.get(pk=pk)
@@ -384,12 +441,11 @@ class RetailStaffViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating update_retail_staff function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, RetailStaff) and request.user.pk == pk):
+        if (request.user.is_retail_staff and str(request.user.pk) == pk):
             try:
                 user = RetailStaff.objects.get(pk=pk)
             except RetailStaff.DoesNotExist:
@@ -415,12 +471,11 @@ class RetailStaffViewSet(viewsets.ModelViewSet):
         """
         log.info(f'instantiating delete_retail_staff function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
 
-        if (isinstance(request.user, RetailStaff) and request.user.pk == pk) or (isinstance(request.user, Owner) and request.user.is_store_admin == True):
+        if (request.user.is_retail_staff and str(request.user.pk) == pk) or (request.user.is_owner and request.user.is_store_admin == True):
             try:
                 user = RetailStaff.objects.get(pk=pk)
             except RetailStaff.DoesNotExist:
@@ -440,6 +495,9 @@ class LoginView(APIView):
     """ 
     User login and authentication view.
     """
+    authentication_classes = []
+    """ attempts over the limit are rejected before any user lookup or password hashing """
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
 
     def post(self, request):
         """Authenticates and logs in a user."""
@@ -449,51 +507,39 @@ class LoginView(APIView):
         if serializer.is_valid():
             email = serializer.validated_data.get('email')
             log.info(f'retrieving the requesting user for loggin in')
-            try:
-                user = Owner.objects.get(email=email)
-            except:
-                
-                try:
-                    user = RetailStaff.objects.get(email=email)
-                except:
-                    
-                    try:
-                        user = AdminStaff.objects.get(email=email)
-                    except:
-                        user = None
+            user = fetch_user(email=email)
                             
             response = Response()
             if user is None:
                 log.error(f'requesting user could not be logged in because the user cant be found on the database')
                 return Response({'status': status.HTTP_401_UNAUTHORIZED, 'detail': 'This user does not exit'})
             
-            if not user.check_password(serializer.validated_data.get('password')):
+            try:
+                password_is_correct = check_user_password(user, serializer.validated_data.get('password'))
+            except HashingBusy:
+                log.error(f'requesting user could not be logged in because password hashing is saturated')
+                return Response({'status': status.HTTP_503_SERVICE_UNAVAILABLE, 'detail': 'Login is temporarily unavailable, please try again'})
+
+            if not password_is_correct:
                 log.error(f'requesting user could not be logged in because the inputed password is incorrect')
                 return Response({'status': status.HTTP_401_UNAUTHORIZED, 'detail': 'This login details entered are incorrect'})
             
-            refresh = RefreshToken.for_user(user)
+            refresh = issue_tokens(user)
+            access = refresh.access_token
             log.info(f'requesting user has been retrieved successfully')
 
-            """ checking already logged in """
-            expiration = user.last_login + timedelta(minutes=5)
-            if user.is_authenticated == True:
-                if timezone.now() < expiration:
-                    log.error(f'requesting user is already logged in')
-                    return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'This user is already logged in'})
-                
-            """ updating the user's last-login attribute and authentication status """
-            log.info(f'updating the last_login attribute for the requesting user')
-            user.last_login = datetime.now()
-            user.is_authenticated = True
-            user.save()
+            """ opening a session for the issued access token, a user may hold several sessions at once """
+            registry.open(access['jti'], user.pk)
+            activity.touch(user.pk)
 
             """ adding the jwt token to the cookie """
             log.info(f'setting the token for logged in user to the request cookie')
-            response.set_cookie(key='jwt', value=refresh.access_token, httponly=True)
+            response.set_cookie(key='jwt', value=str(access), httponly=True)
+            response.set_cookie(key='refresh', value=str(refresh), httponly=True)
 
             response.data = {
                 'refresh': str(refresh),
-                'access': str(refresh.access_token),
+                'access': str(access),
                 'status': status.HTTP_202_ACCEPTED
             }
             response.status_code = 201
@@ -516,17 +562,65 @@ class LogoutView(APIView):
         """ Logs out the current user and deletes session """
         log.info(f'instantiating logout function')
         log.info(f'validating requesting user')
-        request.user = get_user(request)
-        if request.user is None:
+        if not request.user.is_authenticated:
             log.error(f'requesting user could not be validated')
             return Response({'status': status.HTTP_403_FORBIDDEN, 'detail': 'you need to login to access this resource'})           
-        response = Response()
-        
+        registry.close(request.user.session_id)
+
+        """ blacklisting the refresh token so this session can't be resumed """
+        refresh = request.COOKIES.get('refresh', None)
+        if refresh is not None:
+            try:
+                RefreshToken(refresh).blacklist()
+            except TokenError:
+                log.info(f'refresh token of the requesting user is already invalid')
+
+        response = Response({'status': status.HTTP_200_OK, 'detail': 'user has been logged out successfully'})
         response.delete_cookie('jwt')
-        response.data = {
-            'message': 'success'
-        }
-        request.user.is_authenticated = False
-        request.user.save()
+        response.delete_cookie('refresh')
+        return response
+
 
-        return Response({'status': status.HTTP_200_OK, 'detail': 'user has been logged out successfully'})
+class RefreshView(APIView):
+    """
+    Token refresh view.
+    """
+    authentication_classes = []
+
+    def post(self, request):
+        """ Exchanges a refresh token for a new access token without logging in again """
+        log.info(f'instantiating token_refresh function')
+        if not isinstance(request.data, Mapping):
+            log.error(f'tokens could not be refreshed because the request body is not an object')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'request body must be an object'})
+        token = request.data.get('refresh', None) or request.COOKIES.get('refresh', None)
+        if token is None:
+            log.error(f'tokens could not be refreshed due to absence of a refresh token')
+            return Response({'status': status.HTTP_400_BAD_REQUEST, 'detail': 'a refresh token is required'})
+
+        try:
+            refresh = rotate_tokens(token)
+        except TokenError:
+            log.error(f'tokens could not be refreshed because the refresh token is invalid, expired or revoked')
+            return Response({'status': status.HTTP_401_UNAUTHORIZED, 'detail': 'you need to login to access this resource'})
+        access = refresh.access_token
+
+        """ moving the login session over to the new access token """
+        previous = request.COOKIES.get('jwt', None)
+        if previous is not None:
+            try:
+                registry.close(AccessToken(previous, verify=False)['jti'])
+            except TokenError:
+                log.info(f'previous access token of the requesting user could not be read')
+        registry.open(access['jti'], refresh['user_id'])
+
+        response = Response({
+            'refresh': str(refresh),
+            'access': str(access),
+            'status': status.HTTP_202_ACCEPTED
+            })
+        response.set_cookie(key='jwt', value=str(access), httponly=True)
+        response.set_cookie(key='refresh', value=str(refresh), httponly=True)
+
+        log.info(f'tokens of the requesting user have been refreshed successfully')
+        return response